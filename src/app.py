@@ -1,8 +1,14 @@
-"""App file for cloudfunctions when deploying inside a docker container."""
+"""App file for cloudfunctions when deploying inside a docker container.
+
+The container runs the app with gunicorn (see `gunicorn.conf.py`), running this
+file starts the Flask development server.
+"""
+
+import os
 
 from flask import Flask, request
 from health.main import get_health
-from transform.main import post_transform
+from transform.main import get_metrics, post_transform, post_transform_batch
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -18,5 +24,15 @@ def transform_route():
     """Mapping route for transform endpoint."""
     return post_transform(request)
 
+@app.route('/transform/batch', methods=['POST'])
+def transform_batch_route():
+    """Mapping route for batch transform endpoint."""
+    return post_transform_batch(request)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Mapping route for metrics endpoint."""
+    return get_metrics(request)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080)
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '8080')))
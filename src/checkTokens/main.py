@@ -1,62 +1,145 @@
 """Implements the 'check_Tokens' HTTP Cloud Function.
 
 This module defines a Google Cloud Function for RateLimiting the transform Endpoint.
+The tokens are stored in sharded Firestore documents (see `token_bucket`). For
+local tests and benchmarks the environment variable `TOKEN_STORE` selects the
+store "memory" or "sqlite:<path>" instead.
 """
 import base64
-import firebase_admin
-import functions_framework
 import json
-from firebase_admin import credentials, firestore
-from flask import jsonify
 import os
-import pytz
-from datetime import datetime, timedelta
+from datetime import UTC, datetime
+
+import functions_framework
+from flask import jsonify
+
+from token_bucket import (
+    MemoryStore,
+    Shard,
+    ShardUpdate,
+    SqliteStore,
+    TokenBucket,
+    TokenStore,
+)
+
+
+class FirestoreStore(TokenStore):
+    """Shards as documents "token-shard-<i>" of the collection "api-tokens"."""
+
+    def __init__(self, client):
+        """Create a store with a Firestore client."""
+        self.client = client
+
+    def transact(self, shard: int, update: ShardUpdate):
+        """Update a shard in a Firestore transaction."""
+        from firebase_admin import firestore
+
+        doc_ref = self.client.collection("api-tokens").document(f"token-shard-{shard}")
 
-GCP_SERVICE_ACCOUNT_CERTIFICATE_BASE64 = os.getenv( "GCP_SERVICE_ACCOUNT_CERTIFICATE" )
-if( GCP_SERVICE_ACCOUNT_CERTIFICATE_BASE64 is None ):
-    raise KeyError( "Env var GCP_SERVICE_ACCOUNT_CERTIFICATE not found!" )
+        @firestore.transactional
+        def run(transaction):
+            doc = doc_ref.get(transaction=transaction)
+            state = None
+            if doc.exists:
+                data = doc.to_dict()
+                state = Shard(
+                    data.get("tokens", 0),
+                    data["tokens_last_replenished"].timestamp(),
+                )
+            state, taken = update(state)
+            transaction.set(
+                doc_ref,
+                {
+                    "tokens": state.tokens,
+                    "tokens_last_replenished": datetime.fromtimestamp(
+                        state.replenished, UTC
+                    ),
+                },
+            )
+            return state, taken
 
+        return run(self.client.transaction())
 
-GCP_SERVICE_ACCOUNT_CERTIFICATE_DECODED_BYTES = \
-    base64.b64decode(GCP_SERVICE_ACCOUNT_CERTIFICATE_BASE64)
+    def legacy(self):
+        """Read the document "token-document" of the unsharded rate limit."""
+        doc = self.client.collection("api-tokens").document("token-document").get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        replenished = data.get("tokens_last_replenished")
+        if replenished is None:
+            return None
+        return Shard(data.get("tokens", 0), replenished.timestamp())
 
-GCP_SERVICE_ACCOUNT_CERTIFICATE_DECODED_STRING = \
-    GCP_SERVICE_ACCOUNT_CERTIFICATE_DECODED_BYTES.decode('utf-8')
 
-cred_dict = json.loads(GCP_SERVICE_ACCOUNT_CERTIFICATE_DECODED_STRING, strict=False)
-cred = credentials.Certificate(cred_dict)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+def create_store() -> TokenStore:
+    """Return the store selected by the environment variable `TOKEN_STORE`."""
+    store = os.getenv("TOKEN_STORE", "firestore")
+    if store == "memory":
+        return MemoryStore()
+    if store.startswith("sqlite:"):
+        return SqliteStore(store.removeprefix("sqlite:"))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    certificate_base64 = os.getenv("GCP_SERVICE_ACCOUNT_CERTIFICATE")
+    if certificate_base64 is None:
+        raise KeyError("Env var GCP_SERVICE_ACCOUNT_CERTIFICATE not found!")
+    certificate = base64.b64decode(certificate_base64).decode("utf-8")
+    cred = credentials.Certificate(json.loads(certificate, strict=False))
+    firebase_admin.initialize_app(cred)
+    return FirestoreStore(firestore.client())
+
+
+def describe_interval(seconds: float):
+    """Return a refill interval in words, e.g. "1 hour" or "90 seconds"."""
+    for unit, length in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= length and seconds % length == 0:
+            count = int(seconds // length)
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return f"{seconds:g} second{'s' if seconds != 1 else ''}"
+
+
+_bucket: TokenBucket | None = None
+
+
+def get_bucket():
+    """Return the bucket, the store (e.g. the Firebase client) is created lazily."""
+    global _bucket
+    if _bucket is None:
+        _bucket = TokenBucket(
+            create_store(),
+            capacity=int(os.getenv("TOKEN_CAPACITY", "99")),
+            shards=int(os.getenv("TOKEN_SHARDS", "4")),
+            refill_interval=float(os.getenv("TOKEN_REFILL_SECONDS", "3600")),
+        )
+    return _bucket
+
 
 @functions_framework.http
 def check_tokens(request):
-    """Check if there are tokens available in the Firestore database."""
-    if db is None:
-        return jsonify({"error": "No database available"}), 500
-
-    doc_ref = db.collection("api-tokens").document("token-document")
-    doc = doc_ref.get()
-    if doc.exists:
-        tokens = doc.to_dict().get("tokens", 0)
-        timestamp = doc.to_dict().get("tokens_last_replenished", 0)
-        current_time = datetime.now(pytz.utc)
-        time_difference = current_time - timestamp
-
-        if tokens <= 0:
-            if time_difference >= timedelta(hours=1):
-                doc_ref.update({
-                    "tokens": 99,
-                    "tokens_last_replenished": current_time
-                })
-                return jsonify({"tokens": 99})
-            else:
-                return jsonify({"error":
-                                 "No tokens available, and last replenish" +
-                                 "was less than an hour ago." + 
-                                 "Please try again later."}), 429
-        else:
-            doc_ref.update({"tokens": tokens-1})
-            return jsonify({"tokens": tokens-1}), 200
-    else:
-        return jsonify({"error": "No document available"}), 404
+    """Take request tokens of the rate limit.
+
+    The optional parameter "n" leases multiple tokens at once (e.g. a batch or a
+    block of tokens served by a transformer instance). Either all or none of the
+    tokens are taken.
+    """
+    bucket = get_bucket()
+    try:
+        requested = int(request.args.get("n", "1"))
+    except ValueError:
+        requested = 0
+    if not 1 <= requested <= bucket.capacity:
+        return jsonify(
+            {"error": f"Parameter n must be between 1 and {bucket.capacity}."}
+        ), 400
 
+    tokens = bucket.take(requested)
+    if tokens is None:
+        interval = describe_interval(bucket.refill_interval)
+        return jsonify({"error":
+                        "No tokens available, and last replenish " +
+                        f"was less than {interval} ago. " +
+                        "Please try again later."}), 429
+    return jsonify({"tokens": tokens, "granted": requested}), 200
@@ -2,9 +2,32 @@
 
 import unittest
 
+from flask import Flask, request
+
+import main
+from token_bucket import MemoryStore, TokenBucket
+
+
 class TestUnitCheckTokens(unittest.TestCase):
     """A unit test class for testing the CheckTokens Endpoint of the application."""
 
-    def test_boilerplate(self):
-        """Boilerplate empty test function. This will always pass."""
-        self.assertTrue(True)
+    def tearDown(self):
+        """Resets the bucket of the endpoint."""
+        main._bucket = None
+
+    def test_describe_interval(self):
+        """Tests the refill intervals in words."""
+        self.assertEqual(main.describe_interval(3600), "1 hour")
+        self.assertEqual(main.describe_interval(1800), "30 minutes")
+        self.assertEqual(main.describe_interval(90), "90 seconds")
+        self.assertEqual(main.describe_interval(172800), "2 days")
+
+    def test_exhausted_message(self):
+        """Tests that the error names the configured refill interval."""
+        main._bucket = TokenBucket(MemoryStore(), capacity=1, refill_interval=900)
+        with Flask(__name__).test_request_context("/?n=1"):
+            _, status = main.check_tokens(request)
+            self.assertEqual(status, 200)
+            response, status = main.check_tokens(request)
+        self.assertEqual(status, 429)
+        self.assertIn("less than 15 minutes ago", response.get_json()["error"])
@@ -0,0 +1,54 @@
+"""Unit tests for the sharded token bucket of the rate limit."""
+
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from token_bucket import MemoryStore, Shard, SqliteStore, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    """A unit test class for testing the token bucket with local stores."""
+
+    def test_bulk_lease(self):
+        """Tests that leases get all or none of the tokens of all shards."""
+        bucket = TokenBucket(MemoryStore(), capacity=10, shards=3)
+        self.assertEqual([bucket.shard_capacity(i) for i in range(3)], [4, 3, 3])
+        self.assertIsNotNone(bucket.take(6, now=0))
+        self.assertIsNone(bucket.take(5, now=0))
+        self.assertIsNotNone(bucket.take(4, now=0))
+        self.assertIsNone(bucket.take(1, now=0))
+
+    def test_refill(self):
+        """Tests that the shards are refilled after the interval."""
+        bucket = TokenBucket(MemoryStore(), capacity=4, shards=2, refill_interval=60)
+        self.assertEqual(bucket.take(4, now=0), 0)
+        self.assertIsNone(bucket.take(1, now=59))
+        self.assertEqual(bucket.take(1, now=60), 1)
+
+    def test_legacy_document(self):
+        """Tests that new shards start with the tokens of the legacy document."""
+        store = MemoryStore(legacy=Shard(5, 0))
+        bucket = TokenBucket(store, capacity=9, shards=3, refill_interval=60)
+        self.assertEqual([bucket.initial_shard(i, 30).tokens for i in range(3)],
+                         [2, 2, 1])
+        self.assertIsNone(bucket.take(6, now=30))
+        self.assertIsNotNone(bucket.take(5, now=30))
+        self.assertIsNone(bucket.take(1, now=59))
+        self.assertEqual(bucket.take(9, now=60), 0)
+
+        expired = TokenBucket(MemoryStore(legacy=Shard(0, 0)), capacity=9, shards=3,
+                              refill_interval=60)
+        self.assertEqual(expired.take(9, now=60), 0)
+
+    def test_concurrent_requests(self):
+        """Tests that concurrent requests do not take more than the capacity."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tokens.sqlite")
+            buckets = [TokenBucket(SqliteStore(path), capacity=50) for _ in range(4)]
+            with ThreadPoolExecutor(8) as executor:
+                results = list(
+                    executor.map(lambda i: buckets[i % 4].take(2, now=0), range(40))
+                )
+        self.assertEqual(sum(result is not None for result in results), 25)
@@ -0,0 +1,199 @@
+"""Sharded token bucket of the rate limit.
+
+The tokens are split into shards, e.g. one Firestore document per shard, so
+concurrent requests rarely update the same document. Every shard is refilled to
+its capacity when the refill interval has passed since its last refill. A request
+takes its tokens from the shards in a random order with one transaction per
+shard. If all shards together do not have enough tokens, the taken tokens are
+given back, so a request gets either all or none of its tokens.
+
+Before the sharding, all tokens were stored in a single document. A shard which
+does not exist yet starts with its share of the tokens left in this legacy
+document (see `TokenStore.legacy`) until the legacy refill interval has passed,
+so a deployment neither resets nor loses the tokens of the current interval.
+
+The shards are stored by a `TokenStore`, e.g. in memory or sqlite for local tests
+and benchmarks without Firebase.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import NamedTuple
+
+
+class Shard(NamedTuple):
+    """The tokens of a shard and the time of its last refill (epoch seconds)."""
+
+    tokens: int
+    replenished: float
+
+
+# Update of a shard returning the new shard and the number of taken tokens.
+ShardUpdate = Callable[[Shard | None], tuple[Shard, int]]
+
+
+class TokenStore(ABC):
+    """Storage of the shards with atomic updates."""
+
+    @abstractmethod
+    def transact(self, shard: int, update: ShardUpdate) -> tuple[Shard, int]:
+        """Atomically update a shard (None if it does not exist yet).
+
+        The update may be called multiple times, e.g. if a transaction is retried.
+        """
+
+    def legacy(self) -> Shard | None:
+        """Return the tokens of the legacy single document (None if it is missing)."""
+        return None
+
+
+class MemoryStore(TokenStore):
+    """Shards in memory of this process."""
+
+    def __init__(self, legacy: Shard | None = None):
+        """Create an empty store, optionally with a legacy document."""
+        self._shards: dict[int, Shard] = {}
+        self._legacy = legacy
+        self._lock = threading.Lock()
+
+    def transact(self, shard: int, update: ShardUpdate):
+        """Update a shard while holding the lock of the store."""
+        with self._lock:
+            state, taken = update(self._shards.get(shard))
+            self._shards[shard] = state
+        return state, taken
+
+    def legacy(self):
+        """Return the legacy document given to the store."""
+        return self._legacy
+
+
+class SqliteStore(TokenStore):
+    """Shards in a sqlite database which can be shared by multiple processes."""
+
+    def __init__(self, path: str):
+        """Open or create the database file."""
+        self._connection = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS shards "
+            "(shard INTEGER PRIMARY KEY, tokens INTEGER NOT NULL, "
+            "replenished REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def transact(self, shard: int, update: ShardUpdate):
+        """Update a shard in an immediate transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT tokens, replenished FROM shards WHERE shard = ?", (shard,)
+                ).fetchone()
+                state, taken = update(None if row is None else Shard(*row))
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO shards VALUES (?, ?, ?)",
+                    (shard, state.tokens, state.replenished),
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return state, taken
+
+
+class TokenBucket:
+    """Rate limit with a capacity of tokens which is refilled per interval."""
+
+    def __init__(
+        self,
+        store: TokenStore,
+        capacity: int = 99,
+        shards: int = 4,
+        refill_interval: float = 3600,
+    ):
+        """Create a bucket with the shards of a store.
+
+        Args:
+            store: Storage of the shards.
+            capacity: Number of tokens of all shards.
+            shards: Number of shards.
+            refill_interval: Seconds after which a shard is refilled.
+        """
+        self.store = store
+        self.capacity = capacity
+        self.shards = min(shards, capacity)
+        self.refill_interval = refill_interval
+        self._legacy: Shard | None = None
+        self._legacy_loaded = False
+
+    def shard_capacity(self, shard: int):
+        """Return the number of tokens of a full shard."""
+        return self.capacity // self.shards + (shard < self.capacity % self.shards)
+
+    def initial_shard(self, shard: int, now: float):
+        """Return the state of a new shard, e.g. its share of the legacy document.
+
+        The legacy tokens are split like the capacity and the legacy document is
+        read at most once per bucket.
+        """
+        if not self._legacy_loaded:
+            self._legacy = self.store.legacy()
+            self._legacy_loaded = True
+        legacy = self._legacy
+        if legacy is None or now - legacy.replenished >= self.refill_interval:
+            return Shard(self.shard_capacity(shard), now)
+        tokens = max(legacy.tokens, 0)
+        share = tokens // self.shards + (shard < tokens % self.shards)
+        return Shard(min(share, self.shard_capacity(shard)), legacy.replenished)
+
+    def _update(self, shard: int, tokens: int, now: float) -> ShardUpdate:
+        """Return the update which refills a shard and takes or gives back tokens.
+
+        Positive tokens are taken as far as available, negative tokens are given
+        back up to the capacity of the shard.
+        """
+        capacity = self.shard_capacity(shard)
+
+        def update(state: Shard | None):
+            if state is None:
+                state = self.initial_shard(shard, now)
+            elif now - state.replenished >= self.refill_interval:
+                state = Shard(capacity, now)
+            taken = min(tokens, state.tokens)
+            left = min(state.tokens - taken, capacity)
+            return Shard(left, state.replenished), taken
+
+        return update
+
+    def take(self, requested: int, now: float | None = None):
+        """Take tokens and return the tokens left in the used shards.
+
+        Returns:
+            The tokens left in the used shards or None if the bucket has not
+            enough tokens. In this case no token is taken.
+        """
+        now = time.time() if now is None else now
+        order = list(range(self.shards))
+        random.shuffle(order)
+        needed = requested
+        left = 0
+        taken_by_shard: list[tuple[int, int]] = []
+        for shard in order:
+            if needed == 0:
+                break
+            state, taken = self.store.transact(shard, self._update(shard, needed, now))
+            if taken:
+                taken_by_shard.append((shard, taken))
+                needed -= taken
+                left += state.tokens
+        if needed == 0:
+            return left
+        for shard, taken in taken_by_shard:
+            self.store.transact(shard, self._update(shard, -taken, now))
+        return None
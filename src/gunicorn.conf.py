@@ -0,0 +1,95 @@
+"""Gunicorn configuration of the production server of `app.py`.
+
+Run from the repository root with `gunicorn --config src/gunicorn.conf.py`. The
+server is configured with the environment variables:
+
+- `PORT`: Port of the server (default 8080).
+- `WEB_CONCURRENCY`: Number of worker processes (default number of CPUs).
+- `GUNICORN_THREADS`: Threads per worker process (default 4).
+- `GUNICORN_KEEPALIVE`: Seconds a idle connection is kept open (default 75,
+  above the idle timeout of the Google load balancers).
+- `GUNICORN_MAX_REQUESTS`: Requests after which a worker is replaced (default
+  1000, 0 disables it) with a random jitter of `GUNICORN_MAX_REQUESTS_JITTER`
+  (default 100).
+- `GUNICORN_TIMEOUT`: Seconds a silent worker is killed after (default 60, the
+  timeout of the gateway).
+- `GUNICORN_PRELOAD`: Whether the app and the transformer are imported once by
+  the master process (default true).
+
+With preloading, the objects of the master (e.g. the schemas of the models) are
+moved to the permanent generation of the garbage collector before the workers
+are forked. The collector of a worker does not touch them, so their memory pages
+are shared copy-on-write by all workers.
+
+Every worker has its own pool of transformation processes (see `worker_pool`),
+with one process by default (`TRANSFORM_WORKERS`), and writes its metrics to the
+shared directory `METRICS_DIR` (default `/tmp/transform-metrics`), the last ones
+when it exits.
+"""
+
+import gc
+import os
+import shutil
+import threading
+from pathlib import Path
+
+chdir = str(Path(__file__).parent)
+wsgi_app = "app:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = timeout
+preload_app = os.getenv("GUNICORN_PRELOAD", "true") != "false"
+accesslog = "-"
+
+os.environ.setdefault("TRANSFORM_WORKERS", "1")
+os.environ.setdefault("METRICS_DIR", "/tmp/transform-metrics")
+# Empty the metrics of the previous run before the app is loaded
+shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+if preload_app:
+    # The master imports the transformer in `when_ready`, a warm-up thread
+    # would still run while the workers are forked.
+    os.environ.setdefault("TRANSFORM_WARM_UP", "false")
+    # Objects allocated until the fork are frozen, not collected
+    gc.disable()
+
+
+def when_ready(server):
+    """Import the transformer and freeze the objects before the first fork."""
+    if not server.cfg.preload_app:
+        return
+    from transformer.transform import warm_up
+
+    warm_up()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    """Freeze the objects allocated since the last fork (e.g. a replaced worker)."""
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """Enable the garbage collector for the objects of the worker."""
+    gc.enable()
+
+
+def worker_exit(server, worker):
+    """Write the last metrics of a worker (see `metrics`)."""
+    import metrics
+
+    metrics.get_registry().flush()
+
+
+def post_worker_init(worker):
+    """Start the transformation processes of a worker in the background."""
+    if not worker.cfg.preload_app:
+        return
+    import worker_pool
+
+    threading.Thread(target=worker_pool.get_pool, daemon=True).start()
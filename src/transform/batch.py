@@ -0,0 +1,219 @@
+"""Batch transformation of many XML models in one request.
+
+The body is either NDJSON or multipart form data:
+
+- NDJSON: Every line is a JSON object with the model in the field "bpmn" or
+  "pnml" and the optional fields "id" and "direction".
+- Multipart form data: Every field or file "bpmn" or "pnml" is one model, the
+  file name is used as id.
+
+The models are transformed by the worker pool (see `worker_pool`) with at most
+two pending models per worker. Without a worker pool (`TRANSFORM_WORKERS=0`) the
+models are transformed one after another in the request thread, threads would not
+run the (CPU bound) transformations in parallel. The results are streamed back
+as NDJSON in completion order. Every line contains the index and id of the model
+and either the transformed model or the error with the id of the
+`KnownException`.
+
+A batch may contain at most `BATCH_MAX_ITEMS` models (default 100), larger
+batches are rejected as a whole.
+"""
+
+import json
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, NamedTuple
+
+import flask
+
+import metrics
+import worker_pool
+from exceptions import (
+    InvalidInputXML,
+    KnownException,
+    PrivateInternalException,
+    TooManyBatchItems,
+    UnexpectedError,
+    UnexpectedQueryParameter,
+)
+from transformer.transform import (
+    DIRECTIONS,
+    cache_direction,
+    transform_xml_string,
+    trusted_pnml,
+)
+from transformer.utility import result_cache
+
+NDJSON_MIMETYPES = (
+    "application/x-ndjson",
+    "application/jsonl",
+    "application/json-lines",
+)
+FORM_MIMETYPES = ("multipart/form-data", "application/x-www-form-urlencoded")
+# input key -> direction
+_INPUT_DIRECTIONS = {input_key: d for d, (input_key, _) in DIRECTIONS.items()}
+
+
+class BatchItem(NamedTuple):
+    """A model of a batch or the error of an invalid entry."""
+
+    index: int
+    id: Any
+    direction: str | None = None
+    xml_content: str | None = None
+    error: KnownException | None = None
+
+
+def _ndjson_item(index: int, line: str):
+    """Return the item of a NDJSON line."""
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return BatchItem(index, None, error=InvalidInputXML())
+    if not isinstance(entry, dict):
+        return BatchItem(index, None, error=InvalidInputXML())
+    item_id = entry.get("id")
+    models = [key for key in _INPUT_DIRECTIONS if isinstance(entry.get(key), str)]
+    if len(models) != 1:
+        return BatchItem(index, item_id, error=InvalidInputXML())
+    direction = _INPUT_DIRECTIONS[models[0]]
+    if entry.get("direction", direction) != direction:
+        return BatchItem(index, item_id, error=UnexpectedQueryParameter("direction"))
+    return BatchItem(index, item_id, direction, entry[models[0]])
+
+
+def read_items(request: flask.Request) -> list[BatchItem]:
+    """Return the items of a NDJSON or multipart batch request.
+
+    Raises:
+        InvalidInputXML: If the body has an unsupported content type.
+        TooManyBatchItems: If the body has more than `BATCH_MAX_ITEMS` entries.
+    """
+    limit = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    if request.mimetype in NDJSON_MIMETYPES:
+        lines = [line for line in request.get_data(as_text=True).splitlines() if line]
+        if len(lines) > limit:
+            raise TooManyBatchItems(limit)
+        return [_ndjson_item(i, line) for i, line in enumerate(lines)]
+    if request.mimetype not in FORM_MIMETYPES:
+        raise InvalidInputXML()
+
+    fields = [
+        (key, value)
+        for key, value in request.form.items(multi=True)
+        if key in _INPUT_DIRECTIONS
+    ]
+    files = [
+        (key, file)
+        for key, file in request.files.items(multi=True)
+        if key in _INPUT_DIRECTIONS
+    ]
+    if len(fields) + len(files) > limit:
+        raise TooManyBatchItems(limit)
+    items: list[BatchItem] = []
+    for key, value in fields:
+        items.append(BatchItem(len(items), None, _INPUT_DIRECTIONS[key], value))
+    for key, file in files:
+        try:
+            xml_content = file.read().decode("utf-8")
+        except UnicodeDecodeError:
+            items.append(BatchItem(len(items), file.filename, error=InvalidInputXML()))
+            continue
+        direction = _INPUT_DIRECTIONS[key]
+        items.append(BatchItem(len(items), file.filename, direction, xml_content))
+    return items
+
+
+def error_entry(exception: Exception) -> dict[str, Any]:
+    """Return the id and message of an exception in a streamed body.
+
+    The known exceptions are counted like the ones of single requests.
+    """
+    if isinstance(exception, KnownException):
+        metrics.get_registry().inc("transform_known_exceptions_total", id=exception.id)
+        return {"id": exception.id, "message": str(exception)}
+    if isinstance(exception, PrivateInternalException):
+        return {"id": UnexpectedError().id, "message": str(exception)}
+    print("Unkown exception:\n", str(exception))
+    return {"id": UnexpectedError().id, "message": str(UnexpectedError())}
+
+
+def _line(item: BatchItem, result: str | Exception):
+    """Return the NDJSON line of the result or exception of an item."""
+    entry: dict[str, Any] = {"index": item.index, "id": item.id}
+    if isinstance(result, str):
+        entry["direction"] = item.direction
+        entry[DIRECTIONS[item.direction][1]] = result  # type: ignore
+    else:
+        entry["error"] = error_entry(result)
+    return json.dumps(entry) + "\n"
+
+
+def _outcome(transform: Callable[[], str]) -> str | Exception:
+    """Return the result of a transformation or the raised exception."""
+    try:
+        return transform()
+    except Exception as e:
+        return e
+
+
+def iter_results(items: list[BatchItem], use_cache: bool = True) -> Iterator[str]:
+    """Yield the NDJSON result lines of the items in completion order.
+
+    Cached results are yielded immediately, the other items are transformed by
+    the worker pool with at most two pending items per worker.
+    """
+    cache = result_cache.get_cache() if use_cache else None
+    pool = worker_pool.get_pool()
+    max_pending = 0 if pool is None else 2 * pool.workers
+    pending: dict[Any, tuple[BatchItem, str | None]] = {}
+    is_trusted = trusted_pnml()
+
+    def complete(item: BatchItem, key: str | None, result: str | Exception):
+        """Return the line of a result and store it in the cache."""
+        if cache is not None and key is not None:
+            if isinstance(result, str | KnownException):
+                cache.put(key, result)
+        return _line(item, result)
+
+    def complete_done():
+        """Yield the lines of the completed pending items."""
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for future in done:
+            item, key = pending.pop(future)
+            yield complete(item, key, _outcome(future.result))
+
+    for item in items:
+        if item.error is not None:
+            yield _line(item, item.error)
+            continue
+        key = None
+        if cache is not None:
+            direction = cache_direction(item.direction, is_trusted)  # type: ignore
+            key = result_cache.cache_key(direction, item.xml_content)  # type: ignore
+            cached = _outcome(lambda: cache.get(key))  # type: ignore
+            if cached is not None:
+                yield _line(item, cached)
+                continue
+        arguments = (item.direction, item.xml_content, is_trusted)
+        if pool is None:
+            result = _outcome(lambda: transform_xml_string(*arguments))
+            yield complete(item, key, result)
+            continue
+        pending[pool.submit(transform_xml_string, *arguments)] = (item, key)
+        if len(pending) >= max_pending:
+            yield from complete_done()
+    while pending:
+        yield from complete_done()
+
+
+def handle_batch(request: flask.Request):
+    """Handle a batch transformation with a streamed NDJSON response."""
+    items = read_items(request)
+    use_cache = request.args.get("cache", "true") != "false"
+    response = flask.Response(
+        iter_results(items, use_cache), mimetype="application/x-ndjson"
+    )
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
@@ -35,6 +35,20 @@ class KnownException(Exception):
         self._id = id
         super().__init__(message)
 
+    def __reduce__(self):
+        """Pickle with the type, the subclasses have other init arguments."""
+        return _restore_known_exception, (type(self), self._id, self._message)
+
+    @property
+    def id(self) -> int:
+        """Return the error ID."""
+        return self._id
+
+    @property
+    def message(self) -> str:
+        """Return the error message."""
+        return self._message
+
     def __str__(self) -> str:
         """Return a string representation of the error."""
         error_text = f"Error description: {self._message}\n{GITHUB_MESSAGE}"
@@ -43,6 +57,13 @@ class KnownException(Exception):
         return error_text
 
 
+def _restore_known_exception(cls: type[KnownException], id: int, message: str):
+    """Return an unpickled known exception of a type without calling its init."""
+    exception = cls.__new__(cls)
+    KnownException.__init__(exception, id, message)
+    return exception
+
+
 class UnexpectedError(KnownException):
     """Exception raised for unexpected errors."""
 
@@ -160,4 +181,31 @@ class NoRequestTokensAvailable(KnownException):
     def __init__(self) -> None:
         """Initialize an no request tokens available exception."""
         super().__init__(14, "No request tokens available. Please try again later.")
-        
+
+
+class TransformationTimeout(KnownException):
+    """Exception raised when a transformation exceeds its deadline."""
+
+    def __init__(self) -> None:
+        """Initialize a transformation timeout exception."""
+        super().__init__(15, "Transformation took too long and was cancelled.")
+
+
+class ServiceOverloaded(KnownException):
+    """Exception raised when too many transformations are waiting for a worker."""
+
+    def __init__(self) -> None:
+        """Initialize a service overloaded exception."""
+        super().__init__(16, "Too many transformations. Please try again later.")
+
+
+class TooManyBatchItems(KnownException):
+    """Exception raised when a batch contains more models than allowed."""
+
+    def __init__(self, limit: int) -> None:
+        """Initialize a too many batch items exception.
+
+        Args:
+            limit (int): The maximum number of models of a batch.
+        """
+        super().__init__(17, f"A batch may contain at most {limit} diagrams.")
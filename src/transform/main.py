@@ -1,36 +1,61 @@
 """API to transform a given model into a selected direction."""
 
+import hmac
+import json
 import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
 
 import flask
 import functions_framework
-import requests
-from flask import jsonify, make_response
+from flask import make_response
 
+import batch
+import metrics
+import worker_pool
 from exceptions import (
     KnownException,
     MissingEnvironmentVariable,
     PrivateInternalException,
-    TokenCheckUnsuccessful,
     UnexpectedError,
     UnexpectedQueryParameter,
-    NoRequestTokensAvailable,
 )
-from transformer.models.bpmn.bpmn import BPMN
-from transformer.models.pnml.pnml import Pnml
-from transformer.transform_bpmn_to_petrinet.transform import (
-    bpmn_to_workflow_net,
+from transformer.transform import (
+    DIRECTIONS,
+    cache_direction,
+    parse_profile,
+    transform_xml,
+    transform_xml_string,
+    trusted_pnml,
+    warm_up,
 )
-from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
-from transformer.utility.utility import clean_xml_string
+from transformer.utility import result_cache, tracing
+from transformer.utility.tracing import Trace
 
 CHECK_TOKEN_URL = "https://europe-west3-woped-422510.cloudfunctions.net/checkTokens"
+# Characters of a result which is created before its response starts (see
+# `stream_json`), larger results are streamed.
+STREAM_THRESHOLD = 4 * 1024 * 1024
 
 is_force_std_xml_active = os.getenv("FORCE_STD_XML")
 if is_force_std_xml_active is None:
     raise MissingEnvironmentVariable("FORCE_STD_XML")
 
 
+def start_workers():
+    """Fork the workers or import the transformer if there are no workers."""
+    if worker_pool.get_pool() is None:
+        warm_up()
+
+
+# Prepare the transformation in the background, so the cold start does not wait
+# for the schemas of the models.
+if os.getenv("TRANSFORM_WARM_UP", "true") != "false":
+    threading.Thread(target=start_workers, daemon=True).start()
+
+
 @functions_framework.http
 def post_transform(request: flask.Request):
     """HTTP based model transformation API.
@@ -40,60 +65,297 @@ def post_transform(request: flask.Request):
 
     Args:
         request: A request with a parameter "direction" as transformation direction
-        and a form with the xml model "bpmn" or "pnml".
+        and a form with the xml model "bpmn" or "pnml". The optional parameter
+        "cache=false" skips the result cache and "profile=compact|woped|full"
+        selects the written graphics and defaults (see `Profile`).
     """
-    try:
-        if os.getenv("K_SERVICE") is not None:
-            response = requests.get(CHECK_TOKEN_URL)
-            if response.status_code == 400:
-                raise TokenCheckUnsuccessful()
-            if response.status_code == 429:
-                raise NoRequestTokensAvailable()
-
-        if request.method == "OPTIONS":
-            # Handle CORS preflight request
-            response = make_response()
-            response.headers["Access-Control-Allow-Origin"] = "*"
-            response.headers["Access-Control-Allow-Methods"] = "POST,OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = (
-                "Content-Type,Authorization"
+    return handle_request(request, handle_transformation, 1, "transform")
+
+
+@functions_framework.http
+def post_transform_batch(request: flask.Request):
+    """HTTP based batch transformation API.
+
+    Args:
+        request: A request with a NDJSON or multipart body of at most
+        `BATCH_MAX_ITEMS` xml models in mixed directions (see `batch`). The
+        optional parameter "cache" applies to all models. The batch consumes
+        `BATCH_TOKEN_COST` tokens (default 1).
+    """
+    token_cost = int(os.getenv("BATCH_TOKEN_COST", "1"))
+    return handle_request(request, batch.handle_batch, token_cost, "batch")
+
+
+@functions_framework.http
+def get_metrics(request: flask.Request):
+    """Prometheus metrics of all processes of the service (see `metrics`).
+
+    The metrics require the bearer token `METRICS_TOKEN`, without a configured
+    token the endpoint is disabled.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return flask.Response("Metrics are disabled.", 404)
+    expected = f"Bearer {token}".encode()
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), expected
+    ):
+        return flask.Response(
+            "Unauthorized", 401, {"WWW-Authenticate": 'Bearer realm="metrics"'}
+        )
+    text = metrics.get_registry().exposition()
+    return flask.Response(text, mimetype="text/plain; version=0.0.4")
+
+
+def collect_service_metrics():
+    """Return the counters of the result cache and the load of the worker pool."""
+    samples: list[metrics.Sample] = []
+    cache = result_cache.get_cache()
+    if cache is not None:
+        stats = cache.stats()
+        for result, key in [
+            ("memory_hit", "memory_hits"),
+            ("disk_hit", "disk_hits"),
+            ("miss", "misses"),
+        ]:
+            samples.append(
+                ("transform_cache_lookups_total", {"result": result}, stats[key])
             )
-            return response
+    pool = worker_pool.get_pool()
+    if pool is not None:
+        stats = pool.stats()
+        for event in ["timeouts", "rejected", "restarts"]:
+            samples.append(
+                ("transform_worker_pool_events_total", {"event": event}, stats[event])
+            )
+        for state, key in [
+            ("total", "workers"),
+            ("busy", "busy"),
+            ("queued", "queue_depth"),
+        ]:
+            samples.append(
+                ("transform_worker_pool_workers", {"state": state}, stats[key])
+            )
+    return samples
+
+
+metrics.get_registry().add_collector(collect_service_metrics)
+
+
+def check_tokens(count: int) -> Future | None:
+    """Start consuming request tokens of the rate limit if running on Cloud Run."""
+    if os.getenv("K_SERVICE") is None:
+        return None
+    # Imported on first use, `requests` is slow to import.
+    import token_client
+
+    start = time.perf_counter()
+    token_check = token_client.get_client(CHECK_TOKEN_URL).acquire_async(count)
+    token_check.add_done_callback(
+        lambda _: metrics.get_registry().observe(
+            "transform_token_check_duration_seconds", time.perf_counter() - start
+        )
+    )
+    return token_check
+
+
+def handle_request(
+    request: flask.Request,
+    handler: Callable[[flask.Request], flask.Response],
+    token_cost: int,
+    endpoint: str,
+):
+    """Check the tokens, answer CORS preflight requests and handle the exceptions.
+
+    The token check runs concurrently with the handler. Its exceptions take
+    precedence over the result or exceptions of the handler. The stages of the
+    request are traced (see `trace_response`) and its metrics are recorded when
+    the response is closed (see `record_request`).
+    """
+    start = time.perf_counter()
+    trace = tracing.start_trace() if tracing.is_enabled() else None
+    try:
+        result, outcome = handle_exceptions(request, handler, token_cost)
+        response = make_response(result)
+    finally:
+        tracing.stop_trace()
+    if trace is not None:
+        trace_response(request, response, trace)
+    direction = request.args.get("direction") if endpoint == "transform" else "mixed"
+    if direction not in DIRECTIONS and direction != "mixed":
+        direction = "invalid"
+    # The request is not available anymore when the response is closed
+    input_bytes = request.content_length if request.method == "POST" else None
+    response.call_on_close(
+        lambda: record_request(endpoint, direction, outcome, input_bytes, start, trace)
+    )
+    return response
+
+
+def handle_exceptions(
+    request: flask.Request,
+    handler: Callable[[flask.Request], flask.Response],
+    token_cost: int,
+):
+    """Return the response of the handler or the description of an exception.
 
-        return handle_transformation(request)
+    Returns:
+        The response and the outcome ("ok", "known", "internal" or "unexpected").
+    """
+    try:
+        token_check = check_tokens(token_cost)
+        try:
+            response = handle_preflight(request) or handler(request)
+        finally:
+            if token_check is not None:
+                token_check.result()
+        return response, "ok"
     except KnownException as e:
         # Exception with description for the end user.
         print("Known excpetion:\n", str(e))
-        return str(e), 400
+        metrics.get_registry().inc("transform_known_exceptions_total", id=e.id)
+        return (str(e), 400), "known"
     except PrivateInternalException as e:
         # Internal exception with a generic description to the end user.
         print("Internal exception:\n", str(e))
-        return str(e), 400
+        return (str(e), 400), "internal"
     except Exception as e:
         # Not handled exception should be handled in the future.
         print("Unkown exception:\n", str(e))
-        return str(UnexpectedError()), 400
+        return (str(UnexpectedError()), 400), "unexpected"
+
+
+def record_request(
+    endpoint: str,
+    direction: str,
+    outcome: str,
+    input_bytes: int | None,
+    start: float,
+    trace: Trace | None,
+):
+    """Record the metrics of a closed response and write the snapshot if due."""
+    registry = metrics.get_registry()
+    registry.observe(
+        "transform_request_duration_seconds",
+        time.perf_counter() - start,
+        endpoint=endpoint,
+        direction=direction,
+        outcome=outcome,
+    )
+    if input_bytes is not None:
+        registry.observe(
+            "transform_input_bytes",
+            input_bytes,
+            endpoint=endpoint,
+            direction=direction,
+        )
+    if trace is not None:
+        for name, (seconds, _, _) in trace.stages.items():
+            registry.observe("transform_stage_duration_seconds", seconds, stage=name)
+        parse_counts = trace.stages.get("parse", (0, 0, {}))[2]
+        if "nodes" in parse_counts:
+            edges = parse_counts.get("arcs", parse_counts.get("flows", 0))
+            registry.observe(
+                "transform_input_nodes", parse_counts["nodes"], direction=direction
+            )
+            registry.observe("transform_input_arcs", edges, direction=direction)
+    registry.flush_due()
+
+
+def trace_response(request: flask.Request, response: flask.Response, trace: Trace):
+    """Add the `Server-Timing` header and log the trace when the response is closed.
+
+    The header contains the stages which are complete before the response starts,
+    the log line also the stages of a streamed body (e.g. the serialization).
+    """
+    response.headers["Server-Timing"] = trace.server_timing()
+    response.headers["Access-Control-Expose-Headers"] = "Server-Timing"
+    # The request is not available anymore when the response is closed
+    fields = {"path": request.path, "direction": request.args.get("direction")}
+
+    def log_trace():
+        print(trace.log_line(**fields, status=response.status_code))
+
+    response.call_on_close(log_trace)
+
+
+def handle_preflight(request: flask.Request):
+    """Return the response of a CORS preflight request or None."""
+    if request.method != "OPTIONS":
+        return None
+    response = make_response()
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Methods"] = "POST,OPTIONS"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization"
+    return response
 
 
 def handle_transformation(request: flask.Request):
     """Handle the transformation."""
     transform_direction = request.args.get("direction")
-    if transform_direction is None:
+    if transform_direction not in DIRECTIONS:
         raise UnexpectedQueryParameter("direction")
 
-    if transform_direction == "bpmntopnml":
-        bpmn_xml_content = request.form["bpmn"]
-        bpmn = BPMN.from_xml(bpmn_xml_content)
-        transformed_pnml = bpmn_to_workflow_net(bpmn)
-        response = jsonify({"pnml": clean_xml_string(transformed_pnml.to_string())})
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        return response
-    elif transform_direction == "pnmltobpmn":
-        pnml_xml_content = request.form["pnml"]
-        pnml = Pnml.from_xml_str(pnml_xml_content)
-        transformed_bpmn = pnml_to_bpmn(pnml)
-        response = jsonify({"bpmn": clean_xml_string(transformed_bpmn.to_string())})
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        return response
+    input_key, result_key = DIRECTIONS[transform_direction]
+    xml_content = request.form[input_key]
+    is_trusted = trusted_pnml()
+    profile = parse_profile(request.args.get("profile"))
+    pool = worker_pool.get_pool()
+
+    def transform():
+        arguments = (transform_direction, xml_content, is_trusted, profile)
+        if pool is None:
+            return transform_xml(*arguments)
+        trace = tracing.current_trace()
+        if trace is None:
+            return iter([pool.run(transform_xml_string, *arguments)])
+        with tracing.stage("worker"):
+            result, stages = pool.run(
+                tracing.run_traced, transform_xml_string, *arguments
+            )
+        trace.merge(stages)
+        return iter([result])
+
+    cache = result_cache.get_cache()
+    if cache is None or request.args.get("cache", "true") == "false":
+        chunks = transform()
     else:
-        raise UnexpectedQueryParameter("direction")
+        direction = cache_direction(transform_direction, is_trusted, profile)
+        chunks = cache.transform(direction, xml_content, transform)
+    response = stream_json(result_key, chunks)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def stream_json(key: str, chunks: Iterator[str], threshold: int = STREAM_THRESHOLD):
+    """Return a JSON response with the chunks as string value of a key.
+
+    The body is `{key: "".join(chunks)}`. Results up to `threshold` characters
+    are created before the response starts, so errors of the serialization are
+    still handled by `handle_exceptions` and the serialization is traced like
+    the other stages. Larger results are streamed, an error after the start
+    ends the body with the key "error" and the id and message of the exception
+    (like a line of a batch).
+    """
+    head: list[str] = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size > threshold:
+            break
+    else:
+        body = "{" + json.dumps(key) + ":" + json.dumps("".join(head)) + "}\n"
+        return flask.Response(body, mimetype="application/json")
+
+    def generate():
+        yield "{" + json.dumps(key) + ':"' + json.dumps("".join(head))[1:-1]
+        try:
+            for chunk in chunks:
+                yield json.dumps(chunk)[1:-1]
+        except Exception as e:
+            yield '","error":' + json.dumps(batch.error_entry(e)) + "}\n"
+            return
+        yield '"}\n'
+
+    return flask.Response(generate(), mimetype="application/json")
@@ -0,0 +1,292 @@
+"""Prometheus metrics of the transformation service.
+
+The metrics are recorded in a registry per process. With a shared directory every
+process (e.g. gunicorn worker) writes a snapshot of its registry to its own file
+at most every flush interval (checked after each request) and when it exits, the
+metrics endpoint sums up the files of all processes. So the metrics of the other
+processes may be one interval old. Counters and histograms of stopped processes
+are kept, so the totals do not decrease when a worker is replaced. Gauges are
+only summed up over the running processes.
+
+The registry is configured with the environment variables:
+
+- `METRICS_DIR`: Directory of the snapshot files of the processes (default none,
+  only the metrics of the answering process are exposed). It should be emptied
+  when the service starts.
+- `METRICS_FLUSH_SECONDS`: Seconds between the snapshots of a process (default
+  5).
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+_SIZE_BUCKETS = tuple(2**i for i in range(10, 25, 2))
+_COUNT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# name -> (type, help, buckets of histograms)
+METRICS: dict[str, tuple[str, str, tuple[float, ...]]] = {
+    "transform_request_duration_seconds": (
+        "histogram",
+        "Duration of the requests by endpoint, direction and outcome.",
+        _LATENCY_BUCKETS,
+    ),
+    "transform_input_bytes": (
+        "histogram",
+        "Size of the request bodies by endpoint and direction.",
+        _SIZE_BUCKETS,
+    ),
+    "transform_input_nodes": (
+        "histogram",
+        "Number of nodes of the parsed models by direction.",
+        _COUNT_BUCKETS,
+    ),
+    "transform_input_arcs": (
+        "histogram",
+        "Number of arcs (PNML) or flows (BPMN) of the parsed models by direction.",
+        _COUNT_BUCKETS,
+    ),
+    "transform_stage_duration_seconds": (
+        "histogram",
+        "Duration of the traced transformation stages.",
+        _STAGE_BUCKETS,
+    ),
+    "transform_token_check_duration_seconds": (
+        "histogram",
+        "Duration of the rate limit checks.",
+        _LATENCY_BUCKETS,
+    ),
+    "transform_known_exceptions_total": (
+        "counter",
+        "Known exceptions returned to the users by id.",
+        (),
+    ),
+    "transform_cache_lookups_total": (
+        "counter",
+        "Lookups of the result cache by result (memory_hit, disk_hit, miss).",
+        (),
+    ),
+    "transform_worker_pool_events_total": (
+        "counter",
+        "Timeouts, rejected requests and restarts of the worker pool.",
+        (),
+    ),
+    "transform_worker_pool_workers": (
+        "gauge",
+        "Worker processes of the worker pool by state (total, busy, queued).",
+        (),
+    ),
+}
+
+Labels = tuple[tuple[str, str], ...]
+# Collected samples: (name, labels, value)
+Sample = tuple[str, dict[str, str], float]
+
+
+def _labels(labels: dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Registry:
+    """Counters, gauges and histograms of a process with labels."""
+
+    def __init__(self, directory: str | None = None, flush_interval: float = 5):
+        """Create an empty registry.
+
+        Args:
+            directory: Directory of the snapshot files of the processes.
+            flush_interval: Seconds between the snapshots (see `flush_due`).
+        """
+        self.directory = None if directory is None else Path(directory)
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._flushed = -float("inf")
+        self._lock = threading.Lock()
+        # (name, labels) -> value or bucket counts with sum and count
+        self._values: dict[tuple[str, Labels], float | list[float]] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def inc(self, name: str, value: float = 1, **labels: object):
+        """Increase a counter."""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value  # type: ignore
+
+    def observe(self, name: str, value: float, **labels: object):
+        """Add an observation to a histogram."""
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels))
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # bucket counts (incl. +Inf), sum and count
+                counts = self._values[key] = [0.0] * (len(buckets) + 3)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    break
+            else:
+                i = len(buckets)
+            counts[i] += 1  # type: ignore
+            counts[-2] += value  # type: ignore
+            counts[-1] += 1  # type: ignore
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Add a function which returns the current values of counters or gauges.
+
+        E.g. of the counters of the result cache which are kept by the cache.
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Return the values of this process (incl. the collected ones)."""
+        with self._lock:
+            values = {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self._values.items()
+            }
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                values[(name, _labels(labels))] = value
+        return values
+
+    def flush(self):
+        """Write the snapshot of this process to its file in the directory."""
+        if self.directory is None:
+            return
+        path = self.directory / f"{os.getpid()}.json"
+        temp = path.with_suffix(".tmp")
+        values = [
+            [name, list(labels), value]
+            for (name, labels), value in self.snapshot().items()
+        ]
+        temp.write_text(json.dumps({"pid": os.getpid(), "values": values}))
+        os.replace(temp, path)
+        self._flushed = time.monotonic()
+
+    def flush_due(self):
+        """Write the snapshot if the last one is older than the flush interval."""
+        if time.monotonic() - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def collect(self):
+        """Return the values of all processes summed up by metric and labels."""
+        self.flush()
+        if self.directory is None:
+            return self.snapshot()
+        merged: dict[tuple[str, Labels], float | list[float]] = {}
+        for path in self.directory.glob("*.json"):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Removed or replaced meanwhile
+                continue
+            is_running = _is_running(data["pid"])
+            for name, labels, value in data["values"]:
+                if name not in METRICS or (
+                    METRICS[name][0] == "gauge" and not is_running
+                ):
+                    continue
+                key = (name, tuple(tuple(label) for label in labels))
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = value
+                elif isinstance(current, list):
+                    merged[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = current + value
+        return merged
+
+    def exposition(self):
+        """Return the metrics of all processes in the Prometheus text format."""
+        values = self.collect()
+        lines: list[str] = []
+        for name, (kind, help, buckets) in METRICS.items():
+            samples = sorted(
+                (labels, value) for (n, labels), value in values.items() if n == name
+            )
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind != "histogram":
+                    lines.append(f"{name}{_format(labels)} {_number(value)}")
+                    continue
+                cumulative = 0.0
+                for bound, count in zip((*buckets, "+Inf"), value):
+                    cumulative += count
+                    le = (("le", str(bound)),)
+                    lines.append(
+                        f"{name}_bucket{_format(labels + le)} {_number(cumulative)}"
+                    )
+                lines.append(f"{name}_sum{_format(labels)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_format(labels)} {_number(value[-1])}")
+        lines.extend(_hit_ratio(values))
+        return "\n".join(lines) + "\n"
+
+
+def _hit_ratio(values: dict[tuple[str, Labels], float | list[float]]):
+    """Return the lines of the hit ratio of the result cache over all processes."""
+    lookups = {
+        dict(labels)["result"]: value
+        for (name, labels), value in values.items()
+        if name == "transform_cache_lookups_total"
+    }
+    total = sum(lookups.values())  # type: ignore
+    if not total:
+        return []
+    hits = total - lookups.get("miss", 0)  # type: ignore
+    name = "transform_cache_hit_ratio"
+    return [
+        f"# HELP {name} Ratio of the result cache lookups which were hits.",
+        f"# TYPE {name} gauge",
+        f"{name} {_number(hits / total)}",
+    ]
+
+
+def _format(labels: Labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _number(value: float):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _is_running(pid: int):
+    """Return whether a process is running (or is this process)."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running process of another user
+        pass
+    return True
+
+
+_registry: Registry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the registry of this process configured by the environment."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = Registry(
+                os.getenv("METRICS_DIR"),
+                float(os.getenv("METRICS_FLUSH_SECONDS", "5")),
+            )
+    return _registry
@@ -0,0 +1,8 @@
+"""This is the __init__ module for the benchmarks.
+
+Loads the env variables from a .env like the conftest of the tests.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
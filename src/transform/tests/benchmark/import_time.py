@@ -0,0 +1,62 @@
+"""Import time of the entry point `main`, i.e. the cold start of the function.
+
+Run from `src/transform` with `python -m tests.benchmark.import_time`. The import
+is measured in a new interpreter with `python -X importtime` and fails if it
+exceeds the budget `IMPORT_TIME_BUDGET_MS` (default 1000).
+"""
+
+import os
+import subprocess
+import sys
+
+# Modules which must only be imported by the first transformation.
+DEFERRED_MODULES = [
+    "pydantic_xml",
+    "requests",
+    "transformer.models.bpmn.bpmn",
+    "transformer.models.pnml.pnml",
+]
+REPEAT = 5
+
+
+def import_times(module: str = "main"):
+    """Return the self and cumulative import time in ms of all imported modules."""
+    env = os.environ | {
+        "FORCE_STD_XML": "true",
+        "TRANSFORM_WORKERS": "0",
+        "TRANSFORM_WARM_UP": "false",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, tuple[float, float]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+
+def main():
+    """Print the best import time of `main` and its slowest imports."""
+    budget = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1000"))
+    runs = [import_times() for _ in range(REPEAT)]
+    best = min(runs, key=lambda times: times["main"][1])
+    print(f"import main: {best['main'][1]:.1f} ms (budget {budget:.0f} ms)")
+    slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_, cumulative) in slowest[1:16]:
+        print(f"{name:<50}{cumulative:>10.1f}")
+    deferred = [name for name in DEFERRED_MODULES if name in best]
+    if deferred:
+        sys.exit(f"Imported at cold start: {', '.join(deferred)}")
+    if best["main"][1] > budget:
+        sys.exit("Import time budget exceeded")
+
+
+if __name__ == "__main__":
+    main()
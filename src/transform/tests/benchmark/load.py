@@ -0,0 +1,151 @@
+"""Load test of the transform endpoint with the development and production server.
+
+Run from `src/transform` with `python -m tests.benchmark.load`. Each server
+(`app.py` with the Flask development server, `gunicorn.conf.py` with gunicorn) is
+started on a free port and receives concurrent requests with keep-alive
+connections for a while. The throughput and latency of the servers are printed,
+e.g.
+
+    python -m tests.benchmark.load --concurrency 16 --duration 20 --size 200
+
+An already running server is measured with `--url`. The result cache is skipped
+(`cache=false`), so every request is transformed.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from tests.testgeneration.synthetic import SyntheticConfig, generate_workflow_net
+
+SRC = Path(__file__).parents[3]
+# server -> command started in `src`
+SERVERS = {
+    "dev": [sys.executable, "app.py"],
+    "gunicorn": [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"],
+}
+
+
+def free_port():
+    """Return a free local port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(server: str, port: int):
+    """Start a server and return its process when it answers the health check."""
+    env = os.environ | {
+        "PORT": str(port),
+        "FORCE_STD_XML": "true",
+        "PYTHONPATH": os.pathsep.join([str(SRC / "transform"), str(SRC / "health")]),
+        "GUNICORN_MAX_REQUESTS": "0",
+    }
+    process = subprocess.Popen(
+        SERVERS[server],
+        cwd=SRC,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{server} server did not start")
+
+
+def load(url: str, pnml: str, concurrency: int, duration: float):
+    """Return the latencies in s and the number of errors of concurrent requests."""
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    end = time.monotonic() + duration
+
+    def client():
+        nonlocal errors
+        with requests.Session() as session:
+            while time.monotonic() < end:
+                start = time.perf_counter()
+                try:
+                    response = session.post(
+                        url,
+                        params={"direction": "pnmltobpmn", "cache": "false"},
+                        data={"pnml": pnml},
+                        timeout=60,
+                    )
+                    ok = response.status_code == 200
+                except requests.RequestException:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def report(name: str, latencies: list[float], errors: int, duration: float):
+    """Print the throughput and the latency percentiles of a server."""
+    if len(latencies) < 2:
+        print(f"{name:<12}{'no successful requests':>40}{errors:>8}")
+        return
+    p = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<12}{len(latencies) / duration:>10.1f}"
+        f"{p[49] * 1000:>10.1f}{p[94] * 1000:>10.1f}{p[98] * 1000:>10.1f}"
+        f"{errors:>8}"
+    )
+
+
+def main():
+    """Measure the servers one after another."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS))
+    parser.add_argument("--url", help="transform endpoint of a running server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--size", type=int, default=200, help="nodes of the model")
+    args = parser.parse_args()
+
+    pnml = generate_workflow_net(SyntheticConfig(args.size, lanes=2)).to_string()
+    columns = "".join(f"{c:>10}" for c in ["req/s", "p50 ms", "p95 ms", "p99 ms"])
+    print(f"{'server':<12}{columns}{'errors':>8}")
+    if args.url:
+        latencies, errors = load(args.url, pnml, args.concurrency, args.duration)
+        report("url", latencies, errors, args.duration)
+        return
+    for server in args.servers:
+        port = free_port()
+        process = start_server(server, port)
+        try:
+            url = f"http://127.0.0.1:{port}/transform"
+            # Warm up the transformation of all workers
+            load(url, pnml, args.concurrency, 2)
+            latencies, errors = load(url, pnml, args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait()
+        report(server, latencies, errors, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Size and latency of the output profiles over the test corpus.
+
+Run from `src/transform` with `python -m tests.benchmark.profiles`. The cases of
+the regression gate (supported test cases, e2e payloads and synthetic models, see
+`load_cases`) are serialized and transformed from XML with every profile (see
+`Profile`). The bytes of the responses and the medians of the transformations
+are printed per direction and for the largest synthetic case, e.g.
+
+    python -m tests.benchmark.profiles --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+
+from tests.benchmark.regression import SYNTHETIC_SIZES, load_cases
+
+from transformer.transform import transform_xml_string
+from transformer.utility.profile import Profile
+
+
+def measure(direction: str, xml: str, profile: Profile, repeat: int):
+    """Return the bytes of the response and the median ms of the transformation."""
+    result = transform_xml_string(direction, xml, False, profile)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transform_xml_string(direction, xml, False, profile)
+        times.append(time.perf_counter() - start)
+    return len(result.encode()), statistics.median(times) * 1000
+
+
+def report(name: str, totals: dict[Profile, list[float]]):
+    """Print the bytes and ms of the profiles relative to the full profile."""
+    full_bytes, full_ms = totals[Profile.full]
+    for profile, (size, ms) in totals.items():
+        print(
+            f"{name:<28}{profile.value:<9}{size / 1000:>12.1f}"
+            f"{size / full_bytes:>8.0%}{ms:>12.1f}{ms / full_ms:>8.0%}"
+        )
+
+
+def main():
+    """Measure the corpus with every profile."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    largest = f"synthetic_{max(SYNTHETIC_SIZES)}"
+    totals: dict[str, dict[Profile, list[float]]] = {}
+    for case in load_cases():
+        direction = case.name.split("/")[0]
+        # Serializing a BPMN lays it out, so a copy is serialized
+        xml = case.source.model_copy(deep=True).to_string()
+        names = [f"{direction} (corpus)"]
+        if case.name.endswith(f"/{largest}"):
+            names.append(case.name)
+        for profile in Profile:
+            size, ms = measure(direction, xml, profile, args.repeat)
+            for name in names:
+                total = totals.setdefault(name, {}).setdefault(profile, [0.0, 0.0])
+                total[0] += size
+                total[1] += ms
+
+    print(f"{'case':<28}{'profile':<9}{'kB':>12}{'':>8}{'ms':>12}{'':>8}")
+    for name, profiles in sorted(totals.items()):
+        report(name, profiles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Performance regression gate over the test corpus.
+
+Run from `src/transform` with `python -m tests.benchmark.regression`. Every
+supported test case, the e2e payloads and large synthetic models are transformed
+and compared with their expected model after warm-up runs. The medians of the
+transformation and the comparison are compared with the committed baseline
+`regression_baseline.json`, the gate fails if a case is slower than the baseline
+times `REGRESSION_THRESHOLD` (default 1.5) plus a slack for the noise of small
+cases. The baseline is scaled by a calibration workload to the speed of the
+machine. Update the baseline after an intended change with
+
+    python -m tests.benchmark.regression --update
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+from tests.testgeneration.testcases.bpmn_to_pnml.supported_cases import (
+    all_cases as supported_cases_bpmn,
+)
+from tests.testgeneration.testcases.bpmn_to_pnml.supported_cases_workflow import (
+    supported_cases_workflow_bpmn,
+)
+from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases import (
+    all_cases as supported_cases_pnml,
+)
+from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases_workflow import (
+    supported_cases_workflow_pnml,
+)
+
+from transformer.equality.bpmn import compare_bpmn
+from transformer.equality.petrinet import compare_pnml
+from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.pnml.pnml import Pnml
+from transformer.transform_bpmn_to_petrinet.transform import bpmn_to_workflow_net
+from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+from transformer.utility.result_cache import transformer_version
+
+BASELINE = Path(__file__).with_name("regression_baseline.json")
+DIAGRAMS = "tests/assets/diagrams"
+SYNTHETIC_SIZES = [1000, 5000]
+WARM_UP = 2
+REPEAT = 7
+# Absolute slack in ms added to the allowed time of a case.
+SLACK_MS = 2.0
+PHASES = ["transform", "compare"]
+
+
+class Case(NamedTuple):
+    """A benchmarked case.
+
+    Attributes:
+        name: Unique name of the case (direction and name of the test case).
+        source: Source model, it is copied before each transformation.
+        expected: Model which is compared with the transformed model.
+        transform: Transformation of the source model.
+        compare: Comparison of the expected and the transformed model.
+    """
+
+    name: str
+    source: Any
+    expected: Any
+    transform: Callable[[Any], Any]
+    compare: Callable[[Any, Any], Any]
+
+
+def _compare_nets(expected: Pnml, transformed: Pnml):
+    return compare_pnml(expected.net, transformed.net)
+
+
+def _bpmn_to_pnml(name: str, bpmn: BPMN, expected: Pnml):
+    return Case(
+        f"bpmntopnml/{name}", bpmn, expected, bpmn_to_workflow_net, _compare_nets
+    )
+
+
+def _pnml_to_bpmn(name: str, pnml: Pnml, expected: BPMN):
+    return Case(f"pnmltobpmn/{name}", pnml, expected, pnml_to_bpmn, compare_bpmn)
+
+
+def read_text(path: str):
+    """Return the content of a file."""
+    return Path(path).read_text(encoding="utf-8")
+
+
+def load_cases():
+    """Return the cases of the test corpus, the e2e payloads and synthetic models.
+
+    The expected model of a synthetic model is its own transformation.
+    """
+    cases: list[Case] = []
+    for bpmn, pnml, name in supported_cases_bpmn + supported_cases_workflow_bpmn:
+        cases.append(_bpmn_to_pnml(name, bpmn, pnml))
+    for bpmn, pnml, name in supported_cases_pnml + supported_cases_workflow_pnml:
+        cases.append(_pnml_to_bpmn(name, pnml, bpmn))
+
+    cases.append(
+        _bpmn_to_pnml(
+            "e2e",
+            BPMN.from_xml(read_text(f"{DIAGRAMS}/bpmn/e2e_payload.xml")),
+            Pnml.from_xml_str(read_text(f"{DIAGRAMS}/pnml/e2e_expected_response.xml")),
+        )
+    )
+    cases.append(
+        _pnml_to_bpmn(
+            "e2e",
+            Pnml.from_xml_str(read_text(f"{DIAGRAMS}/pnml/e2e_payload.xml")),
+            BPMN.from_xml(read_text(f"{DIAGRAMS}/bpmn/e2e_expected_response.xml")),
+        )
+    )
+
+    for size in SYNTHETIC_SIZES:
+        config = SyntheticConfig(size, subprocesses=3, lanes=3)
+        bpmn, pnml = generate_bpmn(config), generate_workflow_net(config)
+        cases.append(
+            _bpmn_to_pnml(
+                f"synthetic_{size}",
+                bpmn,
+                bpmn_to_workflow_net(bpmn.model_copy(deep=True)),
+            )
+        )
+        cases.append(
+            _pnml_to_bpmn(
+                f"synthetic_{size}", pnml, pnml_to_bpmn(pnml.model_copy(deep=True))
+            )
+        )
+    return cases
+
+
+def run(case: Case):
+    """Return the seconds of transforming and comparing a case once."""
+    # The transformation changes the source model
+    source = case.source.model_copy(deep=True)
+    start = time.perf_counter()
+    transformed = case.transform(source)
+    transformed_at = time.perf_counter()
+    case.compare(case.expected, transformed)
+    end = time.perf_counter()
+    return transformed_at - start, end - transformed_at
+
+
+def measure(case: Case, warm_up: int = WARM_UP, repeat: int = REPEAT):
+    """Return the median ms of the phases of a case after the warm-up runs."""
+    for _ in range(warm_up):
+        run(case)
+    runs = [run(case) for _ in range(repeat)]
+    return {
+        phase: statistics.median(r[i] for r in runs) * 1000
+        for i, phase in enumerate(PHASES)
+    }
+
+
+def calibrate(repeat: int = REPEAT):
+    """Return the best ms of a fixed workload to compare the speed of machines.
+
+    The workload is similar to the transformation (dicts, sets and objects).
+    """
+
+    def workload():
+        nodes = {
+            f"node_{i}": {f"node_{(i * 7 + j) % 5000}" for j in range(4)}
+            for i in range(5000)
+        }
+        incoming: dict[str, list[str]] = {}
+        for source, targets in nodes.items():
+            for target in targets:
+                incoming.setdefault(target, []).append(source)
+        return sorted(incoming, key=lambda n: len(incoming[n]))
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def find_regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    scale: float = 1,
+    threshold: float = 1.5,
+    slack_ms: float = SLACK_MS,
+):
+    """Return the regressions of the results compared to the baseline.
+
+    Args:
+        results: Median ms per phase of the cases.
+        baseline: Median ms per phase of the cases of the baseline.
+        scale: Factor of the speed of the baseline machine to the current one.
+        threshold: Allowed factor of the scaled baseline.
+        slack_ms: Allowed absolute difference in addition to the threshold.
+
+    Returns:
+        Tuples of case, phase, baseline and current ms. Cases without baseline
+        are not included.
+    """
+    regressions: list[tuple[str, str, float, float]] = []
+    for name, phases in results.items():
+        if name not in baseline:
+            continue
+        for phase, current in phases.items():
+            expected = baseline[name].get(phase)
+            if expected is None:
+                continue
+            if current > expected * scale * threshold + slack_ms:
+                regressions.append((name, phase, expected * scale, current))
+    return regressions
+
+
+def main():
+    """Measure all cases and compare them with or store them as baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="store the baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--warm-up", type=int, default=WARM_UP)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--filter", default="", help="substring of the case names")
+    args = parser.parse_args()
+    threshold = float(os.getenv("REGRESSION_THRESHOLD", "1.5"))
+
+    cases = [case for case in load_cases() if args.filter in case.name]
+    calibration = calibrate(args.repeat)
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, args.warm_up, args.repeat)
+        print(
+            f"{case.name:<70}"
+            + "".join(f"{results[case.name][p]:>12.2f}" for p in PHASES)
+        )
+
+    if args.update:
+        report = {
+            "version": transformer_version(),
+            "python": ".".join(map(str, sys.version_info[:3])),
+            "calibration_ms": round(calibration, 3),
+            "cases": {
+                name: {phase: round(ms, 3) for phase, ms in phases.items()}
+                for name, phases in results.items()
+            },
+        }
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Stored in {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    scale = calibration / baseline["calibration_ms"]
+    print(f"machine speed factor {scale:.2f}, threshold {threshold:.2f}")
+    missing = [name for name in results if name not in baseline["cases"]]
+    if missing:
+        print(f"No baseline for {', '.join(missing)}")
+    regressions = find_regressions(results, baseline["cases"], scale, threshold)
+    for name, phase, expected, current in regressions:
+        print(f"{name} {phase}: {current:.2f} ms (baseline {expected:.2f} ms)")
+    if regressions:
+        sys.exit(f"{len(regressions)} performance regressions")
+
+
+if __name__ == "__main__":
+    main()
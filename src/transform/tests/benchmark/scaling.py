@@ -0,0 +1,151 @@
+"""Scaling benchmark of both directions on large synthetic models.
+
+Run from `src/transform` with `python -m tests.benchmark.scaling`. The models are
+generated by `tests.testgeneration.synthetic` for each size. The time of parsing,
+preprocessing, transforming, laying out the diagram and serializing (best of the
+repeats) and the peak memory of the whole transformation (separate run with
+`tracemalloc`) are printed and stored as JSON to compare them with other
+versions, e.g.
+
+    python -m tests.benchmark.scaling --sizes 100 1000 --output before.json
+"""
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+
+from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.pnml.pnml import Pnml
+from transformer.transform_bpmn_to_petrinet.transform import bpmn_to_workflow_net
+from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+from transformer.utility import tracing
+from transformer.utility.result_cache import transformer_version
+
+SIZES = [100, 1000, 10000, 100000]
+# Number of nodes transformed per size to choose the default repeats (at most 5).
+REPEAT_NODES = 5000
+PHASES = ["parse", "preprocess", "transform", "layout", "serialize"]
+
+# direction -> (generator, parser, transformation)
+DIRECTIONS: dict[str, tuple[Callable, Callable, Callable]] = {
+    "bpmntopnml": (generate_bpmn, BPMN.from_xml, bpmn_to_workflow_net),
+    "pnmltobpmn": (generate_workflow_net, Pnml.from_xml_str, pnml_to_bpmn),
+}
+
+
+def run(direction: str, xml: str):
+    """Return the seconds of the phases of transforming a XML in a direction."""
+    _, parse, transform = DIRECTIONS[direction]
+    trace = tracing.start_trace()
+    try:
+        start = time.perf_counter()
+        model = parse(xml)
+        parsed = time.perf_counter()
+        result = transform(model)
+        transformed = time.perf_counter()
+        result.to_string()
+        end = time.perf_counter()
+    finally:
+        tracing.stop_trace()
+    seconds = {name: stage[0] for name, stage in trace.stages.items()}
+    preprocess = seconds["preprocess"]
+    # The net is laid out by the transformation, the BPMN on serialization
+    net_layout = seconds.get("layout", 0)
+    bpmn_layout = seconds.get("set_graphics", 0)
+    return {
+        "parse": parsed - start,
+        "preprocess": preprocess,
+        "transform": transformed - parsed - preprocess - net_layout,
+        "layout": net_layout + bpmn_layout,
+        "serialize": end - transformed - bpmn_layout,
+    }
+
+
+def peak_memory(direction: str, xml: str):
+    """Return the peak of the allocated bytes of transforming a XML."""
+    _, parse, transform = DIRECTIONS[direction]
+    tracemalloc.start()
+    try:
+        transform(parse(xml)).to_string()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(direction: str, config: SyntheticConfig, repeat: int):
+    """Return the result of a direction and size."""
+    generate = DIRECTIONS[direction][0]
+    model = generate(config)
+    counts = (model.process if direction == "bpmntopnml" else model.net).element_counts()
+    xml = model.to_string()
+    runs = [run(direction, xml) for _ in range(repeat)]
+    return {
+        "direction": direction,
+        "size": config.nodes,
+        **counts,
+        "input_bytes": len(xml.encode()),
+        **{f"{p}_ms": min(r[p] for r in runs) * 1000 for p in PHASES},
+        "total_ms": min(sum(r.values()) for r in runs) * 1000,
+        "peak_memory_bytes": peak_memory(direction, xml),
+    }
+
+
+def main():
+    """Print and store the results of all directions and sizes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--directions", nargs="+", default=list(DIRECTIONS))
+    parser.add_argument("--repeat", type=int, help="default depends on the size")
+    parser.add_argument("--subprocesses", type=int, default=3)
+    parser.add_argument("--lanes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="scaling.json")
+    args = parser.parse_args()
+
+    results = []
+    header = f"{'direction':<12}{'size':>8}" + "".join(f"{p:>12}" for p in PHASES)
+    print(header + f"{'total':>12}{'peak MiB':>10}  (ms)")
+    for size in args.sizes:
+        config = SyntheticConfig(
+            size, subprocesses=args.subprocesses, lanes=args.lanes, seed=args.seed
+        )
+        repeat = args.repeat or max(1, min(5, REPEAT_NODES // size))
+        for direction in args.directions:
+            result = measure(direction, config, repeat)
+            results.append(result)
+            print(
+                f"{direction:<12}{size:>8}"
+                + "".join(f"{result[f'{p}_ms']:>12.1f}" for p in PHASES)
+                + f"{result['total_ms']:>12.1f}"
+                + f"{result['peak_memory_bytes'] / 2**20:>10.1f}"
+            )
+
+    report = {
+        "version": transformer_version(),
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "subprocesses": args.subprocesses,
+            "lanes": args.lanes,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Stored in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
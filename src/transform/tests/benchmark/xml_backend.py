@@ -0,0 +1,97 @@
+"""Benchmark of the XML backends on the test corpus.
+
+Run from `src/transform` with `python -m tests.benchmark.xml_backend`.
+"""
+
+import glob
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+
+from tests.testgeneration.testcases.bpmn_to_pnml.supported_cases import (
+    all_cases as supported_cases_bpmn,
+)
+from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases import (
+    all_cases as supported_cases_pnml,
+)
+
+from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.pnml.pnml import Pnml
+from transformer.utility import xml_backend
+
+ASSETS = "tests/assets"
+REPEAT = 5
+
+
+def read_text(path: str):
+    """Return the content of a file."""
+    return Path(path).read_text()
+
+
+def load_corpus():
+    """Return the BPMN and PNML documents of the assets and test cases."""
+    bpmn = [read_text(p) for p in glob.glob(f"{ASSETS}/**/*.bpmn", recursive=True)]
+    pnml = [read_text(p) for p in glob.glob(f"{ASSETS}/**/*.pnml", recursive=True)]
+    for case_bpmn, case_pnml, _ in supported_cases_bpmn + supported_cases_pnml:
+        bpmn.append(case_bpmn.model_copy(deep=True).to_string())
+        pnml.append(case_pnml.model_copy(deep=True).to_string())
+    return bpmn, pnml
+
+
+def parse_all(function: Callable, documents: list[str]):
+    """Return the models of all documents which can be parsed."""
+    models = []
+    for document in documents:
+        try:
+            models.append(function(document))
+        except Exception:
+            pass
+    return models
+
+
+def measure(function: Callable, documents: list):
+    """Return the best total time in ms of applying a function to all documents."""
+
+    def run():
+        for document in documents:
+            try:
+                function(document)
+            except Exception:
+                # e.g. not supported elements, the time is still measured
+                pass
+
+    return min(timeit.repeat(run, number=1, repeat=REPEAT)) * 1000
+
+
+def serialize_tree(model: Pnml):
+    """Return the XML of a model serialized by the element tree of pydantic_xml."""
+    return xml_backend.tostring(model.to_xml_tree())
+
+
+def main():
+    """Print the time of parsing and serializing the corpus per backend."""
+    bpmn_docs, pnml_docs = load_corpus()
+    bpmn_models = parse_all(BPMN.from_xml, bpmn_docs)
+    pnml_models = parse_all(Pnml.from_xml_str, pnml_docs)
+    operations: list[tuple[str, Callable, list]] = [
+        ("BPMN.from_xml", BPMN.from_xml, bpmn_docs),
+        ("BPMN.from_xml_validated", BPMN.from_xml_validated, bpmn_docs),
+        ("Pnml.from_xml_str", Pnml.from_xml_str, pnml_docs),
+        ("BPMN.to_string", BPMN.to_string, bpmn_models),
+        ("Pnml.to_string", Pnml.to_string, pnml_models),
+        ("Pnml.to_xml_tree", serialize_tree, pnml_models),
+    ]
+    backends = xml_backend.available_backends()
+    print(f"{len(bpmn_docs)} BPMN and {len(pnml_docs)} PNML documents (ms)")
+    print(f"{'operation':<26}" + "".join(f"{b:>10}" for b in backends))
+    for name, function, documents in operations:
+        times = []
+        for backend in backends:
+            xml_backend.set_backend(backend)
+            times.append(measure(function, documents))
+        print(f"{name:<26}" + "".join(f"{t:>10.1f}" for t in times))
+    xml_backend.set_backend()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Generator of large random BPMNs and workflow nets for benchmarks.
+
+The models are block structured: a sequence of tasks, gateway blocks (a split
+and a matching join with a sequence per branch) and subprocesses. The same
+random block tree can be emitted as BPMN (`generate_bpmn`) or as workflow net in
+the format of WoPeD (`generate_workflow_net`), so both directions are measured
+on equivalent models. The size is the number of BPMN nodes (tasks, events,
+gateways, subprocesses and their inner nodes), a workflow net has about twice as
+many places and transitions.
+"""
+
+import random
+from typing import NamedTuple
+
+from tests.testgeneration.bpmn.utility import create_bpmn
+from tests.testgeneration.pnml.helper_workflow import create_operator_transition
+from tests.testgeneration.pnml.utility import create_petri_net
+
+from transformer.models.bpmn.base import GenericBPMNNode
+from transformer.models.bpmn.bpmn import (
+    AndGateway,
+    Collaboration,
+    EndEvent,
+    IntermediateCatchEvent,
+    Lane,
+    LaneSet,
+    OrGateway,
+    Participant,
+    StartEvent,
+    Task,
+    UserTask,
+    XorGateway,
+)
+from transformer.models.pnml.base import (
+    NetElement,
+    OrganizationUnit,
+    Resources,
+    Role,
+    ToolspecificGlobal,
+)
+from transformer.models.pnml.pnml import Page, Place, Transition
+from transformer.models.pnml.workflow import WorkflowBranchingType
+
+ORGANIZATION = "synthetic"
+
+
+class SyntheticConfig(NamedTuple):
+    """Parameters of a random model.
+
+    Attributes:
+        nodes: Number of BPMN nodes.
+        xor: Weight of exclusive gateway blocks.
+        and_: Weight of parallel gateway blocks.
+        or_: Weight of inclusive gateway blocks (exclusive in workflow nets, which
+            have no inclusive operator).
+        gateway_ratio: Probability that the next block is a gateway block.
+        max_branches: Maximum number of branches of a gateway block.
+        depth: Maximum nesting depth of the gateway blocks.
+        subprocesses: Number of subprocesses in the top level sequence.
+        lanes: Number of lanes of the user tasks (0 creates tasks without pool).
+        triggers: Probability of a time or message trigger before a task.
+        seed: Seed of the random generator.
+    """
+
+    nodes: int
+    xor: float = 1
+    and_: float = 1
+    or_: float = 0.2
+    gateway_ratio: float = 0.15
+    max_branches: int = 3
+    depth: int = 4
+    subprocesses: int = 0
+    lanes: int = 0
+    triggers: float = 0.05
+    seed: int = 0
+
+
+# Blocks of the generated tree:
+# ("task", id, trigger ("time", "message" or None), lane or None)
+# ("gateway", id, kind ("xor", "and" or "or"), branches)
+# ("subprocess", id, blocks, lane or None)
+Block = tuple
+
+
+class _Generator:
+    """Random block tree of a configuration."""
+
+    def __init__(self, config: SyntheticConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.count = 0
+        self.lanes = [f"lane_{i}" for i in range(config.lanes)]
+
+    def id(self, prefix: str):
+        self.count += 1
+        return f"{prefix}_{self.count}"
+
+    def lane(self):
+        return self.random.choice(self.lanes) if self.lanes else None
+
+    def split(self, budget: int, parts: int):
+        """Return a random partition of the budget in parts of at least 1."""
+        cuts = sorted(self.random.sample(range(1, budget), parts - 1))
+        return [b - a for a, b in zip([0, *cuts], [*cuts, budget])]
+
+    def sequence(
+        self, budget: int, depth: int, lane: str | None = None, in_or: bool = False
+    ) -> list[Block]:
+        """Return blocks with the budget of nodes (at least one task).
+
+        The tasks are in the lane if given, otherwise in random lanes. Inclusive
+        gateways are not nested in inclusive gateways, the transformation does not
+        support them.
+        """
+        config = self.config
+        blocks: list[Block] = []
+        while budget > 0 or not blocks:
+            if (
+                depth < config.depth
+                and budget >= 5
+                and self.random.random() < config.gateway_ratio
+            ):
+                width = self.random.randint(2, min(config.max_branches, budget - 2))
+                inner = self.random.randint(width, budget - 2)
+                kind = self.random.choices(
+                    ["xor", "and", "or"],
+                    [config.xor, config.and_, 0 if in_or else config.or_],
+                )[0]
+                branches = [
+                    self.sequence(share, depth + 1, lane, in_or or kind == "or")
+                    for share in self.split(inner, width)
+                ]
+                blocks.append(("gateway", self.id("gw"), kind, branches))
+                budget -= inner + 2
+                continue
+            trigger = None
+            if budget >= 2 and self.random.random() < config.triggers:
+                trigger = self.random.choice(["time", "message"])
+                budget -= 1
+            blocks.append(("task", self.id("task"), trigger, lane or self.lane()))
+            budget -= 1
+        return blocks
+
+    def process(self) -> list[Block]:
+        """Return the top level blocks with the subprocesses."""
+        config = self.config
+        # Start and end events of the process and the subprocesses
+        budget = max(1, config.nodes - 2 - 3 * config.subprocesses)
+        shares = [budget]
+        if config.subprocesses:
+            top = max(1, budget // (config.subprocesses + 1))
+            inner = max(1, (budget - top) // config.subprocesses)
+            shares = [top] + [inner] * config.subprocesses
+        blocks = self.sequence(shares[0], 0)
+        for share in shares[1:]:
+            # The tasks of a subprocess are in the lane of the subprocess
+            id, lane = self.id("sub"), self.lane()
+            subprocess = ("subprocess", id, self.sequence(share, 0, lane), lane)
+            blocks.insert(self.random.randint(0, len(blocks)), subprocess)
+        return blocks
+
+
+_BPMN_GATEWAYS = {"xor": XorGateway, "and": AndGateway, "or": OrGateway}
+
+
+def _bpmn_rows(
+    blocks: list[Block],
+    first: GenericBPMNNode,
+    last: GenericBPMNNode,
+    rows: list[list[GenericBPMNNode]],
+    lanes: dict[str, list[str]] | None,
+):
+    """Add the rows of nodes from the first to the last node of a sequence.
+
+    The ids of the nodes are added to their lanes if given (top level process).
+    """
+    chain = [first]
+    for block in blocks:
+        if block[0] == "task":
+            _, id, trigger, lane = block
+            if trigger == "time":
+                chain.append(IntermediateCatchEvent.create_time_event(f"{id}_trigger"))
+            elif trigger == "message":
+                chain.append(
+                    IntermediateCatchEvent.create_message_event(f"{id}_trigger")
+                )
+            if lane is None:
+                chain.append(Task(id=id, name=id))
+            else:
+                chain.append(UserTask(id=id, name=id))
+            if lanes is not None and lane is not None:
+                lanes[lane].append(id)
+                if trigger is not None:
+                    lanes[lane].append(f"{id}_trigger")
+        elif block[0] == "gateway":
+            _, id, kind, branches = block
+            gateway = _BPMN_GATEWAYS[kind]
+            split, join = gateway(id=f"{id}_split"), gateway(id=f"{id}_join")
+            chain.append(split)
+            rows.append(chain)
+            for branch in branches:
+                _bpmn_rows(branch, split, join, rows, lanes)
+            chain = [join]
+        else:
+            _, id, inner_blocks, lane = block
+            inner_rows: list[list[GenericBPMNNode]] = []
+            _bpmn_rows(
+                inner_blocks,
+                StartEvent(id=f"{id}_start"),
+                EndEvent(id=f"{id}_end"),
+                inner_rows,
+                None,
+            )
+            subprocess = create_bpmn(id, inner_rows).process
+            subprocess.name = id
+            chain.append(subprocess)
+            if lanes is not None and lane is not None:
+                lanes[lane].append(id)
+    chain.append(last)
+    rows.append(chain)
+
+
+def generate_bpmn(config: SyntheticConfig):
+    """Return a random block structured BPMN of a configuration."""
+    generator = _Generator(config)
+    blocks = generator.process()
+    lanes: dict[str, list[str]] = {lane: [] for lane in generator.lanes}
+    rows: list[list[GenericBPMNNode]] = []
+    _bpmn_rows(blocks, StartEvent(id="start"), EndEvent(id="end"), rows, lanes)
+    bpmn = create_bpmn(f"synthetic_{config.nodes}", rows)
+    if generator.lanes:
+        # The lanes contain every node of the top level process
+        lanes_of_tasks = {id for ids in lanes.values() for id in ids}
+        for node in bpmn.process._flatten_node_typ_map():
+            if node.id not in lanes_of_tasks:
+                lanes[generator.lane()].append(node.id)  # type: ignore
+        bpmn.collaboration = Collaboration(
+            id="collaboration",
+            participant=Participant(
+                id="participant", name=ORGANIZATION, processRef=bpmn.process.id
+            ),
+        )
+        bpmn.process.lane_sets.add(
+            LaneSet(
+                id="lane_set",
+                lanes={
+                    Lane(id=lane, name=lane, flowNodeRefs=set(ids))
+                    for lane, ids in lanes.items()
+                },
+            )
+        )
+    return bpmn
+
+
+def _net_rows(
+    blocks: list[Block],
+    first: Place,
+    last: Place,
+    rows: list[list[NetElement]],
+    pages: list[Page],
+):
+    """Add the rows of net elements from the first to the last place.
+
+    The pages of the subprocesses are added to the pages.
+    """
+    chain: list[NetElement] = [first]
+    for i, block in enumerate(blocks):
+        place_in = chain[-1]
+        place_out = last if i == len(blocks) - 1 else Place(id=f"{block[1]}_out")
+        if block[0] == "task":
+            _, id, trigger, lane = block
+            transition = Transition.create(id=id, name=id)
+            if trigger == "time":
+                transition.mark_as_workflow_time()
+            elif trigger == "message":
+                transition.mark_as_workflow_message()
+            if lane is not None:
+                transition.mark_as_workflow_resource(lane, ORGANIZATION)
+            chain.extend([transition, place_out])
+        elif block[0] == "gateway":
+            _, id, kind, branches = block
+            rows.append(chain)
+            if kind == "and":
+                split = create_operator_transition(id, 1, WorkflowBranchingType.AndSplit)
+                join = create_operator_transition(
+                    f"{id}_join", 1, WorkflowBranchingType.AndJoin
+                )
+                rows.extend([[place_in, split], [join, place_out]])
+            for j, branch in enumerate(branches, 1):
+                branch_in = Place(id=f"{id}_branch_{j}_in")
+                branch_out = Place(id=f"{id}_branch_{j}_out")
+                if kind == "and":
+                    rows.extend([[split, branch_in], [branch_out, join]])
+                else:
+                    split_j = create_operator_transition(
+                        id, j, WorkflowBranchingType.XorSplit
+                    )
+                    join_j = create_operator_transition(
+                        f"{id}_join", j, WorkflowBranchingType.XorJoin
+                    )
+                    rows.extend(
+                        [[place_in, split_j, branch_in], [branch_out, join_j, place_out]]
+                    )
+                _net_rows(branch, branch_in, branch_out, rows, pages)
+            chain = [place_out]
+        else:
+            _, id, inner_blocks, lane = block
+            transition = Transition.create(id=id, name=id).mark_as_workflow_subprocess()
+            if lane is not None:
+                transition.mark_as_workflow_resource(lane, ORGANIZATION)
+            chain.extend([transition, place_out])
+            inner_rows: list[list[NetElement]] = []
+            inner_pages: list[Page] = []
+            _net_rows(
+                inner_blocks,
+                Place(id=place_in.id),
+                Place(id=place_out.id),
+                inner_rows,
+                inner_pages,
+            )
+            page = Page(id=id, net=create_petri_net("", inner_rows).net)
+            page.net.id = None
+            for inner_page in inner_pages:
+                page.net.add_page(inner_page)
+            pages.append(page)
+    rows.append(chain)
+
+
+def generate_workflow_net(config: SyntheticConfig):
+    """Return a random block structured workflow net of a configuration."""
+    generator = _Generator(config)
+    blocks = generator.process()
+    rows: list[list[NetElement]] = []
+    pages: list[Page] = []
+    _net_rows(blocks, Place(id="start"), Place(id="end"), rows, pages)
+    pnml = create_petri_net(f"synthetic_{config.nodes}", rows)
+    for page in pages:
+        pnml.net.add_page(page)
+    if generator.lanes:
+        pnml.net.toolspecific_global = ToolspecificGlobal(
+            resources=Resources(
+                roles=[Role(name=lane) for lane in generator.lanes],
+                units=[OrganizationUnit(name=ORGANIZATION)],
+            )
+        )
+    return pnml
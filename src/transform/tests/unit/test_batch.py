@@ -0,0 +1,139 @@
+"""Unit tests for the batch transformation.
+
+Includes tests to check whether NDJSON and multipart batches are transformed like
+single requests and invalid entries are reported per item.
+"""
+
+import io
+import json
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import flask
+
+import metrics
+from batch import handle_batch
+from exceptions import TooManyBatchItems
+from transformer.equality.bpmn import compare_bpmn
+from transformer.equality.petrinet import compare_pnml
+from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.pnml.pnml import Pnml
+from transformer.transform import transform_xml_string
+
+BPMN_XML = Path("tests/assets/diagrams/bpmn/e2e_payload.xml").read_text()
+PNML_XML = Path("tests/assets/diagrams/pnml/e2e_payload.xml").read_text()
+NOT_SUPPORTED_BPMN = Path("tests/assets/diagrams/bpmn/Insurance.bpmn").read_text()
+
+app = flask.Flask(__name__)
+
+
+class TestBatch(unittest.TestCase):
+    """This class tests the batch endpoint with and without worker processes."""
+
+    def post(self, **kwargs):
+        """Return the result lines of a batch request by index."""
+        with app.test_request_context(
+            "/transform/batch?cache=false", method="POST", **kwargs
+        ):
+            response = handle_batch(flask.request)
+            body = response.get_data(as_text=True)
+        lines = [json.loads(line) for line in body.splitlines()]
+        return {line["index"]: line for line in lines}
+
+    def assert_ndjson_batch(self):
+        """Assert the results of a NDJSON batch with mixed directions and errors."""
+        entries = [
+            {"id": "a", "bpmn": BPMN_XML},
+            {"id": "b", "pnml": PNML_XML, "direction": "pnmltobpmn"},
+            {"id": "c", "bpmn": NOT_SUPPORTED_BPMN},
+            {"id": "d", "pnml": PNML_XML, "direction": "bpmntopnml"},
+        ]
+        body = "\n".join(json.dumps(e) for e in entries) + "\nno json\n"
+        results = self.post(data=body, content_type="application/x-ndjson")
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]["id"], "a")
+        # The order of the elements depends on the hash seed of the worker.
+        equal, error = compare_pnml(
+            Pnml.from_xml_str(results[0]["pnml"]).net,
+            Pnml.from_xml_str(transform_xml_string("bpmntopnml", BPMN_XML)).net,
+        )
+        self.assertTrue(equal, error)
+        equal, error = compare_bpmn(
+            BPMN.from_xml(results[1]["bpmn"]),
+            BPMN.from_xml(transform_xml_string("pnmltobpmn", PNML_XML)),
+        )
+        self.assertTrue(equal, error)
+        self.assertEqual(results[2]["error"]["id"], 1)
+        self.assertEqual(results[3]["error"]["id"], 4)
+        self.assertEqual(results[4]["error"]["id"], 11)
+
+    def test_ndjson(self):
+        """Tests a NDJSON batch in the request thread."""
+        registry = metrics.Registry()
+        with (
+            mock.patch.dict(os.environ, {"TRANSFORM_WORKERS": "0"}),
+            mock.patch("metrics.get_registry", return_value=registry),
+        ):
+            self.assert_ndjson_batch()
+        # The errors of the items are counted like the ones of single requests
+        counts = {
+            labels: value
+            for (name, labels), value in registry.snapshot().items()
+            if name == "transform_known_exceptions_total"
+        }
+        self.assertEqual(
+            counts, {(("id", "1"),): 1, (("id", "4"),): 1, (("id", "11"),): 1}
+        )
+
+    def test_max_items(self):
+        """Tests that batches with too many models are rejected."""
+        data = {"bpmn": [BPMN_XML, BPMN_XML], "pnml": PNML_XML}
+        body = "\n".join(json.dumps({"bpmn": BPMN_XML}) for _ in range(3))
+        with mock.patch.dict(os.environ, {"BATCH_MAX_ITEMS": "2"}):
+            with self.assertRaises(TooManyBatchItems):
+                self.post(data=body, content_type="application/x-ndjson")
+            with self.assertRaises(TooManyBatchItems):
+                self.post(data=data, content_type="multipart/form-data")
+
+    def test_ndjson_workers(self):
+        """Tests a NDJSON batch with worker processes."""
+        with mock.patch.dict(os.environ, {"TRANSFORM_WORKERS": "2"}):
+            self.assert_ndjson_batch()
+
+    def test_trusted(self):
+        """Tests that only the deployment selects the reader without validation."""
+        body = json.dumps({"pnml": PNML_XML, "trusted": True})
+        reader = "transformer.models.pnml.parser.parse_trusted_pnml"
+        with (
+            mock.patch.dict(os.environ, {"TRANSFORM_WORKERS": "0"}),
+            mock.patch(reader, side_effect=Pnml.from_xml_str) as parse,
+        ):
+            with app.test_request_context(
+                "/transform/batch?cache=false&trusted=true",
+                method="POST",
+                data=body,
+                content_type="application/x-ndjson",
+            ):
+                handle_batch(flask.request).get_data()
+            parse.assert_not_called()
+            with mock.patch.dict(os.environ, {"TRUSTED_PNML": "true"}):
+                results = self.post(data=body, content_type="application/x-ndjson")
+            parse.assert_called_once()
+        self.assertIn("bpmn", results[0])
+
+    def test_multipart(self):
+        """Tests a multipart batch with a field and files."""
+        data = {
+            "bpmn": [BPMN_XML, (io.BytesIO(NOT_SUPPORTED_BPMN.encode()), "x.bpmn")],
+            "pnml": (io.BytesIO(PNML_XML.encode()), "y.pnml"),
+        }
+        with mock.patch.dict(os.environ, {"TRANSFORM_WORKERS": "0"}):
+            results = self.post(data=data, content_type="multipart/form-data")
+        self.assertEqual(len(results), 3)
+        self.assertIn("pnml", results[0])
+        self.assertEqual(results[1]["id"], "x.bpmn")
+        self.assertEqual(results[1]["error"]["id"], 1)
+        self.assertEqual(results[2]["id"], "y.pnml")
+        self.assertIn("bpmn", results[2])
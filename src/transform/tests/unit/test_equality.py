@@ -4,9 +4,22 @@ Includes tests to check whether all PNML and BPMN subelemts are identified corre
 """
 
 import unittest
+from unittest.mock import patch
 
-from transformer.equality.bpmn import get_all_processes_by_id
-from transformer.equality.petrinet import get_all_nets_by_id
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+
+from transformer.equality.bpmn import compare_bpmn, get_all_processes_by_id
+from transformer.equality.fingerprint import (
+    bpmn_fingerprint,
+    net_fingerprints,
+    pnml_fingerprint,
+    process_fingerprints,
+)
+from transformer.equality.petrinet import compare_pnml, get_all_nets_by_id
 from transformer.models.bpmn.bpmn import BPMN
 from transformer.models.pnml.pnml import Pnml
 
@@ -27,3 +40,74 @@ class TestSubelements(unittest.TestCase):
         subnets = {}
         get_all_processes_by_id(bpmn.process, subnets)
         self.assertEqual(len(subnets), 5)
+
+
+class TestFingerprint(unittest.TestCase):
+    """This class tests the fingerprints of processes and nets."""
+
+    def test_bpmn_fingerprint(self):
+        """Tests that the fingerprint only depends on ids if they are included."""
+        config = SyntheticConfig(300, or_=1, subprocesses=2, triggers=0.2)
+        bpmn = generate_bpmn(config)
+        parsed = BPMN.from_xml(bpmn.to_string())
+        self.assertEqual(bpmn_fingerprint(bpmn), bpmn_fingerprint(parsed))
+        fingerprints = process_fingerprints(bpmn.process)
+        subnets = {}
+        get_all_processes_by_id(bpmn.process, subnets)
+        self.assertEqual(fingerprints.keys(), subnets.keys())
+
+        task = parsed.process.get_node("task_1")
+        parsed.process.change_node_id(task, "renamed")
+        self.assertNotEqual(bpmn_fingerprint(bpmn), bpmn_fingerprint(parsed))
+        self.assertFalse(compare_bpmn(bpmn, parsed)[0])
+        self.assertEqual(
+            bpmn_fingerprint(bpmn, ids=False), bpmn_fingerprint(parsed, ids=False)
+        )
+
+        task.name = "renamed"
+        self.assertNotEqual(
+            bpmn_fingerprint(bpmn, ids=False), bpmn_fingerprint(parsed, ids=False)
+        )
+
+    def test_pnml_fingerprint(self):
+        """Tests the fingerprint of a workflow net with pages and renamed ids."""
+        config = SyntheticConfig(300, subprocesses=2, lanes=2, triggers=0.2)
+        pnml = Pnml.from_xml_str(generate_workflow_net(config).to_string())
+        parsed = Pnml.from_xml_str(pnml.to_string())
+        self.assertEqual(pnml_fingerprint(pnml), pnml_fingerprint(parsed))
+        subnets = {}
+        get_all_nets_by_id(pnml.net, subnets)
+        self.assertEqual(net_fingerprints(pnml.net).keys(), subnets.keys())
+
+        parsed.net.change_id("task_1", "renamed")
+        self.assertNotEqual(pnml_fingerprint(pnml), pnml_fingerprint(parsed))
+        self.assertEqual(
+            pnml_fingerprint(pnml, ids=False), pnml_fingerprint(parsed, ids=False)
+        )
+        parsed.net.get_element("renamed").set_name("renamed")
+        self.assertNotEqual(
+            pnml_fingerprint(pnml, ids=False), pnml_fingerprint(parsed, ids=False)
+        )
+
+    def test_fingerprint_rejects_only(self):
+        """Tests that equal fingerprints are confirmed by comparing the elements."""
+        config = SyntheticConfig(100, subprocesses=1)
+        pnml = Pnml.from_xml_str(generate_workflow_net(config).to_string())
+        parsed = Pnml.from_xml_str(pnml.to_string())
+        self.assertEqual(compare_pnml(pnml.net, parsed.net), (True, None))
+        parsed.net.get_element("task_1").set_name("renamed")
+        self.assertEqual(
+            compare_pnml(pnml.net, parsed.net), (False, "Different fingerprints")
+        )
+        with patch("transformer.equality.petrinet.net_fingerprint", return_value=""):
+            equal, message = compare_pnml(pnml.net, parsed.net)
+        self.assertFalse(equal)
+        self.assertIn("task_1", message)
+
+        bpmn = generate_bpmn(config)
+        parsed_bpmn = BPMN.from_xml(bpmn.to_string())
+        parsed_bpmn.process.get_node("task_1").name = "renamed"
+        with patch("transformer.equality.bpmn.bpmn_fingerprint", return_value=""):
+            equal, message = compare_bpmn(bpmn, parsed_bpmn)
+        self.assertFalse(equal)
+        self.assertIn("renamed", message)
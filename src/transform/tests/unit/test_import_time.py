@@ -0,0 +1,20 @@
+"""Unit tests for the cold start of the entry point.
+
+Includes tests to check that the models and slow dependencies are not imported
+before the first transformation.
+"""
+
+import unittest
+
+from tests.benchmark.import_time import DEFERRED_MODULES, import_times
+
+
+class TestImportTime(unittest.TestCase):
+    """This class tests the imports of the entry point `main`."""
+
+    def test_deferred_imports(self):
+        """Tests that the models and slow dependencies are imported on first use."""
+        times = import_times()
+        self.assertIn("main", times)
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, times)
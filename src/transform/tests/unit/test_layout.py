@@ -0,0 +1,317 @@
+"""Unit tests for the layouts, the BPMN diagrams and the net positions.
+
+Includes tests to check that the nodes do not overlap, the edges are orthogonal
+and connect their nodes, that lanes and subprocesses contain their nodes and that
+the nodes keep the positions of the source diagram.
+"""
+
+import unittest
+
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+
+from transformer.models.bpmn.bpmn import BPMN, Process
+from transformer.models.bpmn.bpmn_graphics import BPMNEdge, BPMNShape, DCBounds
+from transformer.models.pnml.pnml import Net, Pnml
+from transformer.transform_bpmn_to_petrinet.layout import NODE_SIZE
+from transformer.transform_bpmn_to_petrinet.transform import bpmn_to_workflow_net
+from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+from transformer.utility.layout import (
+    Bounds,
+    anchored_layout,
+    layered_layout,
+    source_anchors,
+)
+
+
+def overlap(a: tuple[float, float, float, float], b: tuple[float, float, float, float]):
+    """Return whether two boxes (x, y, width, height) overlap."""
+    return (
+        a[0] < b[0] + b[2]
+        and b[0] < a[0] + a[2]
+        and a[1] < b[1] + b[3]
+        and b[1] < a[1] + a[3]
+    )
+
+
+def box(bounds: DCBounds):
+    """Return the box of bounds."""
+    return bounds.x, bounds.y, bounds.width, bounds.height
+
+
+def inside(inner: DCBounds, outer: DCBounds):
+    """Return whether the bounds are inside other bounds."""
+    return (
+        outer.x <= inner.x
+        and inner.x + inner.width <= outer.x + outer.width
+        and outer.y <= inner.y
+        and inner.y + inner.height <= outer.y + outer.height
+    )
+
+
+def center_offsets(bpmn: BPMN, centers: dict[str, tuple[float, float]]):
+    """Return the offsets of the top level shapes of a BPMN to source centers."""
+    assert bpmn.diagram and bpmn.diagram.plane
+    shapes = {
+        e.bpmnElement: e.bounds
+        for e in bpmn.diagram.plane.eles
+        if isinstance(e, BPMNShape)
+    }
+    offsets = set()
+    for node in bpmn.process._flatten_node_typ_map():
+        if node.id in centers:
+            x, y = centers[node.id]
+            bounds = shapes[node.id]
+            offsets.add(
+                (bounds.x + bounds.width / 2 - x, bounds.y + bounds.height / 2 - y)
+            )
+    return offsets
+
+
+class TestLayeredLayout(unittest.TestCase):
+    """This class tests the layered layout of graphs."""
+
+    def assert_layout(self, sizes, edges, lanes=None):
+        """Assert that the nodes do not overlap and the edges are orthogonal."""
+        layout = layered_layout(sizes, edges, lanes)
+        boxes = [(x, y, *size) for x, y, size in zip(layout.x, layout.y, sizes)]
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1 :]:
+                self.assertFalse(overlap(a, b))
+        for (source, target), points in zip(edges, layout.waypoints):
+            self.assertEqual(points[0][0], boxes[source][0] + boxes[source][2])
+            self.assertEqual(points[-1][0], boxes[target][0])
+            for (ax, ay), (bx, by) in zip(points, points[1:]):
+                self.assertTrue(ax == bx or ay == by)
+        return layout
+
+    def test_layers(self):
+        """Tests that a split and join is placed in columns."""
+        sizes = [(36, 36), (50, 50), (100, 80), (100, 80), (50, 50), (36, 36)]
+        edges = [(0, 1), (1, 2), (1, 3), (2, 4), (3, 4), (4, 5)]
+        layout = self.assert_layout(sizes, edges)
+        self.assertEqual(layout.x[2], layout.x[3])
+        self.assertEqual(sorted(layout.x[:3]), layout.x[:3])
+        self.assertLess(layout.x[4], layout.x[5])
+        # The branches are centered around the split and join
+        center = layout.y[1] + 25
+        self.assertEqual(layout.y[2] + 80 - center, center - layout.y[3])
+        self.assertEqual(layout.y[4] + 25, center)
+
+    def test_cycles(self):
+        """Tests that loops, self loops and long edges are laid out."""
+        sizes = [(100, 80)] * 5
+        edges = [(0, 1), (1, 2), (2, 3), (3, 1), (0, 3), (2, 2), (3, 4), (4, 0)]
+        layout = self.assert_layout(sizes, edges)
+        self.assertEqual(len(set(layout.x)), 5)
+
+    def test_lanes(self):
+        """Tests that the nodes are inside the band of their lane."""
+        sizes = [(100, 80)] * 6
+        edges = [(0, 1), (1, 2), (0, 3), (3, 4), (2, 5), (4, 5)]
+        lanes = [0, 1, 0, 1, 1, 2]
+        layout = self.assert_layout(sizes, edges, lanes)
+        for node, lane in enumerate(lanes):
+            top, height = layout.lanes[lane]
+            self.assertLessEqual(top, layout.y[node])
+            self.assertLessEqual(layout.y[node] + 80, top + height)
+        self.assertEqual(sum(height for _, height in layout.lanes), layout.height)
+
+
+class TestAnchoredLayout(unittest.TestCase):
+    """This class tests the layout of graphs with nodes at given centers."""
+
+    def test_between_anchors(self):
+        """Tests that the other nodes are placed between the anchors."""
+        sizes = [(40, 40)] * 5
+        edges = [(0, 1), (1, 2), (2, 3), (1, 4), (4, 3)]
+        layout = anchored_layout(sizes, edges, {0: (0, 0), 3: (300, 100)})
+        boxes = [(x, y, *size) for x, y, size in zip(layout.x, layout.y, sizes)]
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1 :]:
+                self.assertFalse(overlap(a, b))
+        self.assertEqual(layout.x[3] - layout.x[0], 300)
+        self.assertEqual(layout.y[3] - layout.y[0], 100)
+        self.assertTrue(layout.x[0] < layout.x[1] < layout.x[2] < layout.x[3])
+        for (ax, ay), (bx, by) in zip(layout.waypoints[0], layout.waypoints[0][1:]):
+            self.assertTrue(ax == bx or ay == by)
+
+    def test_lanes(self):
+        """Tests that the lanes are stacked and keep the positions of their nodes."""
+        sizes = [(100, 80)] * 4
+        edges = [(0, 1), (1, 2), (2, 3)]
+        anchors = {0: (0, 0), 1: (200, 0), 2: (400, 50), 3: (600, 10)}
+        layout = anchored_layout(sizes, edges, anchors, [0, 1, 1, 0])
+        (top, height), (second_top, _) = layout.lanes
+        self.assertEqual(second_top, top + height)
+        self.assertEqual(layout.y[3] - layout.y[0], 10)
+        self.assertEqual(layout.y[2] - layout.y[1], 50)
+        self.assertGreaterEqual(layout.y[1], second_top)
+
+    def test_unreached(self):
+        """Tests that nodes without path to an anchor are laid out below."""
+        sizes = [(40, 40)] * 2 + [(100, 80)] * 6
+        edges = [(0, 1), (2, 3), (3, 4), (5, 6), (6, 7)]
+        layout = anchored_layout(sizes, edges, {0: (0, 0), 1: (100, 0)})
+        boxes = [(x, y, *size) for x, y, size in zip(layout.x, layout.y, sizes)]
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1 :]:
+                self.assertFalse(overlap(a, b))
+        self.assertGreater(min(layout.y[2:]), layout.y[0] + 40)
+        # The components are laid out from left to right
+        self.assertTrue(layout.x[2] < layout.x[3] < layout.x[4])
+        self.assertTrue(layout.x[5] < layout.x[6] < layout.x[7])
+
+    def test_duplicate_anchors(self):
+        """Tests that only the boxes with the same center are not anchors."""
+        geometry = {
+            "a": Bounds(0, 0, 40, 40),
+            "b": Bounds(100, 0, 40, 40),
+            "c": Bounds(100, 0, 40, 40),
+        }
+        anchors = source_anchors(["a", "b", "c", None, "d"], geometry)
+        self.assertEqual(anchors, {0: (20, 20)})
+
+
+class TestBPMNDiagram(unittest.TestCase):
+    """This class tests the diagrams of BPMNs."""
+
+    def test_diagram(self):
+        """Tests the shapes of a BPMN with lanes and subprocesses."""
+        bpmn = generate_bpmn(SyntheticConfig(300, subprocesses=2, lanes=3))
+        bpmn.set_graphics()
+        assert bpmn.diagram and bpmn.diagram.plane
+        elements = bpmn.diagram.plane.eles
+        shapes = {e.bpmnElement: e for e in elements if isinstance(e, BPMNShape)}
+        edges = [e for e in elements if isinstance(e, BPMNEdge)]
+
+        def check(process: Process):
+            nodes = process._flatten_node_typ_map()
+            for i, node in enumerate(nodes):
+                for other in nodes[i + 1 :]:
+                    self.assertFalse(
+                        overlap(
+                            box(shapes[node.id].bounds), box(shapes[other.id].bounds)
+                        )
+                    )
+            for subprocess in process.subprocesses:
+                for node in subprocess._flatten_node_typ_map():
+                    self.assertTrue(
+                        inside(shapes[node.id].bounds, shapes[subprocess.id].bounds)
+                    )
+                check(subprocess)
+
+        check(bpmn.process)
+        self.assertEqual(
+            len(edges),
+            len(bpmn.process.flows)
+            + sum(len(subprocess.flows) for subprocess in bpmn.process.subprocesses),
+        )
+        for edge in edges:
+            for a, b in zip(edge.waypoints, edge.waypoints[1:]):
+                self.assertTrue(a.x == b.x or a.y == b.y)
+
+        participant = shapes["participant"].bounds
+        for lane_set in bpmn.process.lane_sets:
+            for lane in lane_set.lanes:
+                self.assertTrue(inside(shapes[lane.id].bounds, participant))
+                for ref in lane.flowNodeRefs:
+                    self.assertTrue(inside(shapes[ref].bounds, shapes[lane.id].bounds))
+
+    def test_deterministic(self):
+        """Tests that the diagram does not depend on the order of the elements."""
+        xml = generate_bpmn(SyntheticConfig(200, lanes=2)).to_string()
+        bpmn = BPMN.from_xml(xml)
+        # Without the positions of the parsed diagram
+        bpmn._geometry.clear()
+        parsed = bpmn.to_string()
+        self.assertEqual(
+            parsed[parsed.index("BPMNDiagram") :], xml[xml.index("BPMNDiagram") :]
+        )
+
+    def test_source_geometry(self):
+        """Tests that a parsed diagram keeps the positions of its shapes."""
+        xml = generate_bpmn(SyntheticConfig(200, subprocesses=2)).to_string()
+        source = BPMN.from_xml(xml)
+        bpmn = BPMN.from_xml(source.to_string())
+        centers = {id: bounds.center for id, bounds in source._geometry.items()}
+        self.assertEqual(len(center_offsets(bpmn, centers)), 1)
+
+    def test_net_positions(self):
+        """Tests that the nodes of a net are placed at the positions of the net."""
+        xml = generate_bpmn(SyntheticConfig(300, or_=0)).to_string()
+        net = bpmn_to_workflow_net(BPMN.from_xml(xml))
+        pnml = Pnml.from_xml_str(net.to_string())
+        bpmn = pnml_to_bpmn(pnml)
+        bpmn.to_string()
+        centers = {id: bounds.center for id, bounds in pnml._geometry.items()}
+        self.assertEqual(len(center_offsets(bpmn, centers)), 1)
+        assert bpmn.diagram and bpmn.diagram.plane
+        shapes = [e for e in bpmn.diagram.plane.eles if isinstance(e, BPMNShape)]
+        for i, a in enumerate(shapes):
+            for b in shapes[i + 1 :]:
+                self.assertFalse(overlap(box(a.bounds), box(b.bounds)))
+
+    def test_placeholder_positions(self):
+        """Tests that nets without positions are laid out in layers."""
+        pnml = Pnml.from_xml_str(generate_workflow_net(SyntheticConfig(100)).to_string())
+        self.assertEqual(pnml._geometry, {})
+        bpmn = pnml_to_bpmn(pnml)
+        bpmn.to_string()
+        self.assertIsNotNone(bpmn.diagram)
+
+
+class TestNetLayout(unittest.TestCase):
+    """This class tests the positions of the nets transformed from BPMNs."""
+
+    def assert_positions(self, net: Net):
+        """Assert that the nodes of a net and its pages do not overlap.
+
+        The elements of a workflow operator have the same position.
+        """
+        positions = {}
+        for element in net.get_elements():
+            assert element.graphics
+            key = element.id
+            if element.toolspecific and element.toolspecific.operator:
+                key = element.toolspecific.operator.id
+            position = (element.graphics.position.x, element.graphics.position.y)
+            self.assertEqual(positions.setdefault(key, position), position)
+        boxes = [(x, y, NODE_SIZE, NODE_SIZE) for x, y in positions.values()]
+        for i, a in enumerate(boxes):
+            for b in boxes[i + 1 :]:
+                self.assertFalse(overlap(a, b))
+        for page in net.pages:
+            self.assert_positions(page.net)
+
+    def test_layered(self):
+        """Tests the positions of a net without source shapes."""
+        bpmn = generate_bpmn(SyntheticConfig(300, or_=1, subprocesses=2, lanes=3))
+        net = bpmn_to_workflow_net(bpmn).net
+        self.assert_positions(net)
+
+    def test_source_shapes(self):
+        """Tests that the elements of the BPMN are placed at their shapes."""
+        xml = generate_bpmn(SyntheticConfig(300, subprocesses=2, lanes=3)).to_string()
+        bpmn = BPMN.from_xml(xml)
+        centers = {id: bounds.center for id, bounds in bpmn._geometry.items()}
+        net = bpmn_to_workflow_net(bpmn).net
+        self.assert_positions(net)
+        # The net is only moved to the top left corner
+        offsets = set()
+        for element in net.get_elements():
+            if element.id in centers and not element.toolspecific:
+                assert element.graphics
+                x, y = centers[element.id]
+                position = element.graphics.position
+                offsets.add(
+                    (position.x + NODE_SIZE / 2 - x, position.y + NODE_SIZE / 2 - y)
+                )
+        self.assertEqual(len(offsets), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
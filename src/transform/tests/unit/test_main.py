@@ -0,0 +1,80 @@
+"""Unit tests for the responses of the transformation endpoint.
+
+Includes tests to check whether small results are created before the response
+starts, streamed results end with the error of a failed serialization and the
+metrics require the configured token.
+"""
+
+import json
+import os
+import unittest
+from collections.abc import Iterator
+from unittest import mock
+
+import flask
+
+from exceptions import InvalidInputXML, PrivateInternalException
+
+with mock.patch.dict(
+    os.environ, {"FORCE_STD_XML": "true", "TRANSFORM_WARM_UP": "false"}
+):
+    import main
+
+
+def failing_chunks(chunks: list[str], exception: Exception) -> Iterator[str]:
+    """Yield the chunks and raise the exception afterwards."""
+    yield from chunks
+    raise exception
+
+
+class TestStreamJson(unittest.TestCase):
+    """This class tests the JSON responses of the transformed models."""
+
+    def test_small(self):
+        """Tests that a small result is created before the response starts."""
+        response = main.stream_json("pnml", iter(['<a b="1">', "\n</a>"]))
+        self.assertTrue(response.is_sequence)
+        self.assertEqual(json.loads(response.get_data()), {"pnml": '<a b="1">\n</a>'})
+        with self.assertRaises(PrivateInternalException):
+            main.stream_json("pnml", failing_chunks(["<a>"], PrivateInternalException()))
+
+    def test_streamed(self):
+        """Tests that a large result is streamed and ends with its error."""
+        chunks = ["<a>", "x" * 10, "</a>"]
+        response = main.stream_json("bpmn", iter(chunks), threshold=5)
+        self.assertFalse(response.is_sequence)
+        self.assertEqual(json.loads(response.get_data()), {"bpmn": "".join(chunks)})
+
+        response = main.stream_json(
+            "bpmn", failing_chunks(chunks, InvalidInputXML()), threshold=5
+        )
+        body = json.loads(response.get_data())
+        self.assertEqual(body["bpmn"], "".join(chunks))
+        self.assertEqual(body["error"]["id"], InvalidInputXML().id)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """This class tests the access to the metrics endpoint."""
+
+    def get(self, **headers: str):
+        """Return the response of a metrics request with the headers."""
+        with flask.Flask(__name__).test_request_context("/metrics", headers=headers):
+            return main.get_metrics(flask.request)
+
+    def test_token(self):
+        """Tests that the metrics require the token and are disabled without."""
+        with mock.patch.dict(os.environ, {"METRICS_TOKEN": ""}):
+            self.assertEqual(self.get().status_code, 404)
+        with mock.patch.dict(os.environ, {"METRICS_TOKEN": "secret"}):
+            self.assertEqual(self.get().status_code, 401)
+            self.assertEqual(self.get(Authorization="Bearer other").status_code, 401)
+            response = self.get(Authorization="Bearer secret")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(
+                "# TYPE transform_known_exceptions_total counter",
+                response.get_data(as_text=True),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
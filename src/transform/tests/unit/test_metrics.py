@@ -0,0 +1,92 @@
+"""Unit tests for the Prometheus metrics of the service.
+
+Includes tests to check the histograms, the text format and the aggregation of the
+snapshot files of multiple processes.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from metrics import Registry
+
+# Process id which does not exist (above the maximum process id of Linux)
+STOPPED_PID = 2**23
+
+
+class TestMetrics(unittest.TestCase):
+    """This class tests the metrics registry."""
+
+    def test_histogram(self):
+        """Tests that the buckets of a histogram are cumulative in the text format."""
+        registry = Registry()
+        for seconds in [0.001, 0.02, 0.02, 100]:
+            registry.observe(
+                "transform_request_duration_seconds",
+                seconds,
+                direction="bpmntopnml",
+                outcome="ok",
+            )
+        lines = registry.exposition().splitlines()
+        labels = 'direction="bpmntopnml",outcome="ok"'
+        name = "transform_request_duration_seconds"
+        self.assertIn(f'{name}_bucket{{{labels},le="0.005"}} 1', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="0.025"}} 3', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="60"}} 3', lines)
+        self.assertIn(f'{name}_bucket{{{labels},le="+Inf"}} 4', lines)
+        self.assertIn(f"{name}_count{{{labels}}} 4", lines)
+        self.assertIn(f"# TYPE {name} histogram", lines)
+
+    def test_processes(self):
+        """Tests that the snapshots of all processes are summed up.
+
+        The gauges of stopped processes are ignored.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            registry = Registry(directory)
+            registry.inc("transform_known_exceptions_total", id=1)
+            registry.add_collector(
+                lambda: [("transform_worker_pool_workers", {"state": "busy"}, 2)]
+            )
+            stopped = [
+                ["transform_known_exceptions_total", [["id", "1"]], 2],
+                ["transform_known_exceptions_total", [["id", "5"]], 1],
+                ["transform_worker_pool_workers", [["state", "busy"]], 4],
+            ]
+            Path(directory, f"{STOPPED_PID}.json").write_text(
+                json.dumps({"pid": STOPPED_PID, "values": stopped})
+            )
+            lines = registry.exposition().splitlines()
+            self.assertIn('transform_known_exceptions_total{id="1"} 3', lines)
+            self.assertIn('transform_known_exceptions_total{id="5"} 1', lines)
+            self.assertIn('transform_worker_pool_workers{state="busy"} 2', lines)
+
+    def test_flush_interval(self):
+        """Tests that the snapshot is only written once per flush interval."""
+        with tempfile.TemporaryDirectory() as directory:
+            registry = Registry(directory, flush_interval=60)
+            registry.inc("transform_known_exceptions_total", id=1)
+            registry.flush_due()
+            registry.inc("transform_known_exceptions_total", id=1)
+            registry.flush_due()
+            (path,) = Path(directory).glob("*.json")
+            values = json.loads(path.read_text())["values"]
+            self.assertEqual(
+                values, [["transform_known_exceptions_total", [["id", "1"]], 1]]
+            )
+            registry.flush_interval = 0
+            registry.flush_due()
+            values = json.loads(path.read_text())["values"]
+            self.assertEqual(values[0][2], 2)
+
+    def test_hit_ratio(self):
+        """Tests the hit ratio of the result cache over all lookups."""
+        registry = Registry()
+        for result, count in [("memory_hit", 2), ("disk_hit", 1), ("miss", 1)]:
+            registry.inc("transform_cache_lookups_total", count, result=result)
+        self.assertIn("transform_cache_hit_ratio 0.75", registry.exposition())
+
+
+if __name__ == "__main__":
+    unittest.main()
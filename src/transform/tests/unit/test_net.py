@@ -0,0 +1,64 @@
+"""Unit tests for the graph backed petri net model.
+
+Includes tests to check whether the places, transitions and arcs of a net are
+views of its graph, also for copies of the net.
+"""
+
+import pickle
+import unittest
+
+from transformer.models.pnml.pnml import Arc, Net, Place, Transition
+
+
+class TestNet(unittest.TestCase):
+    """This class tests the fields of a net as views of its graph."""
+
+    def create_net(self):
+        """Return a net with a place, a transition and an arc between them."""
+        net = Net(id="net", places={Place(id="p1")}, transitions={Transition(id="t1")})
+        net.add_arc_from_id("p1", "t1")
+        return net
+
+    def test_views(self):
+        """Tests that the views follow the changes of the graph."""
+        net = self.create_net()
+        self.assertEqual(net.places, {Place(id="p1")})
+        self.assertEqual(len(net.arcs), 1)
+        self.assertEqual(net.get_incoming("t1"), tuple(net.arcs))
+
+        place = net.add_element(Place(id="p2"))
+        net.add_arc(net.get_element("t1"), place)
+        self.assertIn(place, net.places)
+        self.assertNotIn(place, net.transitions)
+        self.assertEqual(len(net.places | net.transitions), 3)
+        self.assertEqual(net.element_counts(), {"nodes": 3, "arcs": 2})
+        self.assertIn(Arc(id="t1TOp2", source="t1", target="p2"), net.arcs)
+        self.assertNotIn(Arc(id="t1TOp2", source="p2", target="t1"), net.arcs)
+        self.assertNotIn(place, net.arcs)
+
+        net.remove_element(net.get_element("t1"))
+        self.assertEqual(net.transitions, set())
+        self.assertEqual(
+            {(a.source, a.target) for a in net.arcs}, {("p1", ""), ("", "p2")}
+        )
+        self.assertIn(Arc(id="t1TOp2", source="", target="p2"), net.arcs)
+
+    def test_duplicate_arcs(self):
+        """Tests that an identical arc is added once and other arcs are kept."""
+        net = self.create_net()
+        net.add_arc_from_id("p1", "t1")
+        self.assertEqual(len(net.arcs), 1)
+        net.add_arc_from_id("p1", "t1", id="other")
+        self.assertEqual(len(net.arcs), 2)
+        self.assertEqual(net.get_out_degree(net.get_element("p1")), 2)
+
+    def test_copies(self):
+        """Tests that copies have views of their own graph."""
+        net = self.create_net()
+        for copy in [net.model_copy(deep=True), pickle.loads(pickle.dumps(net))]:
+            with self.subTest(copy=copy):
+                self.assertEqual(copy, net)
+                copy.remove_element_with_connecting_arcs(copy.get_element("t1"))
+                self.assertEqual(len(copy.arcs), 0)
+                self.assertEqual(len(net.arcs), 1)
+                self.assertNotEqual(copy, net)
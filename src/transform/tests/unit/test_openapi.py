@@ -0,0 +1,28 @@
+"""Unit tests for the OpenAPI specification of the service.
+
+Includes tests to check whether the specification parses and documents every
+endpoint of the service.
+"""
+
+import unittest
+from pathlib import Path
+
+import yaml
+
+SPECIFICATION = Path(__file__).parents[4] / "docs" / "openapi.yaml"
+
+
+class TestOpenApi(unittest.TestCase):
+    """This class tests the OpenAPI specification."""
+
+    def test_parses(self):
+        """Tests that the specification is valid YAML with all endpoints."""
+        specification = yaml.safe_load(SPECIFICATION.read_text(encoding="utf-8"))
+        self.assertEqual(
+            set(specification["paths"]),
+            {"/transform", "/transform/batch", "/health", "/metrics"},
+        )
+        for path, operations in specification["paths"].items():
+            for method, operation in operations.items():
+                with self.subTest(path=path, method=method):
+                    self.assertIn("200", map(str, operation["responses"]))
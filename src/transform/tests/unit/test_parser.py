@@ -0,0 +1,70 @@
+"""Unit tests for the streaming BPMN parser.
+
+Includes tests to check whether the streaming parser creates the same models and
+errors as the pydantic_xml deserializer.
+"""
+
+import unittest
+from pathlib import Path
+
+from tests.testgeneration.testcases.bpmn_to_pnml.ignored_cases import (
+    all_cases as ignored_cases_bpmn,
+)
+from tests.testgeneration.testcases.bpmn_to_pnml.supported_cases import (
+    all_cases as supported_cases_bpmn,
+)
+from tests.testgeneration.testcases.bpmn_to_pnml.unsupported_cases import (
+    all_cases as unsupported_cases_bpmn,
+)
+
+from exceptions import InvalidInputXML, NotSupportedBPMNElement
+from transformer.models.bpmn.bpmn import BPMN
+
+
+class TestStreamingParser(unittest.TestCase):
+    """This class compares the streaming parser with the validated deserializer."""
+
+    def assert_same_bpmn(self, xml: str):
+        """Assert that both parsers return the same BPMN for a XML string."""
+        expected = BPMN.from_xml_validated(xml)
+        parsed = BPMN.from_xml(xml)
+        self.assertEqual(expected, parsed)
+        self.assertEqual(
+            expected.process.model_fields_set, parsed.process.model_fields_set
+        )
+
+    def test_assets(self):
+        """Tests the BPMN files of the assets."""
+        for path in [
+            "tests/assets/multiplesubprocesses.bpmn",
+            "tests/assets/diagrams/bpmn/e2e_payload.xml",
+        ]:
+            with self.subTest(path=path):
+                self.assert_same_bpmn(Path(path).read_text())
+
+    def test_supported_cases(self):
+        """Tests the serialized supported test cases."""
+        for bpmn, _, case in supported_cases_bpmn:
+            with self.subTest(case=case):
+                self.assert_same_bpmn(bpmn.model_copy(deep=True).to_string())
+
+    def test_ignored_cases(self):
+        """Tests the ignored elements."""
+        for i, (xml, _) in enumerate(ignored_cases_bpmn):
+            with self.subTest(case=i):
+                self.assert_same_bpmn(xml)
+
+    def test_unsupported_cases(self):
+        """Tests that not supported elements are rejected."""
+        for xml, case in unsupported_cases_bpmn:
+            with self.subTest(case=case):
+                self.assertRaises(NotSupportedBPMNElement, BPMN.from_xml, xml)
+
+    def test_invalid_xml(self):
+        """Tests that malformed and incomplete documents are rejected."""
+        for xml in [
+            "<definitions",
+            '<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL"/>',
+        ]:
+            with self.subTest(xml=xml):
+                self.assertRaises(InvalidInputXML, BPMN.from_xml, xml)
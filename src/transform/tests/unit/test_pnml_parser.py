@@ -0,0 +1,64 @@
+"""Unit tests for the trusted PNML reader.
+
+Includes tests to check whether the trusted reader creates the same nets as the
+validated reader and rejects structurally invalid nets.
+"""
+
+import glob
+import unittest
+from pathlib import Path
+
+from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases import (
+    all_cases as supported_cases_pnml,
+)
+
+from exceptions import InvalidInputXML
+from transformer.models.pnml.pnml import Pnml
+
+
+class TestTrustedPnmlReader(unittest.TestCase):
+    """This class compares the trusted reader with the validated reader."""
+
+    def assert_same_pnml(self, xml: str):
+        """Assert that both readers return the same net for a XML string."""
+        expected = Pnml.from_xml_str(xml)
+        parsed = Pnml.from_xml_str(xml, trusted=True)
+        self.assertEqual(expected, parsed)
+        self.assertEqual(expected.to_string(), parsed.to_string())
+        self.assertEqual(
+            {node.id: node for node in expected.net.get_elements()},
+            {node.id: node for node in parsed.net.get_elements()},
+        )
+        for node in expected.net.get_elements():
+            self.assertEqual(
+                expected.net.get_incoming(node.id), parsed.net.get_incoming(node.id)
+            )
+            self.assertEqual(
+                expected.net.get_outgoing(node.id), parsed.net.get_outgoing(node.id)
+            )
+
+    def test_assets(self):
+        """Tests the PNML files of the assets."""
+        for path in glob.glob("tests/assets/**/*.pnml", recursive=True):
+            with self.subTest(path=path):
+                self.assert_same_pnml(Path(path).read_text())
+
+    def test_supported_cases(self):
+        """Tests the serialized supported test cases."""
+        for _, pnml, case in supported_cases_pnml:
+            with self.subTest(case=case):
+                self.assert_same_pnml(pnml.model_copy(deep=True).to_string())
+
+    def test_invalid_nets(self):
+        """Tests that structurally invalid nets are rejected."""
+        for xml in [
+            "<pnml",
+            "<net id='n'/>",
+            "<pnml><net id='n'><place id='p'/><place id='p'/></net></pnml>",
+            "<pnml><net id='n'><place id='p'/><arc id='a' source='p'/></net></pnml>",
+            "<pnml><net id='n'><place id='p'/>"
+            "<arc id='a' source='p' target='t'/></net></pnml>",
+            "<!DOCTYPE pnml [<!ENTITY e 'x'>]><pnml><net id='&e;'/></pnml>",
+        ]:
+            with self.subTest(xml=xml):
+                self.assertRaises(InvalidInputXML, Pnml.from_xml_str, xml, True)
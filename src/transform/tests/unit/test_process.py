@@ -0,0 +1,58 @@
+"""Unit tests for the graph backed BPMN process model.
+
+Includes tests to check whether the nodes and flows of a process are views of
+its graph, also for copies of the process.
+"""
+
+import pickle
+import unittest
+
+from transformer.models.bpmn.bpmn import EndEvent, Flow, Process, StartEvent, Task
+
+
+class TestProcess(unittest.TestCase):
+    """This class tests the fields of a process as views of its graph."""
+
+    def create_process(self):
+        """Return a process with a start event, a task and a flow between them."""
+        process = Process(
+            id="process", start_events={StartEvent(id="s")}, tasks={Task(id="t")}
+        )
+        process.add_flow(process.get_node("s"), process.get_node("t"), "f1")
+        return process
+
+    def test_views(self):
+        """Tests that the views follow the changes of the graph."""
+        process = self.create_process()
+        self.assertEqual(process.tasks, {Task(id="t")})
+        self.assertEqual(process.get_incoming("t"), tuple(process.flows))
+
+        end = process.add_node(EndEvent(id="e"))
+        process.add_flow(process.get_node("t"), end, "f2")
+        self.assertIn(end, process.end_events)
+        self.assertNotIn(end, process.tasks)
+        self.assertIn(Flow(id="f2", sourceRef="t", targetRef="e"), process.flows)
+        self.assertNotIn(Flow(id="f2", sourceRef="e", targetRef="t"), process.flows)
+        self.assertEqual(process.element_counts(), {"nodes": 3, "flows": 2})
+
+        process.remove_node(process.get_node("t"))
+        self.assertEqual(process.tasks, set())
+        self.assertEqual(len(process.flows), 2)
+        self.assertEqual(
+            {(f.sourceRef, f.targetRef) for f in process.flows}, {("s", ""), ("", "e")}
+        )
+
+    def test_copies(self):
+        """Tests that copies have views of their own graph."""
+        process = self.create_process()
+        for copy in [
+            process.model_copy(deep=True),
+            pickle.loads(pickle.dumps(process)),
+        ]:
+            with self.subTest(copy=copy):
+                self.assertEqual(copy, process)
+                copy.remove_flow(copy.get_flow("f1"))
+                copy.remove_node(copy.get_node("t"))
+                self.assertEqual(len(copy.flows), 0)
+                self.assertEqual(len(process.flows), 1)
+                self.assertNotEqual(copy, process)
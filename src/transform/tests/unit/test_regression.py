@@ -0,0 +1,36 @@
+"""Unit tests for the performance regression gate.
+
+Includes tests to check the comparison of the measured times with the baseline.
+"""
+
+import unittest
+
+from tests.benchmark.regression import find_regressions
+
+
+class TestRegression(unittest.TestCase):
+    """This class tests the comparison with the baseline."""
+
+    def test_find_regressions(self):
+        """Tests that only cases slower than the scaled baseline are regressions."""
+        baseline = {
+            "small": {"transform": 1.0, "compare": 0.1},
+            "large": {"transform": 100.0, "compare": 10.0},
+        }
+        results = {
+            "small": {"transform": 2.5, "compare": 0.3},
+            "large": {"transform": 160.0, "compare": 14.0},
+            "new": {"transform": 1000.0, "compare": 100.0},
+        }
+        self.assertEqual(
+            find_regressions(results, baseline, threshold=1.5, slack_ms=2),
+            [("large", "transform", 100.0, 160.0)],
+        )
+        self.assertEqual(
+            find_regressions(results, baseline, scale=1.2, threshold=1.5, slack_ms=2),
+            [],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Unit tests for the transformation result cache.
+
+Includes tests to check the eviction of the in-process tier, the shared sqlite tier
+and the caching of known exceptions.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from exceptions import KnownException, NotSupportedBPMNElement, ServiceOverloaded
+from transformer.utility.result_cache import ResultCache, cache_key
+
+
+class TestResultCache(unittest.TestCase):
+    """This class tests the result cache."""
+
+    def setUp(self):
+        """Count the calls of the transformation."""
+        self.calls = 0
+
+    def transform(self, result: str):
+        """Return a transformation creating a result."""
+
+        def run():
+            self.calls += 1
+            return iter([result])
+
+        return run
+
+    def test_keys(self):
+        """Tests that only irrelevant differences of the input share a key."""
+        key = cache_key("bpmntopnml", "<a>\r\n<b/></a>")
+        self.assertEqual(key, cache_key("bpmntopnml", " <a>\n<b/></a>\n"))
+        self.assertNotEqual(key, cache_key("pnmltobpmn", "<a>\n<b/></a>"))
+        self.assertNotEqual(key, cache_key("bpmntopnml", "<a><b/></a>"))
+
+    def test_memory_eviction(self):
+        """Tests the least recently used results are evicted over the size."""
+        cache = ResultCache(max_bytes=20)
+        cache.transform("d", "1", self.transform("a" * 9))
+        cache.transform("d", "2", self.transform("b" * 9))
+        cache.transform("d", "1", self.transform("a" * 9))
+        cache.transform("d", "3", self.transform("c" * 9))
+        self.assertEqual(self.calls, 3)
+        self.assertEqual("".join(cache.transform("d", "1", self.transform(""))), "a" * 9)
+        cache.transform("d", "2", self.transform("b" * 9))
+        self.assertEqual(self.calls, 4)
+        self.assertEqual(cache.stats()["memory_hits"], 2)
+        self.assertLessEqual(cache.stats()["bytes"], 20)
+
+    def test_disk_tier(self):
+        """Tests that caches with the same file share the results."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "cache.sqlite")
+            ResultCache(path=path).transform("d", "x", self.transform("result"))
+            cache = ResultCache(path=path)
+            chunks = cache.transform("d", "x", self.transform("other"))
+            self.assertEqual("".join(chunks), "result")
+            self.assertEqual(self.calls, 1)
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_known_exceptions(self):
+        """Tests that known exceptions are cached with their description."""
+        cache = ResultCache()
+
+        def fail():
+            self.calls += 1
+            raise NotSupportedBPMNElement("task")
+
+        with self.assertRaises(NotSupportedBPMNElement) as raised:
+            cache.transform("d", "x", fail)
+        with self.assertRaises(KnownException) as cached:
+            cache.transform("d", "x", fail)
+        self.assertEqual(str(raised.exception), str(cached.exception))
+        self.assertEqual(self.calls, 1)
+
+    def test_transient_exceptions(self):
+        """Tests that an overloaded request does not fail the next idle request."""
+        cache = ResultCache()
+
+        def overloaded():
+            self.calls += 1
+            raise ServiceOverloaded()
+
+        with self.assertRaises(ServiceOverloaded):
+            cache.transform("d", "x", overloaded)
+        # Raised by a worker process
+        cache.put(cache_key("d", "x"), KnownException(ServiceOverloaded().id, ""))
+        self.assertEqual(list(cache.transform("d", "x", self.transform("r"))), ["r"])
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,50 @@
+"""Unit tests for the generator of synthetic models.
+
+Includes tests to check the size of the generated models and that both
+directions transform them.
+"""
+
+import unittest
+
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+
+from transformer.models.bpmn.bpmn import BPMN, OrGateway
+from transformer.models.pnml.pnml import Pnml
+from transformer.transform_bpmn_to_petrinet.transform import bpmn_to_workflow_net
+from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+
+
+class TestSynthetic(unittest.TestCase):
+    """This class tests the synthetic models."""
+
+    def test_size(self):
+        """Tests that the BPMN has the configured number of nodes."""
+        for nodes in [3, 50, 500]:
+            bpmn = generate_bpmn(SyntheticConfig(nodes, or_=1))
+            self.assertEqual(bpmn.process.element_counts()["nodes"], nodes)
+        self.assertTrue(bpmn.process.get_nodes(OrGateway))
+        self.assertEqual(
+            generate_bpmn(SyntheticConfig(500, seed=1)).to_string(),
+            generate_bpmn(SyntheticConfig(500, seed=1)).to_string(),
+        )
+
+    def test_transform(self):
+        """Tests that the models of different configurations are transformed."""
+        for config in [
+            SyntheticConfig(200, or_=2, depth=6),
+            SyntheticConfig(200, subprocesses=2, lanes=3, triggers=0.2, seed=1),
+        ]:
+            bpmn = BPMN.from_xml(generate_bpmn(config).to_string())
+            net = bpmn_to_workflow_net(bpmn).net
+            self.assertEqual(len(net.pages), config.subprocesses)
+            pnml = Pnml.from_xml_str(generate_workflow_net(config).to_string())
+            process = pnml_to_bpmn(pnml).process
+            self.assertEqual(len(process.subprocesses), config.subprocesses)
+
+
+if __name__ == "__main__":
+    unittest.main()
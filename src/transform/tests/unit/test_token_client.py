@@ -0,0 +1,111 @@
+"""Unit tests for the client of the rate limit.
+
+Includes tests to check the local serving of leased tokens and the handling of
+exhausted, failing and slow rate limits with a local rate limit server.
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from exceptions import NoRequestTokensAvailable, TokenCheckUnsuccessful
+from token_client import TokenClient
+
+
+class RateLimit(BaseHTTPRequestHandler):
+    """Rate limit answering like `checkTokens` with the tokens of the server."""
+
+    def do_GET(self):
+        """Consume the requested tokens."""
+        server = self.server
+        server.requests.append(self.path)  # type: ignore
+        time.sleep(server.delay)  # type: ignore
+        requested = int(parse_qs(urlparse(self.path).query).get("n", ["1"])[0])
+        body = b""
+        if server.status != 200:  # type: ignore
+            self.send_response(server.status)  # type: ignore
+        elif server.tokens < requested:  # type: ignore
+            self.send_response(429)
+        else:
+            server.tokens -= requested  # type: ignore
+            self.send_response(200)
+            body = json.dumps({"tokens": server.tokens, "granted": requested})  # type: ignore
+            body = body.encode()
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Do not log the requests."""
+
+
+class TestTokenClient(unittest.TestCase):
+    """This class tests the client of the rate limit."""
+
+    def setUp(self):
+        """Start a rate limit with 25 tokens."""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimit)
+        self.server.tokens = 25  # type: ignore
+        self.server.status = 200  # type: ignore
+        self.server.delay = 0  # type: ignore
+        self.server.requests = []  # type: ignore
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def tearDown(self):
+        """Stop the rate limit."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_lease(self):
+        """Tests that tokens are leased in blocks until the rate limit is empty."""
+        client = TokenClient(self.url, lease_size=10)
+        for _ in range(25):
+            client.acquire()
+        with self.assertRaises(NoRequestTokensAvailable):
+            client.acquire()
+        # Two blocks, the reported rest and a rejected single token.
+        self.assertEqual(
+            self.server.requests,  # type: ignore
+            ["/?n=10", "/?n=10", "/?n=5", "/"],
+        )
+
+    def test_exhausted(self):
+        """Tests that exhausted rate limits are asked once per request."""
+        self.server.tokens = 0  # type: ignore
+        client = TokenClient(self.url, lease_size=10)
+        for _ in range(3):
+            with self.assertRaises(NoRequestTokensAvailable):
+                client.acquire()
+        # Only the first lease asks for a block before the single token
+        self.assertEqual(self.server.requests, ["/?n=10", "/", "/", "/"])  # type: ignore
+        self.server.tokens = 25  # type: ignore
+        client.acquire()
+        client.acquire(2)
+        self.assertEqual(self.server.requests[4:], ["/", "/?n=10"])  # type: ignore
+
+    def test_expired_lease(self):
+        """Tests that expired tokens are not used."""
+        client = TokenClient(self.url, lease_size=10, lease_ttl=0)
+        client.acquire()
+        client.acquire()
+        self.assertEqual(self.server.tokens, 5)  # type: ignore
+
+    def test_failure_policy(self):
+        """Tests that failing and slow rate limits fail open or closed."""
+        self.server.status = 500  # type: ignore
+        TokenClient(self.url).acquire()
+        with self.assertRaises(TokenCheckUnsuccessful):
+            TokenClient(self.url, fail_open=False).acquire()
+        self.server.status = 200  # type: ignore
+        self.server.delay = 1  # type: ignore
+        TokenClient(self.url, timeout=0.1).acquire_async().result()
+        with self.assertRaises(TokenCheckUnsuccessful):
+            TokenClient(self.url, timeout=0.1, fail_open=False).acquire()
+        self.server.status = 400  # type: ignore
+        self.server.delay = 0  # type: ignore
+        with self.assertRaises(TokenCheckUnsuccessful):
+            TokenClient(self.url).acquire()
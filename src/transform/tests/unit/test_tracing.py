@@ -0,0 +1,83 @@
+"""Unit tests for the tracing of the transformation stages.
+
+Includes tests to check the stages of a transformation, the `Server-Timing` header
+and the traces of worker processes.
+"""
+
+import json
+import unittest
+from pathlib import Path
+
+from transformer.transform import transform_xml_string
+from transformer.utility import tracing
+
+ASSETS = Path(__file__).parents[1] / "assets" / "diagrams" / "pnml"
+
+
+class TestTracing(unittest.TestCase):
+    """This class tests the tracing of the transformation stages."""
+
+    def tearDown(self):
+        """Stop the trace of the test."""
+        tracing.stop_trace()
+
+    def test_transformation_stages(self):
+        """Tests that the stages of a transformation are traced with counts."""
+        xml = (ASSETS / "LoanApplication.pnml").read_text()
+        trace = tracing.start_trace()
+        result = transform_xml_string("pnmltobpmn", xml)
+        for name in [
+            "parse",
+            "handle_workflow_operators",
+            "transform",
+            "set_graphics",
+            "serialize",
+        ]:
+            self.assertIn(name, trace.stages)
+        self.assertEqual(trace.stages["parse"][2], {"nodes": 31, "arcs": 34})
+        self.assertEqual(trace.stages["handle_workflow_operators"][1], 1)
+
+        tracing.stop_trace()
+        self.assertEqual(transform_xml_string("pnmltobpmn", xml), result)
+
+    def test_server_timing(self):
+        """Tests that equal stages are summed up in the header and log line."""
+        trace = tracing.start_trace()
+        for _ in range(2):
+            with tracing.stage("parse"):
+                pass
+        trace.add("transform", 0.0015, {"nodes": 3})
+        header = trace.server_timing().split(", ")
+        self.assertEqual(
+            [metric.split(";")[0] for metric in header],
+            ["parse", "transform", "total"],
+        )
+        self.assertEqual(header[1], "transform;dur=1.50")
+        log = json.loads(trace.log_line(direction="bpmntopnml"))
+        self.assertEqual(log["direction"], "bpmntopnml")
+        self.assertEqual(log["stages"]["parse"]["calls"], 2)
+        self.assertEqual(log["stages"]["transform"]["nodes"], 3)
+
+    def test_disabled(self):
+        """Tests that no stages are recorded without trace."""
+        stage = tracing.stage("parse")
+        with stage:
+            pass
+        self.assertIsNone(tracing.current_trace())
+        self.assertIs(stage, tracing.stage("transform"))
+
+    def test_run_traced(self):
+        """Tests that the stages of a worker are returned and merged."""
+        traced_sum = tracing.traced("sum")(sum)
+        result, stages = tracing.run_traced(traced_sum, [1, 2])
+        self.assertEqual(result, 3)
+        self.assertEqual(stages["sum"][1], 1)
+        self.assertIsNone(tracing.current_trace())
+        trace = tracing.start_trace()
+        trace.merge(stages)
+        trace.merge(stages)
+        self.assertEqual(trace.stages["sum"][1], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
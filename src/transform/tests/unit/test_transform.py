@@ -3,9 +3,11 @@
 Includes tests for supported, unsupported, and ignored cases to handle transformations.
 """
 
+import os
 import shutil
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 from tests.testgeneration.testcases.bpmn_to_pnml.ignored_cases import (
     all_cases as ignored_cases_bpmn,
@@ -27,18 +29,34 @@ from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases_workflow\
 import (
     supported_cases_workflow_pnml,
 )
+from tests.testgeneration.bpmn.utility import create_bpmn
 from tests.testgeneration.utility import clear
 
 from exceptions import NotSupportedBPMNElement
 from transformer.equality.bpmn import compare_bpmn
 from transformer.equality.petrinet import compare_pnml
-from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.bpmn.bpmn import (
+    BPMN,
+    EndEvent,
+    OrGateway,
+    Process,
+    StartEvent,
+    Task,
+    XorGateway,
+)
 from transformer.models.pnml.pnml import Pnml
+from transformer.transform_bpmn_to_petrinet.preprocess_bpmn.or_gateways import (
+    find_matching_gateways,
+)
 from transformer.transform_bpmn_to_petrinet.transform import (
     bpmn_to_wf_net_from_xml,
     bpmn_to_workflow_net,
 )
-from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+from transformer.transform_petrinet_to_bpmn.transform import (
+    pnml_to_bpmn,
+    remove_unnecessary_gateways,
+)
+from transformer.utility.parallel import get_executor
 
 LOG_PATH = "test_log"
 
@@ -117,6 +135,31 @@ class TestPetriNetToBPMN(unittest.TestCase):
             with self.subTest(case):
                 self.assertTrue(equal, f"{case} should be equal\n{error}")
 
+    def test_remove_unnecessary_gateways(self):
+        """Tests the reduction of pass-through gateways and already connected nodes.
+
+        Removing the gateway between the split and the join reveals an existing
+        flow, afterwards split and join are pass-through gateways as well.
+        """
+        process = Process(id="process")
+        chain = [XorGateway(id=f"gw{i}") for i in range(50)]
+        for source, target in zip(
+            [StartEvent(id="start"), *chain], [*chain, EndEvent(id="end")]
+        ):
+            process.add_flow(source, target)
+        split, gw, join = XorGateway(id="s"), XorGateway(id="g"), XorGateway(id="j")
+        process.add_flow(StartEvent(id="start2"), split)
+        process.add_flow(split, join)
+        process.add_flow(split, gw)
+        process.add_flow(gw, join)
+        process.add_flow(join, EndEvent(id="end2"))
+
+        self.assertEqual(remove_unnecessary_gateways(process), 53)
+        self.assertEqual(
+            {(flow.sourceRef, flow.targetRef) for flow in process.flows},
+            {("start", "end"), ("start2", "end2")},
+        )
+
 
 class TestWorkflowNetToBPMN(unittest.TestCase):
     """Tests for verifying Workflows to BPMN model transformations.
@@ -156,7 +199,7 @@ class TestBPMNToPetriNet(unittest.TestCase):
         Petri net matches the expected outcome.
         """
         for bpmn, pn_expected, case in supported_cases_bpmn:
-            pn_transformed = bpmn_to_workflow_net(bpmn)
+            pn_transformed = bpmn_to_workflow_net(bpmn, layout=False)
             equal, error = compare_pnml(pn_expected.net, pn_transformed.net)
             if not equal:
                 save_failed_bpmn_to_pnml_transformation(
@@ -165,6 +208,42 @@ class TestBPMNToPetriNet(unittest.TestCase):
             with self.subTest(case):
                 self.assertTrue(equal, f"{case} should be equal\n{error}")
 
+    def test_or_gateway_matching(self):
+        """Tests the matching of nested OR-Splits and OR-Joins by dominators.
+
+        Both splits have a direct branch to their join, the second branch of the
+        outer split contains the nested split and join.
+        """
+        process = Process(id="process")
+        split, join = OrGateway(id="split"), OrGateway(id="join")
+        inner_split, inner_join = OrGateway(id="inner_split"), OrGateway(id="inner_j")
+        a, b, c = Task(id="a"), Task(id="b"), Task(id="c")
+        process.add_flow(StartEvent(id="start"), split)
+        process.add_flow(split, join, id="direct")
+        process.add_flow(split, a, id="to_a")
+        process.add_flow(a, inner_split)
+        process.add_flow(inner_split, b, id="to_b")
+        process.add_flow(inner_split, inner_join, id="inner_direct")
+        process.add_flow(b, inner_join, id="from_b")
+        process.add_flow(inner_join, c)
+        process.add_flow(c, join, id="from_c")
+        process.add_flow(join, EndEvent(id="end"))
+
+        gateways = [split, join, inner_split, inner_join]
+        matches = {
+            (m.split.id, m.flow_out_split.id): (m.join.id, m.flow_in_join.id)
+            for m in find_matching_gateways(process, gateways)
+        }
+        self.assertEqual(
+            matches,
+            {
+                ("split", "direct"): ("join", "direct"),
+                ("split", "to_a"): ("join", "from_c"),
+                ("inner_split", "to_b"): ("inner_j", "from_b"),
+                ("inner_split", "inner_direct"): ("inner_j", "inner_direct"),
+            },
+        )
+
     def test_unsupported_elemnts(self):
         """Tests the handling of unsupported BPMN elements.
 
@@ -182,7 +261,7 @@ class TestBPMNToPetriNet(unittest.TestCase):
         Petri net matches the expected outcome.
         """
         for bpmn_xml, pn_truth in ignored_cases_bpmn:
-            pn_transformed = bpmn_to_wf_net_from_xml(bpmn_xml)
+            pn_transformed = bpmn_to_wf_net_from_xml(bpmn_xml, layout=False)
             equal, error = compare_pnml(pn_truth.net, pn_transformed.net)
             self.assertTrue(equal, f"should be equal\n{error}")
         clear()
@@ -202,7 +281,7 @@ class TestBPMNToWorkflowNet(unittest.TestCase):
         matches the expected outcome.
         """
         for bpmn, pn_expected, case in supported_cases_workflow_bpmn:
-            pn_transformed = bpmn_to_workflow_net(bpmn)
+            pn_transformed = bpmn_to_workflow_net(bpmn, layout=False)
             equal, error = compare_pnml(pn_expected.net, pn_transformed.net)
             if not equal:
                 save_failed_bpmn_to_pnml_transformation(
@@ -211,6 +290,43 @@ class TestBPMNToWorkflowNet(unittest.TestCase):
             with self.subTest(case):
                 self.assertTrue(equal, f"{case} should be equal\n{error}")
 
+    def test_parallel_subprocesses(self):
+        """Tests that sibling subprocesses are transformed in parallel and merged.
+
+        The transformations in both directions must be equal to the sequential
+        transformations.
+        """
+
+        def create_case():
+            subprocesses = []
+            for i in range(3):
+                subprocess = create_bpmn(
+                    "temp",
+                    [
+                        [
+                            StartEvent(id=f"sb{i}_se"),
+                            Task(id=f"sb{i}_task", name="task"),
+                            EndEvent(id=f"sb{i}_ee"),
+                        ]
+                    ],
+                ).process
+                subprocess.id, subprocess.name = f"sb{i}", f"subprocess {i}"
+                subprocesses.append(subprocess)
+            return create_bpmn(
+                "parallel",
+                [[StartEvent(id="se"), *subprocesses, EndEvent(id="ee")]],
+            )
+
+        expected_net = bpmn_to_workflow_net(create_case())
+        expected_bpmn = pnml_to_bpmn(expected_net.model_copy(deep=True))
+        with patch.dict(os.environ, {"TRANSFORM_SUBPROCESS_WORKERS": "2"}):
+            self.assertIsNotNone(get_executor())
+            net = bpmn_to_workflow_net(create_case())
+            bpmn = pnml_to_bpmn(net.model_copy(deep=True))
+        self.assertEqual(len(net.net.pages), 3)
+        self.assertEqual(compare_pnml(expected_net.net, net.net), (True, None))
+        self.assertEqual(compare_bpmn(expected_bpmn, bpmn), (True, None))
+
 
 if __name__ == "__main__":
     if Path(LOG_PATH).exists():
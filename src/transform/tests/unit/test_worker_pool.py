@@ -0,0 +1,87 @@
+"""Unit tests for the worker pool.
+
+Includes tests to check the results and exceptions of the workers, the replacement
+of workers which missed the deadline and the rejection of calls over the queue.
+"""
+
+import os
+import time
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from exceptions import (
+    NotSupportedBPMNElement,
+    ServiceOverloaded,
+    TransformationTimeout,
+)
+from transformer.transform import transform_xml_string
+import worker_pool
+from worker_pool import WorkerPool
+
+NOT_SUPPORTED_BPMN = Path("tests/assets/diagrams/bpmn/Insurance.bpmn").read_text()
+
+
+class TestWorkerPool(unittest.TestCase):
+    """This class tests the worker pool."""
+
+    def setUp(self):
+        """Start a pool with one worker and one waiting call."""
+        self.pool = WorkerPool(1, deadline=5, max_queue=1)
+
+    def tearDown(self):
+        """Stop the workers."""
+        self.pool.close()
+
+    def test_results(self):
+        """Tests that results and exceptions are returned from the worker."""
+        self.assertEqual(self.pool.run(pow, 2, 10), 1024)
+        with self.assertRaises(ValueError):
+            self.pool.run(int, "x")
+        with self.assertRaises(NotSupportedBPMNElement) as context:
+            self.pool.run(transform_xml_string, "bpmntopnml", NOT_SUPPORTED_BPMN)
+        self.assertEqual(context.exception.id, 1)
+        self.assertIn("not supported", context.exception.message)
+
+    def test_deadline(self):
+        """Tests that a worker missing the deadline is replaced."""
+        start = time.monotonic()
+        with self.assertRaises(TransformationTimeout):
+            self.pool.run(time.sleep, 30, deadline=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(self.pool.stats()["restarts"], 1)
+        self.assertEqual(self.pool.run(pow, 2, 3), 8)
+
+    def test_overload(self):
+        """Tests that calls over the queue are rejected immediately."""
+        with ThreadPoolExecutor(2) as threads:
+            running = threads.submit(self.pool.run, time.sleep, 1)
+            time.sleep(0.2)
+            waiting = threads.submit(self.pool.run, pow, 2, 3)
+            time.sleep(0.2)
+            self.assertEqual(self.pool.queue_depth, 1)
+            with self.assertRaises(ServiceOverloaded):
+                self.pool.run(pow, 2, 3)
+            self.assertIsNone(running.result())
+            self.assertEqual(waiting.result(), 8)
+
+    def test_fork(self):
+        """Tests that a forked process (e.g. gunicorn worker) has its own pool."""
+        with patch.dict(os.environ, {"TRANSFORM_WORKERS": "1"}):
+            pool = worker_pool.get_pool()
+            try:
+                with warnings.catch_warnings():
+                    # The threads of the pool are not used by the child
+                    warnings.simplefilter("ignore", DeprecationWarning)
+                    pid = os.fork()
+                if pid == 0:
+                    # Exit code 0 if the child creates a new pool
+                    os._exit(int(worker_pool._pool is not None))
+                _, status = os.waitpid(pid, 0)
+                self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+                self.assertIs(worker_pool.get_pool(), pool)
+            finally:
+                pool.close()
+                worker_pool._pool = None
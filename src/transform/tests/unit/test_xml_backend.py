@@ -0,0 +1,50 @@
+"""Unit tests for the XML backends.
+
+Includes tests to check whether all backends read the same models and reject
+documents with entities.
+"""
+
+import unittest
+from pathlib import Path
+
+from exceptions import InvalidInputXML
+from transformer.models.bpmn.bpmn import BPMN
+from transformer.models.pnml.pnml import Pnml
+from transformer.utility import xml_backend
+
+ENTITY_BPMN = (
+    '<!DOCTYPE definitions [<!ENTITY e "x">]>'
+    '<definitions xmlns="http://www.omg.org/spec/BPMN/20100524/MODEL">'
+    '<process id="&e;"/></definitions>'
+)
+
+
+class TestXmlBackend(unittest.TestCase):
+    """This class tests the available XML backends."""
+
+    def tearDown(self):
+        """Restore the default backend."""
+        xml_backend.set_backend()
+
+    def test_same_models(self):
+        """Tests whether all backends read the same models."""
+        bpmn = Path("tests/assets/multiplesubprocesses.bpmn").read_text()
+        pnml = Path("tests/assets/multiplesubprocesses.pnml").read_text()
+        for backend in xml_backend.available_backends():
+            with self.subTest(backend=backend):
+                xml_backend.set_backend(backend)
+                self.assertEqual(BPMN.from_xml(bpmn), BPMN.from_xml_validated(bpmn))
+                parsed_pnml = Pnml.from_xml_str(pnml)
+                self.assertEqual(Pnml.from_xml_str(parsed_pnml.to_string()), parsed_pnml)
+
+    def test_entities_forbidden(self):
+        """Tests that documents declaring entities are rejected."""
+        for backend in xml_backend.available_backends():
+            with self.subTest(backend=backend):
+                xml_backend.set_backend(backend)
+                self.assertRaises(InvalidInputXML, BPMN.from_xml, ENTITY_BPMN)
+                self.assertRaises(InvalidInputXML, BPMN.from_xml_validated, ENTITY_BPMN)
+
+    def test_unknown_backend(self):
+        """Tests that unknown backends can not be selected."""
+        self.assertRaises(ValueError, xml_backend.set_backend, "unknown")
@@ -0,0 +1,169 @@
+"""Unit tests for the streaming XML writer.
+
+Includes tests to check whether the writer creates the same XML as the
+serialization of the pydantic_xml element tree and which elements the output
+profiles omit.
+"""
+
+import glob
+import io
+import unittest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from tests.testgeneration.synthetic import (
+    SyntheticConfig,
+    generate_bpmn,
+    generate_workflow_net,
+)
+from tests.testgeneration.testcases.bpmn_to_pnml.supported_cases import (
+    all_cases as supported_cases_bpmn,
+)
+from tests.testgeneration.testcases.pnml_to_bpmn.supported_cases import (
+    all_cases as supported_cases_pnml,
+)
+
+from exceptions import UnexpectedQueryParameter
+from transformer.equality.bpmn import compare_bpmn
+from transformer.equality.petrinet import compare_pnml
+from transformer.models.bpmn.bpmn import BPMN, EndEvent, StartEvent, Task
+from transformer.models.pnml.base import Name, NetElement
+from transformer.models.pnml.pnml import Pnml
+from transformer.transform import cache_direction, parse_profile, transform_xml_string
+from transformer.transform_bpmn_to_petrinet.transform import bpmn_to_workflow_net
+from transformer.utility import xml_writer
+from transformer.utility.profile import Profile
+from transformer.utility.utility import XML_HEADER, BaseModel
+
+
+class TestXmlWriter(unittest.TestCase):
+    """This class compares the writer with the element tree serialization."""
+
+    def assert_same_xml(self, model: BaseModel):
+        """Assert that the writer creates the serialized element tree."""
+        expected = ET.tostring(model.to_xml_tree(), encoding="unicode")
+        self.assertEqual(expected, xml_writer.to_xml_string(model))
+
+    def test_assets(self):
+        """Tests the models of the assets."""
+        for path in glob.glob("tests/assets/**/*.pnml", recursive=True):
+            with self.subTest(path=path):
+                self.assert_same_xml(Pnml.from_xml_str(Path(path).read_text()))
+        bpmn = BPMN.from_xml(Path("tests/assets/multiplesubprocesses.bpmn").read_text())
+        bpmn.set_graphics()
+        self.assert_same_xml(bpmn)
+
+    def test_supported_cases(self):
+        """Tests the models of the supported test cases."""
+        for bpmn, pnml, case in supported_cases_bpmn + supported_cases_pnml:
+            with self.subTest(case=case):
+                bpmn = bpmn.model_copy(deep=True)
+                bpmn.set_graphics()
+                self.assert_same_xml(bpmn)
+                self.assert_same_xml(pnml.model_copy(deep=True))
+
+    def test_streams(self):
+        """Tests the chunks with header and the text and binary streams."""
+        xml = Path("tests/assets/multiplesubprocesses.pnml").read_text()
+        pnml = Pnml.from_xml_str(xml)
+        expected = XML_HEADER + pnml.to_string()
+        self.assertEqual("".join(pnml.iter_string(header=True)), expected)
+        text_stream = io.StringIO()
+        xml_writer.write_xml(pnml, text_stream, header=True)
+        self.assertEqual(text_stream.getvalue(), expected)
+        binary_stream = io.BytesIO()
+        xml_writer.write_xml(pnml, binary_stream, header=True)
+        self.assertEqual(binary_stream.getvalue(), expected.encode())
+
+    def test_node_references(self):
+        """Tests that the flow ids of the nodes are written from the process graph."""
+        bpmn = BPMN.generate_empty_bpmn()
+        start, task, end = StartEvent(id="start"), Task(id="task"), EndEvent(id="end")
+        bpmn.process.add_flow(start, task, id="f1")
+        bpmn.process.add_flow(task, end, id="f2")
+        bpmn.process.change_node_id(task, "renamed")
+        self.assertEqual(bpmn.process.get_node("renamed"), task)
+        self.assertEqual(task.incoming, set())
+
+        written = BPMN.from_xml_validated(bpmn.to_string())
+        self.assertEqual(task.incoming, {"f1"})
+        self.assertEqual(task.outgoing, {"f2"})
+        renamed = written.process.get_node("renamed")
+        self.assertEqual(
+            written.process.get_incoming(renamed.id), (written.process.get_flow("f1"),)
+        )
+        self.assertEqual(written.process.get_out_degree(renamed), 1)
+
+    def test_omissions(self):
+        """Tests the omitted fields of subclasses and their namespaces."""
+        pnml = Pnml.from_xml_str(
+            Path("tests/assets/multiplesubprocesses.pnml").read_text()
+        )
+        omissions: xml_writer.Omissions = {
+            NetElement: {"graphics": xml_writer.omit_always},
+            Name: {"title": xml_writer.omit_default("p1")},
+        }
+        written = xml_writer.to_xml_string(pnml, omissions=omissions)
+        self.assertNotEqual(written, xml_writer.to_xml_string(pnml))
+        nets = [pnml.net]
+        for net in nets:
+            nets.extend(page.net for page in net.pages)
+            for element in net.places | net.transitions:
+                element.graphics = None
+                if element.name and element.name.title == "p1":
+                    element.name.title = None
+        self.assertEqual(written, xml_writer.to_xml_string(pnml))
+
+        bpmn = BPMN.from_xml(Path("tests/assets/multiplesubprocesses.bpmn").read_text())
+        omissions = {BPMN: {"diagram": xml_writer.omit_always}}
+        written = xml_writer.to_xml_string(bpmn, omissions=omissions)
+        bpmn.diagram = None
+        self.assertEqual(written, ET.tostring(bpmn.to_xml_tree(), encoding="unicode"))
+
+    def test_profiles(self):
+        """Tests the profiles write smaller models with the same structure."""
+        config = SyntheticConfig(60, subprocesses=1, lanes=2)
+        bpmn_xml = generate_bpmn(config).to_string()
+        pnml_xml = generate_workflow_net(config).to_string()
+        nets = {
+            profile: transform_xml_string("bpmntopnml", bpmn_xml, False, profile)
+            for profile in Profile
+        }
+        self.assertLess(len(nets[Profile.woped]), len(nets[Profile.full]))
+        self.assertLess(len(nets[Profile.compact]), len(nets[Profile.woped]))
+        self.assertIn("<timeUnit>", nets[Profile.full])
+        self.assertNotIn("<timeUnit>", nets[Profile.woped])
+        self.assertNotIn('<offset id="" x="20.0" y="20.0" />', nets[Profile.woped])
+        self.assertIn("<position", nets[Profile.woped])
+        self.assertNotIn("<graphics", nets[Profile.compact])
+        full = Pnml.from_xml_str(nets[Profile.full]).net
+        woped = Pnml.from_xml_str(nets[Profile.woped]).net
+        self.assertTrue(*compare_pnml(full, woped))
+        # The compact net is not laid out and has no names without text
+        unpositioned = bpmn_to_workflow_net(BPMN.from_xml(bpmn_xml), layout=False)
+        subnets = [unpositioned.net]
+        for net in subnets:
+            subnets.extend(page.net for page in net.pages)
+            for element in net.get_elements():
+                if element.name and not element.name.title:
+                    element.name = None
+        unpositioned = Pnml.from_xml_str(unpositioned.to_string()).net
+        compact = Pnml.from_xml_str(nets[Profile.compact]).net
+        self.assertTrue(*compare_pnml(unpositioned, compact))
+
+        full_bpmn = transform_xml_string("pnmltobpmn", pnml_xml)
+        compact_bpmn = transform_xml_string("pnmltobpmn", pnml_xml, False, "compact")
+        self.assertIn("BPMNDiagram", full_bpmn)
+        self.assertNotIn("BPMNDiagram", compact_bpmn)
+        self.assertTrue(
+            *compare_bpmn(BPMN.from_xml(full_bpmn), BPMN.from_xml(compact_bpmn))
+        )
+
+        self.assertEqual(parse_profile(None), Profile.full)
+        self.assertEqual(parse_profile("woped"), Profile.woped)
+        self.assertRaises(UnexpectedQueryParameter, parse_profile, "small")
+        self.assertEqual(cache_direction("bpmntopnml", False), "bpmntopnml")
+        self.assertEqual(
+            cache_direction("pnmltobpmn", True, Profile.compact),
+            "pnmltobpmn:trusted:compact",
+        )
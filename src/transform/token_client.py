@@ -0,0 +1,158 @@
+"""Client of the rate limit function `checkTokens`.
+
+The client keeps a pooled session with keep-alive connections and strict
+timeouts. Tokens are leased in blocks and served locally until the block is used
+up or expired, so most requests do not wait for the rate limit at all. The check
+runs in a background thread, concurrently with the transformation.
+
+The blocks are limited to the tokens the rate limit reported as left, after a
+rejection only the needed tokens are requested until a lease reports tokens
+again. Tokens of a block which are not used before it expires are lost, they
+were already taken from the rate limit. So an instance loses at most
+`TOKEN_LEASE_SIZE - 1` tokens per `TOKEN_LEASE_TTL`.
+
+The client is configured with the environment variables:
+
+- `TOKEN_LEASE_SIZE`: Number of tokens leased at once (default 10).
+- `TOKEN_LEASE_TTL`: Seconds a leased block may be used (default 60).
+- `TOKEN_CHECK_TIMEOUT`: Seconds to connect and to read the response (default 2).
+- `TOKEN_CHECK_FAIL_OPEN`: Whether requests are allowed if the rate limit does
+  not answer in time or fails (default true).
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from exceptions import NoRequestTokensAvailable, TokenCheckUnsuccessful
+
+
+class TokenClient:
+    """Leases request tokens of the rate limit and serves them locally."""
+
+    def __init__(
+        self,
+        url: str,
+        lease_size: int = 10,
+        lease_ttl: float = 60,
+        timeout: float = 2,
+        fail_open: bool = True,
+    ):
+        """Create a client with a pooled session.
+
+        Args:
+            url: URL of the `checkTokens` function.
+            lease_size: Number of tokens leased at once.
+            lease_ttl: Seconds a leased block may be used.
+            timeout: Seconds to connect and to read the response.
+            fail_open: Whether requests are allowed if the rate limit fails.
+        """
+        self.url = url
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self.timeout = timeout
+        self.fail_open = fail_open
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=8))
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=8))
+        self._threads = ThreadPoolExecutor(4, thread_name_prefix="token-check")
+        self._tokens = 0
+        self._expires = 0.0
+        # Tokens left in the rate limit after the last lease (None if unknown)
+        self._remaining: int | None = None
+        self._lock = threading.Lock()
+        self._lease_lock = threading.Lock()
+
+    def _take(self, count: int):
+        """Take tokens of the leased block and return whether enough were left."""
+        with self._lock:
+            if self._tokens < count or time.monotonic() >= self._expires:
+                return False
+            self._tokens -= count
+            return True
+
+    def _request(self, count: int):
+        """Request tokens and return the status code or None if it failed.
+
+        The tokens left in the rate limit are kept for the size of the next
+        lease, no tokens are left after a rejection.
+        """
+        try:
+            response = self._session.get(
+                self.url,
+                params={"n": count} if count != 1 else None,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            print("Token check failed:\n", str(e))
+            return None
+        if response.status_code == 429:
+            self._remaining = 0
+        elif response.status_code == 200:
+            try:
+                self._remaining = int(response.json()["tokens"])
+            except (ValueError, KeyError, TypeError):
+                self._remaining = None
+        return response.status_code
+
+    def acquire(self, count: int = 1):
+        """Consume request tokens of the leased block or lease a new block.
+
+        Raises:
+            NoRequestTokensAvailable: If the rate limit has no tokens left.
+            TokenCheckUnsuccessful: If the rate limit rejected the request or
+                failed and the client fails closed.
+        """
+        if self._take(count):
+            return
+        with self._lease_lock:
+            # Another thread may have leased a block in the meantime.
+            if self._take(count):
+                return
+            block = self.lease_size
+            if self._remaining is not None:
+                block = min(block, self._remaining)
+            lease = max(count, block)
+            status = self._request(lease)
+            if status == 429 and lease > count:
+                # Other instances took the tokens since the last lease.
+                lease = count
+                status = self._request(lease)
+            if status == 200:
+                with self._lock:
+                    self._tokens = lease - count
+                    self._expires = time.monotonic() + self.lease_ttl
+                return
+        if status == 400:
+            raise TokenCheckUnsuccessful()
+        if status == 429:
+            raise NoRequestTokensAvailable()
+        if not self.fail_open:
+            raise TokenCheckUnsuccessful()
+
+    def acquire_async(self, count: int = 1) -> Future:
+        """Consume request tokens in a background thread (see `acquire`)."""
+        return self._threads.submit(self.acquire, count)
+
+
+_client: TokenClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client(url: str):
+    """Return the client of the rate limit configured by the environment."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TokenClient(
+                url,
+                int(os.getenv("TOKEN_LEASE_SIZE", "10")),
+                float(os.getenv("TOKEN_LEASE_TTL", "60")),
+                float(os.getenv("TOKEN_CHECK_TIMEOUT", "2")),
+                os.getenv("TOKEN_CHECK_FAIL_OPEN", "true") != "false",
+            )
+    return _client
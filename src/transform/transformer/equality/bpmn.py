@@ -1,6 +1,7 @@
 """Methods to compare BPMNs by comparing all nodes with selected attributes."""
 
 from exceptions import PrivateInternalException
+from transformer.equality.fingerprint import bpmn_fingerprint
 from transformer.equality.utils import create_type_dict, to_comp_string
 from transformer.models.bpmn.base import GenericBPMNNode
 from transformer.models.bpmn.bpmn import (
@@ -11,7 +12,7 @@ from transformer.models.bpmn.bpmn import (
 )
 
 
-def bpmn_element_to_comp_value(e: GenericBPMNNode | Flow):
+def bpmn_element_to_comp_value(bpmn: Process, e: GenericBPMNNode | Flow):
     """Returns a concatenation of a by in/source and out/target comparable BPMN node."""
     if isinstance(e, LaneSet):
         return to_comp_string(
@@ -21,7 +22,12 @@ def bpmn_element_to_comp_value(e: GenericBPMNNode | Flow):
             ]
         )
     elif isinstance(e, GenericBPMNNode):
-        return to_comp_string(e.id, e.name, sorted(e.outgoing), sorted(e.incoming))
+        return to_comp_string(
+            e.id,
+            e.name,
+            sorted(flow.id for flow in bpmn.get_outgoing(e.id)),
+            sorted(flow.id for flow in bpmn.get_incoming(e.id)),
+        )
     elif isinstance(e, Flow):
         return to_comp_string(e.name, e.sourceRef, e.targetRef)
     else:
@@ -32,7 +38,7 @@ def bpmn_type_map(bpmn: Process):
     """Returns a by type grouped dictionary of the bpmn elements."""
     return create_type_dict(
         [*bpmn._flatten_node_typ_map(), *bpmn.flows, *bpmn.lane_sets],
-        bpmn_element_to_comp_value,
+        lambda e: bpmn_element_to_comp_value(bpmn, e),
     )
 
 
@@ -57,7 +63,14 @@ def get_organization(bpmn: BPMN):
 
 
 def compare_bpmn(bpmn1_comp: BPMN, bpmn2_comp: BPMN):
-    """Returns a boolean if the diagrams are equal and an optional error message."""
+    """Returns a boolean if the diagrams are equal and an optional error message.
+
+    Different fingerprints of the diagrams reject them without comparing the
+    elements, equal fingerprints are confirmed by comparing all elements.
+    """
+    if bpmn_fingerprint(bpmn1_comp) != bpmn_fingerprint(bpmn2_comp):
+        return False, "Different fingerprints"
+
     bpmn1_processes: dict[str, Process] = {}
     get_all_processes_by_id(bpmn1_comp.process, bpmn1_processes)
     bpmn2_processes: dict[str, Process] = {}
@@ -0,0 +1,170 @@
+"""Canonical fingerprints of processes and nets by color refinement of their graphs.
+
+A fingerprint is a digest of the nodes, edges and their attributes which does not
+depend on the order of the elements. With ids, a fingerprint only includes the
+attributes compared by `compare_bpmn` and `compare_pnml`, so different
+fingerprints mean that the models differ. Equal fingerprints are no proof of
+equality (color refinement does not distinguish all graphs), so the comparisons
+only use them to reject. Without ids, the fingerprint is equal for models which
+only differ by the ids of their elements (and their layout), i.e. up to id
+renaming.
+
+The fingerprint of a subprocess (page) is part of the label of its node, so the
+fingerprint of a process includes all of its subprocesses.
+"""
+
+import hashlib
+
+from pydantic import BaseModel as PydanticBaseModel
+
+from transformer.models.bpmn.base import GenericBPMNNode
+from transformer.models.bpmn.bpmn import BPMN, Flow, Process
+from transformer.models.pnml.base import NetElement
+from transformer.models.pnml.pnml import Arc, Net, Pnml
+
+# Fields of the models which are not compared without ids (ids and layout).
+_BPMN_IDS = {"id": True, "messageEvent": {"id"}, "timeEvent": {"id"}}
+_TOOLSPECIFIC_IDS = {
+    "operator": {"id"},
+    "trigger": {"id", "graphics"},
+    "transitionResource": {"graphics"},
+    "displayProbabilityPosition": True,
+}
+# Fields of the nodes which are part of the edges.
+_REFERENCES = {"incoming": True, "outgoing": True}
+
+
+def _digest(*parts: object):
+    """Return the digest of the representation of the parts."""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def _json(model: PydanticBaseModel | None, exclude: dict | None = None):
+    """Return the JSON of the fields of a model which are not None."""
+    if model is None:
+        return ""
+    return model.model_dump_json(exclude=exclude, exclude_none=True)
+
+
+def _process_fingerprints(process: Process, ids: bool, fingerprints: dict[str, str]):
+    """Add the fingerprints of the process and its subprocesses (by id)."""
+    for subprocess in process.subprocesses:
+        _process_fingerprints(subprocess, ids, fingerprints)
+
+    lane_of = {
+        ref: lane.name
+        for lane_set in process.lane_sets
+        for lane in lane_set.lanes
+        for ref in lane.flowNodeRefs
+    }
+    exclude = _REFERENCES | _BPMN_IDS
+
+    def node_label(node: GenericBPMNNode):
+        lane = lane_of.get(node.id)
+        if isinstance(node, Process):
+            id = node.id if ids else None
+            return repr(("Process", id, node.name, lane, fingerprints[node.id]))
+        if ids:
+            return repr((type(node).__name__, node.id, node.name, lane))
+        return f"{type(node).__name__}_{_json(node, exclude)}_{lane}"
+
+    def flow_label(flow: Flow):
+        if ids:
+            return repr((flow.name, flow.id, flow.sourceRef, flow.targetRef))
+        return repr(flow.name)
+
+    if ids:
+        lanes = sorted(
+            (lane.name or "", tuple(sorted(lane.flowNodeRefs)))
+            for lane_set in process.lane_sets
+            for lane in lane_set.lanes
+        )
+    else:
+        lanes = sorted(
+            (lane.name or "", len(lane.flowNodeRefs))
+            for lane_set in process.lane_sets
+            for lane in lane_set.lanes
+        )
+    fingerprints[process.id] = _digest(
+        process.id if ids else None,
+        process._graph.color_digest(node_label, flow_label),
+        lanes,
+    )
+
+
+def process_fingerprints(process: Process, ids: bool = True):
+    """Return the fingerprints of a process and all its subprocesses by id.
+
+    Args:
+        process: The process.
+        ids: Whether the ids are part of the fingerprints.
+    """
+    fingerprints: dict[str, str] = {}
+    _process_fingerprints(process, ids, fingerprints)
+    return fingerprints
+
+
+def process_fingerprint(process: Process, ids: bool = True):
+    """Return the fingerprint of a process (incl. subprocesses)."""
+    return process_fingerprints(process, ids)[process.id]
+
+
+def bpmn_fingerprint(bpmn: BPMN, ids: bool = True):
+    """Return the fingerprint of the process and the organization of a BPMN."""
+    participant = bpmn.collaboration.participant if bpmn.collaboration else None
+    organization = participant.name if participant else None
+    return _digest(organization, process_fingerprint(bpmn.process, ids))
+
+
+def _net_fingerprint(net: Net, ids: bool, fingerprints: dict[str, str]):
+    """Add the fingerprints of the net and its pages (by id) and return the first."""
+    pages: dict[str, str] = {}
+    for page in net.pages:
+        key = page.id or page.net.id or ""
+        pages[key] = fingerprints[key] = _net_fingerprint(page.net, ids, fingerprints)
+
+    def node_label(element: NetElement):
+        page = pages.pop(element.id, None)
+        kind = type(element).__name__
+        if ids:
+            name, toolspecific = _json(element.name), _json(element.toolspecific)
+            return f"{kind}_{element.id}_{name}_{toolspecific}_{page}"
+        toolspecific = _json(element.toolspecific, _TOOLSPECIFIC_IDS)
+        return f"{kind}_{element.get_name()}_{toolspecific}_{page}"
+
+    def arc_label(arc: Arc):
+        if ids:
+            return f"{arc.source}_{arc.target}_{_json(arc.toolspecific)}"
+        return _json(arc.toolspecific, _TOOLSPECIFIC_IDS)
+
+    digest = net._graph.color_digest(node_label, arc_label)
+    # Pages without a subprocess transition
+    unmatched = sorted(pages.items()) if ids else sorted(pages.values())
+    fingerprint = _digest(net.id if ids else None, digest, unmatched)
+    if net.id is not None:
+        fingerprints.setdefault(net.id, fingerprint)
+    return fingerprint
+
+
+def net_fingerprints(net: Net, ids: bool = True):
+    """Return the fingerprints of a net and all nested nets by id.
+
+    The nested nets are identified like in `compare_pnml` (by page id).
+
+    Args:
+        net: The net.
+        ids: Whether the ids are part of the fingerprints.
+    """
+    fingerprints: dict[str, str] = {}
+    _net_fingerprint(net, ids, fingerprints)
+    return fingerprints
+
+
+def net_fingerprint(net: Net, ids: bool = True):
+    """Return the fingerprint of a net (incl. pages)."""
+    return _net_fingerprint(net, ids, {})
+
+
+def pnml_fingerprint(pnml: Pnml, ids: bool = True):
+    """Return the fingerprint of the net of a PNML."""
+    return net_fingerprint(pnml.net, ids)
@@ -1,19 +1,29 @@
 """Methods to compare petri nets by comparing all nodes of all subprocesses."""
 
+from pydantic import BaseModel as PydanticBaseModel
+
 from exceptions import PrivateInternalException
+from transformer.equality.fingerprint import net_fingerprint
 from transformer.equality.utils import create_type_dict, to_comp_string
 from transformer.models.pnml.base import NetElement, ToolspecificGlobal
 from transformer.models.pnml.pnml import Arc, Net
 
 
+def _comp_json(model: PydanticBaseModel | None):
+    """Returns the JSON of a nested model (much faster than its representation)."""
+    if model is None:
+        return None
+    return model.model_dump_json(exclude_none=True)
+
+
 def petri_net_element_to_comp_value(e: NetElement | Arc):
     """Returns a comparable concatenation of a petri net element."""
     if isinstance(e, ToolspecificGlobal):
         return to_comp_string(e.resources)
     elif isinstance(e, NetElement):
-        return to_comp_string(e.id, e.name, e.toolspecific)
+        return to_comp_string(e.id, _comp_json(e.name), _comp_json(e.toolspecific))
     elif isinstance(e, Arc):
-        return to_comp_string(e.source, e.target, e.toolspecific)
+        return to_comp_string(e.source, e.target, _comp_json(e.toolspecific))
     else:
         raise PrivateInternalException(f"Not supported Petri Net Element: {type(e)}")
 
@@ -39,7 +49,14 @@ def get_all_nets_by_id(pn: Net, m: dict[str, Net]):
 
 
 def compare_pnml(pn1: Net, pn2: Net):
-    """Returns a boolean if the diagrams are equal and an optional error message."""
+    """Returns a boolean if the diagrams are equal and an optional error message.
+
+    Different fingerprints of the nets reject them without comparing the
+    elements, equal fingerprints are confirmed by comparing all elements.
+    """
+    if net_fingerprint(pn1) != net_fingerprint(pn2):
+        return False, "Different fingerprints"
+
     pn1_nets: dict[str, Net] = {}
     get_all_nets_by_id(pn1, pn1_nets)
     pn2_nets: dict[str, Net] = {}
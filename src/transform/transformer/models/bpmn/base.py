@@ -18,20 +18,16 @@ class BPMNNamespace(BaseBPMNModel, ns="bpmn", nsmap=ns_map):
 
 
 class GenericBPMNNode(BPMNNamespace):
-    """BPMN extension of BPMNNamespace with name, incoming and outgoing attribute."""
+    """BPMN extension of BPMNNamespace with name, incoming and outgoing attribute.
+
+    The incoming and outgoing flow ids are only set for the XML, the degrees of a
+    node are returned by its process.
+    """
 
     name: str | None = attr(default=None)
     incoming: set[str] = element("incoming", default_factory=set)
     outgoing: set[str] = element("outgoing", default_factory=set)
 
-    def get_in_degree(self):
-        """Returns incoming degree of this instance."""
-        return len(self.incoming)
-
-    def get_out_degree(self):
-        """Returns outgoing degree of this instance."""
-        return len(self.outgoing)
-
 
 class Gateway(GenericBPMNNode):
     """Gateway extension of BPMN node."""
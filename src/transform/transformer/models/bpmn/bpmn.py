@@ -1,10 +1,11 @@
 """BPMN objects and handling."""
 
+from collections.abc import Iterator, Set
+from operator import attrgetter
 from pathlib import Path
-from typing import cast
+from typing import Any
 
-from defusedxml.ElementTree import fromstring
-from pydantic import PrivateAttr
+from pydantic import PrivateAttr, field_serializer
 from pydantic_xml import attr, element
 
 from exceptions import (
@@ -20,14 +21,20 @@ from transformer.models.bpmn.base import (
 )
 from transformer.models.bpmn.bpmn_graphics import (
     BPMNDiagram,
-    BPMNEdge,
-    BPMNLabel,
     BPMNPlane,
     BPMNShape,
-    DCBounds,
-    DIWaypoint,
 )
+from transformer.utility import tracing, xml_backend, xml_writer
+from transformer.utility.graph import GraphView, IndexedGraph
+from transformer.utility.layout import (
+    EVENT_SIZE,
+    GATEWAY_SIZE,
+    Bounds,
+    bpmn_diagram_elements,
+)
+from transformer.utility.profile import Profile
 from transformer.utility.utility import create_arc_name, get_tag_name
+from transformer.utility.xml_writer import omit_always
 
 supported_elements = {
     "exclusiveGateway",
@@ -187,7 +194,15 @@ class Flow(BPMNNamespace, tag="sequenceFlow"):
 
 
 class Process(GenericBPMNNode):
-    """Process extension of GenericBPMNNode."""
+    """Process extension of GenericBPMNNode.
+
+    The structure of the process is only stored in an integer indexed graph (see
+    `IndexedGraph`) with the nodes and flows as payload and the node types as tags.
+    The nodes and flows of a constructed or parsed process are moved into the
+    graph, afterwards the node and flow fields are read-only views of the graph
+    (e.g. for the serialization). The incoming and outgoing flow ids of the nodes
+    are only set on writing (see `set_node_references`).
+    """
 
     isExecutable: bool = attr(default=False)
 
@@ -209,124 +224,152 @@ class Process(GenericBPMNNode):
 
     flows: set[Flow] = element(default_factory=set)
 
-    # internal helper structures
-    _type_map: dict[type[GenericBPMNNode], set[GenericBPMNNode]] = PrivateAttr(
-        default_factory=dict
+    # internal graph of the nodes and flows (keyed by id)
+    _graph: IndexedGraph[GenericBPMNNode, Flow] = PrivateAttr(
+        default_factory=IndexedGraph
     )
 
-    _temp_node_id_to_incoming: dict[str, set[Flow]] = PrivateAttr(default_factory=dict)
-    _temp_node_id_to_outgoing: dict[str, set[Flow]] = PrivateAttr(default_factory=dict)
-    _temp_nodes: dict[str, GenericBPMNNode] = PrivateAttr(default_factory=dict)
-    _temp_flows: dict[str, Flow] = PrivateAttr(default_factory=dict)
-
     # Holds the name of the ID of the usertask and participant (lane name)
     # Also holds the IDs of the usertasks within subprocesses
     _participant_mapping: dict[str, str] = PrivateAttr(default_factory=dict)
 
+    @field_serializer(
+        "start_events",
+        "end_events",
+        "intermediatecatch_events",
+        "tasks",
+        "user_tasks",
+        "service_tasks",
+        "xor_gws",
+        "or_gws",
+        "and_gws",
+        "subprocesses",
+        "flows",
+    )
+    def _serialize_view(self, elements: Set):
+        """Return the elements of a view in graph order (e.g. for pydantic_xml)."""
+        return list(elements)
+
     def __init__(self, **data):
         """Process instance constructor."""
         super().__init__(**data)
         self._init_reference_structures()
 
-    def _init_reference_structures(self):
-        """Instance initializer."""
-        self._type_map = cast(
-            dict[type[GenericBPMNNode], set[GenericBPMNNode]],
-            {
-                Task: self.tasks,
-                UserTask: self.user_tasks,
-                ServiceTask: self.service_tasks,
-                StartEvent: self.start_events,
-                EndEvent: self.end_events,
-                XorGateway: self.xor_gws,
-                OrGateway: self.or_gws,
-                AndGateway: self.and_gws,
-                Process: self.subprocesses,
-                IntermediateCatchEvent: self.intermediatecatch_events,
-                GenericBPMNNode: set(),
-            },
-        )
-        self._temp_node_id_to_incoming: dict[str, set[Flow]] = {}
-        self._temp_node_id_to_outgoing: dict[str, set[Flow]] = {}
-        self._temp_nodes: dict[str, GenericBPMNNode] = {}
-        self._temp_flows: dict[str, Flow] = {}
+    def __deepcopy__(self, memo: dict[int, Any] | None = None):
+        """Return a deep copy whose views show its copied graph.
 
-        for node in self._flatten_node_typ_map():
-            self._temp_nodes[node.id] = node
+        The fields and the private attributes are copied with one memo.
+        """
+        return super().__deepcopy__({} if memo is None else memo)
 
+    def _init_reference_structures(self):
+        """Move the nodes and flows into the graph.
+
+        The fields are replaced by views of the graph, the incoming and outgoing
+        flow ids of the nodes are replaced by the graph.
+        """
+        graph: IndexedGraph[GenericBPMNNode, Flow] = IndexedGraph()
+        self._graph = graph
+        views: dict[str, GraphView] = {}
+        for tag, field in _NODE_TYPES.values():
+            if field is None:
+                continue
+            for node in getattr(self, field):
+                graph.add_node(node.id, node, tag)
+                node.incoming.clear()
+                node.outgoing.clear()
+            views[field] = GraphView(graph, tag)
         for flow in self.flows:
-            self._temp_flows[flow.id] = flow
-            self._update_flow_incoming_outgoing(flow)
+            graph.add_edge(flow.id, flow.sourceRef, flow.targetRef, flow)
+        views["flows"] = GraphView(graph, endpoints=_flow_endpoints)
+        # Assigned without validation, the views are no sets
+        self.__dict__.update(views)
 
     def _flatten_node_typ_map(self):
         """Flatten nodes."""
-        r: list[GenericBPMNNode] = []
-        [r.extend(x) for x in self._type_map.values()]
-        return r
-
-    def _update_flow_incoming_outgoing(self, flow: Flow):
-        """Update source / target reference of instance."""
-        if flow.targetRef not in self._temp_node_id_to_incoming:
-            self._temp_node_id_to_incoming[flow.targetRef] = set([flow])
-        else:
-            self._temp_node_id_to_incoming[flow.targetRef].add(flow)
-
-        if flow.sourceRef not in self._temp_node_id_to_outgoing:
-            self._temp_node_id_to_outgoing[flow.sourceRef] = set([flow])
-        else:
-            self._temp_node_id_to_outgoing[flow.sourceRef].add(flow)
-
-    def _update_actual_incoming_outgoing(self, flow: Flow):
-        """Update underlying source / target of instance."""
-        self.flows.add(flow)
-        source = self._temp_nodes[flow.sourceRef]
-        target = self._temp_nodes[flow.targetRef]
-        source.outgoing.add(flow.id)
-        target.incoming.add(flow.id)
+        return list(self._graph.nodes())
+
+    def get_nodes(self, *types: type[GenericBPMNNode]) -> list[GenericBPMNNode]:
+        """Return the nodes of the types (not their subclasses) in insertion order."""
+        return list(self._graph.nodes(*(_NODE_TYPES[t][0] for t in types)))
+
+    def set_node_references(self):
+        """Set the incoming and outgoing flow ids of the nodes (incl. subprocesses).
+
+        The ids are only needed in the XML, the process itself uses its graph.
+        """
+        graph = self._graph
+        for node in graph.nodes():
+            node.incoming = {flow.id for flow in graph.incoming(node.id)}
+            node.outgoing = {flow.id for flow in graph.outgoing(node.id)}
+        for subprocess in self.subprocesses:
+            subprocess.set_node_references()
 
     def get_incoming(self, id: str):
         """Return the incoming flows of a element by id."""
-        return self._temp_node_id_to_incoming[id]
+        return self._graph.incoming(id)
 
     def get_outgoing(self, id: str):
         """Return the outgoing flows of a element by id."""
-        return self._temp_node_id_to_outgoing[id]
+        return self._graph.outgoing(id)
+
+    def get_in_degree(self, node: GenericBPMNNode):
+        """Return degree of incoming flows."""
+        return self._graph.in_degree(node.id)
+
+    def get_out_degree(self, node: GenericBPMNNode):
+        """Return degree of outgoing flows."""
+        return self._graph.out_degree(node.id)
 
     def get_node(self, id: str):
         """Return a node by id."""
-        return self._temp_nodes[id]
+        node = self._graph.node(id)
+        if node is None:
+            raise KeyError(id)
+        return node
 
     def is_node_existing(self, id: str):
         """Returns whether node with a id is existing in process."""
-        return id in self._temp_nodes
+        return id in self._graph
+
+    def is_flow_existing(self, id: str):
+        """Returns whether flow with a id is existing in process."""
+        return self._graph.has_edge(id)
+
+    def element_counts(self):
+        """Return the number of nodes and flows (incl. subprocesses)."""
+        counts = {"nodes": len(self._graph), "flows": self._graph.edge_count()}
+        for subprocess in self.subprocesses:
+            for kind, count in subprocess.element_counts().items():
+                counts[kind] += count
+        return counts
 
     def change_node_id(self, node: GenericBPMNNode, new_id: str):
         """Change node id and update connected flows."""
-        incoming_flows = self._temp_node_id_to_incoming.get(node.id, [])
+        incoming_flows = self._graph.incoming(node.id)
         incoming_flows_id_map = [
             (f.id, f.sourceRef, new_id, f.name) for f in incoming_flows
         ]
 
-        outgoing_flows = self._temp_node_id_to_outgoing.get(node.id, [])
+        outgoing_flows = self._graph.outgoing(node.id)
         outgoing_flows_id_map = [
             (f.id, new_id, f.targetRef, f.name) for f in outgoing_flows
         ]
 
         for f in [*incoming_flows, *outgoing_flows]:
             self.remove_flow(f)
+        # The hash of a node depends on its id
         self.remove_node(node)
+        node.id = new_id
+        self.add_node(node)
 
-        new_node = node.model_copy(deep=True)
-        new_node.id = new_id
-
-        self.add_node(new_node)
         for id, source_id, target_id, name in [
             *outgoing_flows_id_map,
             *incoming_flows_id_map,
         ]:
             self.add_flow(
-                source=self._temp_nodes[source_id],
-                target=self._temp_nodes[target_id],
+                source=self.get_node(source_id),
+                target=self.get_node(target_id),
                 id=id,
                 name=name,
             )
@@ -342,7 +385,7 @@ class Process(GenericBPMNNode):
         if id is None:
             id = create_arc_name(source.id, target.id)
 
-        if id in self._temp_flows:
+        if self._graph.has_edge(id):
             raise InternalTransformationException(
                 f"flow with the id {id} already exists!"
             )
@@ -351,36 +394,21 @@ class Process(GenericBPMNNode):
         self.add_node(target)
 
         a = Flow(id=id, sourceRef=source.id, targetRef=target.id, name=name)
-        self._temp_flows[id] = a
-        self._update_flow_incoming_outgoing(a)
-        self._update_actual_incoming_outgoing(a)
+        self._graph.add_edge(id, source.id, target.id, a)
         return a
 
     def add_constructed_flow(self, flow: Flow):
         """Add a finished flow to instance."""
         self.add_flow(
-            self._temp_nodes[flow.sourceRef],
-            self._temp_nodes[flow.targetRef],
+            self.get_node(flow.sourceRef),
+            self.get_node(flow.targetRef),
             flow.id,
             flow.name,
         )
 
-    def _remove_actual_flow(self, flow: Flow):
-        """Remove underlying flow of instance."""
-        self.flows.remove(flow)
-
-        source = self._temp_nodes[flow.sourceRef]
-        target = self._temp_nodes[flow.targetRef]
-        source.outgoing.remove(flow.id)
-        target.incoming.remove(flow.id)
-
     def remove_flow(self, flow: Flow):
         """Remove flow reference of instance."""
-        self._temp_flows.pop(flow.id)
-        self._temp_node_id_to_incoming[flow.targetRef].remove(flow)
-        self._temp_node_id_to_outgoing[flow.sourceRef].remove(flow)
-
-        self._remove_actual_flow(flow)
+        self._graph.remove_edge(flow.id)
 
     def add_nodes(self, *args: GenericBPMNNode):
         """Add multiple nodes to the BPMN."""
@@ -389,67 +417,96 @@ class Process(GenericBPMNNode):
 
     def add_node(self, new_node: GenericBPMNNode):
         """Add single node to the BPMN."""
-        storage_set = self._type_map[type(new_node)]
-        if storage_set is None:
+        node_type = _NODE_TYPES.get(type(new_node))
+        if node_type is None:
             raise InternalTransformationException("No BPMN node")
-        if new_node in storage_set:
+        if new_node.id in self._graph:
             # skip already added node
             return new_node
 
-        storage_set.add(new_node)
-
-        self._temp_nodes[new_node.id] = new_node
-
+        self._graph.add_node(new_node.id, new_node, node_type[0])
         return new_node
 
     def remove_node(self, to_remove_node: GenericBPMNNode):
-        """Remove single node frome the BPMN."""
-        storage_set = self._type_map[type(to_remove_node)]
-        if storage_set is None:
+        """Remove single node frome the BPMN.
+
+        The remaining connecting flows lose their source or target.
+        """
+        if type(to_remove_node) not in _NODE_TYPES:
             raise InternalTransformationException("No BPMN node")
 
-        if to_remove_node not in storage_set:
+        if to_remove_node.id not in self._graph:
             raise InternalTransformationException("Node doesnt exist")
 
-        storage_set.remove(to_remove_node)
+        _, incoming, outgoing = self._graph.remove_node(to_remove_node.id)
 
-        self._temp_nodes.pop(to_remove_node.id)
-
-        if to_remove_node.id in self._temp_node_id_to_incoming:
-            incoming = self._temp_node_id_to_incoming.pop(to_remove_node.id)
-            for arc in incoming:
-                arc.targetRef = ""
-        if to_remove_node.id in self._temp_node_id_to_outgoing:
-            outgoing = self._temp_node_id_to_outgoing.pop(to_remove_node.id)
-            for arc in outgoing:
-                arc.sourceRef = ""
+        for flow in incoming:
+            flow.targetRef = ""
+        for flow in outgoing:
+            flow.sourceRef = ""
 
     def get_flow_target_by_id(self, flow_id: str):
         """Return target nodes from flow id."""
-        return self._temp_nodes[self._temp_flows[flow_id].targetRef]
+        return self.get_node(self.get_flow(flow_id).targetRef)
 
     def get_flow_source_by_id(self, flow_id: str):
         """Return source nodes from flow id."""
-        return self._temp_nodes[self._temp_flows[flow_id].sourceRef]
+        return self.get_node(self.get_flow(flow_id).sourceRef)
 
     def get_flow(self, id: str):
         """Return flow by id."""
-        return self._temp_flows[id]
+        flow = self._graph.edge(id)
+        if flow is None:
+            raise KeyError(id)
+        return flow
 
     def remove_node_with_connecting_flows(self, node: GenericBPMNNode):
         """Remove node and its connected flows."""
-        if node.get_in_degree() > 0:
-            incoming_arc = list(self._temp_node_id_to_incoming[node.id])[0]
+        if self.get_in_degree(node) > 0:
+            incoming_arc = self._graph.incoming(node.id)[0]
             source_id = incoming_arc.sourceRef
             self.remove_flow(incoming_arc)
-        if node.get_out_degree() > 0:
-            outgoing_arc = list(self._temp_node_id_to_outgoing[node.id])[0]
+        if self.get_out_degree(node) > 0:
+            outgoing_arc = self._graph.outgoing(node.id)[0]
             target_id = outgoing_arc.targetRef
             self.remove_flow(outgoing_arc)
         self.remove_node(node)
         return source_id, target_id
 
 
+# Source and target id of a flow (for the flow view)
+_flow_endpoints = attrgetter("sourceRef", "targetRef")
+
+# Node types of a process, their tags in the graph and their field
+_NODE_TYPES: dict[type[GenericBPMNNode], tuple[int, str | None]] = {
+    Task: (0, "tasks"),
+    UserTask: (1, "user_tasks"),
+    ServiceTask: (2, "service_tasks"),
+    StartEvent: (3, "start_events"),
+    EndEvent: (4, "end_events"),
+    XorGateway: (5, "xor_gws"),
+    OrGateway: (6, "or_gws"),
+    AndGateway: (7, "and_gws"),
+    Process: (8, "subprocesses"),
+    IntermediateCatchEvent: (9, "intermediatecatch_events"),
+    # Temporary helper nodes (not serialized)
+    GenericBPMNNode: (10, None),
+}
+
+# Node tag -> size of the events and gateways (with labels below)
+_SMALL_SHAPES = {
+    _NODE_TYPES[node_type][0]: size
+    for node_type, size in [
+        (StartEvent, EVENT_SIZE),
+        (EndEvent, EVENT_SIZE),
+        (IntermediateCatchEvent, EVENT_SIZE),
+        (XorGateway, GATEWAY_SIZE),
+        (OrGateway, GATEWAY_SIZE),
+        (AndGateway, GATEWAY_SIZE),
+    ]
+}
+
+
 class BPMN(BPMNNamespace, tag="definitions"):
     """Extension of BPMNNamespace with attributes process and diagram."""
 
@@ -457,18 +514,43 @@ class BPMN(BPMNNamespace, tag="definitions"):
     process: Process = element(tag="process")
     diagram: BPMNDiagram | None = element(default=None)
 
+    # Bounds of the elements in the source diagram by id, used by the layouts
+    _geometry: dict[str, Bounds] = PrivateAttr(default_factory=dict)
+
+    def _index_geometry(self):
+        """Index the bounds of the shapes of the parsed diagram by element id."""
+        if not self.diagram or not self.diagram.plane:
+            return
+        self._geometry = {
+            e.bpmnElement: Bounds(
+                e.bounds.x, e.bounds.y, e.bounds.width, e.bounds.height
+            )
+            for e in self.diagram.plane.eles
+            if isinstance(e, BPMNShape)
+        }
+
     @staticmethod
-    def from_xml(xml_content: str):
-        """Return a BPMN from a XML string."""
+    def from_xml(xml_content: str) -> "BPMN":
+        """Return a BPMN from a XML string (single pass streaming parser)."""
+        # The parser builds the models of this module
+        from transformer.models.bpmn.parser import parse_bpmn
+
+        return parse_bpmn(xml_content)
+
+    @staticmethod
+    def from_xml_validated(xml_content: str):
+        """Return a BPMN from a XML string validated by the pydantic_xml models."""
         try:
-            tree = fromstring(xml_content)
+            tree = xml_backend.fromstring(xml_content)
             used_tags: set[str] = set()
             for elem in tree.iter():
                 used_tags.add(get_tag_name(elem))
             unhandled_tags = used_tags.difference(supported_tags)
             if len(unhandled_tags) > 0:
                 raise NotSupportedBPMNElement(str(unhandled_tags))
-            return BPMN.from_xml_tree(tree)
+            bpmn = BPMN.from_xml_tree(tree)
+            bpmn._index_geometry()
+            return bpmn
         except NotSupportedBPMNElement as e:
             raise e
         except Exception:
@@ -485,68 +567,74 @@ class BPMN(BPMNNamespace, tag="definitions"):
         """Return an empty bpmn with a process."""
         return BPMN(process=Process(id=id, isExecutable=True))
 
-    def to_string(self) -> str:
-        """Transform this instance into a string and creates placeholder graphics."""
+    def to_string(self, profile: Profile = Profile.full) -> str:
+        """Transform this instance into a string and lay out its diagram.
+
+        The compact profile omits the diagram without laying it out (see `Profile`).
+        """
         try:
-            self.set_graphics()
-            return cast(str, self.to_xml(encoding="unicode"))
+            self.process.set_node_references()
+            if profile != Profile.compact:
+                self.set_graphics()
+            with tracing.stage("serialize"):
+                return xml_writer.to_xml_string(
+                    self, omissions=_PROFILE_OMISSIONS[profile]
+                )
+        except Exception:
+            raise PrivateInternalException("Can't convert bpmn to string.")
+
+    def iter_string(
+        self, header: bool = False, profile: Profile = Profile.full
+    ) -> Iterator[str]:
+        """Yield this instance as XML in chunks (see `to_string`)."""
+        try:
+            self.process.set_node_references()
+            if profile != Profile.compact:
+                self.set_graphics()
+            chunks = xml_writer.iter_xml(self, header, _PROFILE_OMISSIONS[profile])
+            yield from tracing.iter_stage("serialize", chunks)
         except Exception:
             raise PrivateInternalException("Can't convert bpmn to string.")
 
     def write_to_file(self, path: str):
         """Save this instance xml encoded to a file."""
-        content = self.to_string()
-        Path(path).write_text(content)
+        with Path(path).open("w") as file:
+            file.writelines(self.iter_string())
 
+    @tracing.traced("set_graphics")
     def set_graphics(self):
-        """Define graphical representation of this instance."""
-        d = BPMNDiagram(id="diagram1")
+        """Lay out the diagram of this instance (see `bpmn_diagram_elements`).
+
+        The nodes with bounds in the source geometry keep their positions. The
+        lanes are stacked in the pool by name.
+        """
         bpmn = self.process
         plane_id = bpmn.id
         if self.collaboration:
             plane_id = self.collaboration.id
         p = BPMNPlane(id=f"plane{bpmn.id}", bpmnElement=plane_id)
 
-        if self.collaboration and self.collaboration.participant:
-            p.eles.append(
-                BPMNShape(
-                    id="Participant_id",
-                    bpmnElement=self.collaboration.participant.id,
-                    bounds=DCBounds(width=600, height=500),
-                )
-            )
-        if bpmn.lane_sets:
-            for lane_set in bpmn.lane_sets:
-                for lane in lane_set.lanes:
-                    lane.id = lane.id.replace(" ", "")
-                    p.eles.append(
-                        BPMNShape(
-                            id=f"{lane.id}_di",
-                            bpmnElement=lane.id,
-                            bounds=DCBounds(width=600, height=200),
-                        )
-                    )
-
-        for flow in bpmn.flows:
-            p.eles.append(
-                BPMNEdge(
-                    id=f"{flow.id}_di",
-                    bpmnElement=flow.id,
-                    waypoints=[DIWaypoint(), DIWaypoint()],
-                )
-            )
+        lanes = sorted(
+            (lane for lane_set in bpmn.lane_sets for lane in lane_set.lanes),
+            key=lambda lane: (lane.name or "", lane.id),
+        )
+        for lane in lanes:
+            lane.id = lane.id.replace(" ", "")
+        participant = self.collaboration.participant if self.collaboration else None
+        p.eles = bpmn_diagram_elements(
+            bpmn,
+            lanes,
+            participant.id if participant else None,
+            self._geometry,
+            _SMALL_SHAPES,
+            _NODE_TYPES[Process][0],
+        )
+        self.diagram = BPMNDiagram(id="diagram1", plane=p)
 
-        for node in bpmn._flatten_node_typ_map():
-            s = BPMNShape(
-                id=f"{node.id}_di",
-                bpmnElement=node.id,
-                bounds=DCBounds(width=100, height=80),
-            )
-            if isinstance(node, Process):
-                s.isExpanded = True
-            if node.name and not isinstance(node, Process | Task):
-                s.label = BPMNLabel(bounds=DCBounds(width=50, height=20))
-            p.eles.append(s)
-
-        d.plane = p
-        self.diagram = d
+
+# The diagram is the only generated default of a BPMN (WoPeD profile as full)
+_PROFILE_OMISSIONS: dict[Profile, xml_writer.Omissions] = {
+    Profile.full: xml_writer.NO_OMISSIONS,
+    Profile.woped: xml_writer.NO_OMISSIONS,
+    Profile.compact: {BPMN: {"diagram": omit_always}},
+}
@@ -0,0 +1,323 @@
+"""Single pass streaming parser for BPMN XML documents.
+
+The document is walked once with the secure `iterparse` of the XML backend.
+During the walk every tag is checked against the supported tags and the BPMN
+models are built directly. The graph of each `Process` is built once when the
+process is closed, the bounds of the shapes are indexed once at the end (see
+`BPMN._index_geometry`).
+
+The resulting models are identical to the models created by the generic
+`pydantic_xml` deserializer (see `BPMN.from_xml_validated`).
+"""
+
+from typing import Any
+
+from pydantic import TypeAdapter
+
+from exceptions import InvalidInputXML, NotSupportedBPMNElement
+from transformer.models.bpmn.base import BPMNNamespace, GenericBPMNNode, ns_map
+from transformer.models.bpmn.bpmn import (
+    BPMN,
+    AndGateway,
+    Collaboration,
+    EndEvent,
+    Flow,
+    IntermediateCatchEvent,
+    Lane,
+    LaneSet,
+    MessageEvent,
+    OrGateway,
+    Participant,
+    Process,
+    ServiceTask,
+    StartEvent,
+    Task,
+    TimeEvent,
+    UserTask,
+    XorGateway,
+    supported_tags,
+)
+from transformer.models.bpmn.bpmn_graphics import (
+    BPMNDiagram,
+    BPMNEdge,
+    BPMNLabel,
+    BPMNPlane,
+    BPMNShape,
+    DCBounds,
+    DIWaypoint,
+)
+from transformer.utility import xml_backend
+from transformer.utility.utility import unordered_search_order
+
+_to_bool = TypeAdapter(bool).validate_python
+
+
+def _qualified(ns: str, tag: str):
+    """Return the ElementTree name of a tag in a namespace."""
+    return f"{{{ns_map[ns]}}}{tag}"
+
+
+# Nodes stored in the type sets of a process (model, process field)
+_process_nodes: dict[str, tuple[type[GenericBPMNNode], str]] = {
+    _qualified("bpmn", "task"): (Task, "tasks"),
+    _qualified("bpmn", "userTask"): (UserTask, "user_tasks"),
+    _qualified("bpmn", "serviceTask"): (ServiceTask, "service_tasks"),
+    _qualified("bpmn", "startEvent"): (StartEvent, "start_events"),
+    _qualified("bpmn", "endEvent"): (EndEvent, "end_events"),
+    _qualified("bpmn", "intermediateCatchEvent"): (
+        IntermediateCatchEvent,
+        "intermediatecatch_events",
+    ),
+    _qualified("bpmn", "exclusiveGateway"): (XorGateway, "xor_gws"),
+    _qualified("bpmn", "inclusiveGateway"): (OrGateway, "or_gws"),
+    _qualified("bpmn", "parallelGateway"): (AndGateway, "and_gws"),
+    _qualified("bpmn", "subProcess"): (Process, "subprocesses"),
+}
+
+_node_references = {
+    _qualified("bpmn", "incoming"): (str, "incoming"),
+    _qualified("bpmn", "outgoing"): (str, "outgoing"),
+}
+
+# Expected children of a model: tag -> (child model, field of the parent)
+_children: dict[type, dict[str, tuple[type, str]]] = {
+    BPMN: {
+        _qualified("bpmn", "collaboration"): (Collaboration, "collaboration"),
+        _qualified("bpmn", "process"): (Process, "process"),
+        _qualified("bpmndi", "BPMNDiagram"): (BPMNDiagram, "diagram"),
+    },
+    Process: {
+        **_node_references,
+        **_process_nodes,
+        _qualified("bpmn", "sequenceFlow"): (Flow, "flows"),
+        _qualified("bpmn", "laneSet"): (LaneSet, "lane_sets"),
+    },
+    IntermediateCatchEvent: {
+        **_node_references,
+        _qualified("bpmn", "messageEventDefinition"): (MessageEvent, "messageEvent"),
+        _qualified("bpmn", "timerEventDefinition"): (TimeEvent, "timeEvent"),
+    },
+    Collaboration: {
+        **_node_references,
+        _qualified("bpmn", "participant"): (Participant, "participant"),
+    },
+    Participant: _node_references,
+    LaneSet: {**_node_references, _qualified("bpmn", "lane"): (Lane, "lanes")},
+    Lane: {
+        **_node_references,
+        _qualified("bpmn", "flowNodeRef"): (str, "flowNodeRefs"),
+    },
+    BPMNDiagram: {_qualified("bpmndi", "BPMNPlane"): (BPMNPlane, "plane")},
+    BPMNPlane: {
+        _qualified("bpmndi", "BPMNShape"): (BPMNShape, "eles"),
+        _qualified("bpmndi", "BPMNEdge"): (BPMNEdge, "eles"),
+        _qualified("bpmndi", "BPMNLabel"): (BPMNLabel, "label"),
+    },
+    BPMNShape: {
+        _qualified("dc", "Bounds"): (DCBounds, "bounds"),
+        _qualified("bpmndi", "BPMNLabel"): (BPMNLabel, "label"),
+    },
+    BPMNEdge: {
+        _qualified("di", "waypoint"): (DIWaypoint, "waypoints"),
+        _qualified("bpmndi", "BPMNLabel"): (BPMNLabel, "label"),
+    },
+    BPMNLabel: {_qualified("dc", "Bounds"): (DCBounds, "bounds")},
+}
+for _model, _ in _process_nodes.values():
+    if _model not in _children:
+        _children[_model] = _node_references
+
+# XML attributes of the models (other attributes are ignored)
+_attributes: dict[type, tuple[str, ...]] = {
+    Process: ("id", "name", "isExecutable"),
+    Flow: ("id", "name", "sourceRef", "targetRef"),
+    Participant: ("id", "name", "processRef"),
+    BPMNPlane: ("id", "name", "bpmnElement"),
+    BPMNShape: ("id", "name", "bpmnElement", "isExpanded"),
+    BPMNEdge: ("id", "name", "bpmnElement"),
+    DCBounds: ("id", "name", "x", "y", "width", "height"),
+    DIWaypoint: ("id", "name", "x", "y"),
+}
+_required_attributes: dict[type, tuple[str, ...]] = {
+    Flow: ("sourceRef", "targetRef"),
+    Participant: ("processRef",),
+}
+
+_collection_fields = {
+    "incoming",
+    "outgoing",
+    "flows",
+    "lane_sets",
+    "lanes",
+    "flowNodeRefs",
+    "eles",
+    "waypoints",
+    *{field for _, field in _process_nodes.values()},
+}
+
+
+class _Frame:
+    """State of an opened element."""
+
+    __slots__ = ("model", "field", "values", "obj", "seen", "tags")
+
+    def __init__(self, model: type, field: str | None, attrib: dict[str, str]):
+        """Create the frame of an element assigned to a field of the parent."""
+        self.model = model
+        self.field = field
+        self.values: dict[str, Any] = {
+            name: attrib[name]
+            for name in _attributes.get(model, ("id", "name"))
+            if name in attrib
+        }
+        for name in _required_attributes.get(model, ()):
+            if name not in self.values:
+                raise ValueError(f"{model.__name__} requires attribute {name}.")
+        # fields which received at least one child
+        self.seen: set[str] = set()
+        # tags of all children in document order
+        self.tags: list[str] = []
+        # BPMN nodes are created on opening and filled with their children.
+        # The definitions and graphical elements are validated on closing.
+        self.obj: Any = None
+        if model is Process:
+            if "isExecutable" in self.values:
+                self.values["isExecutable"] = _to_bool(self.values["isExecutable"])
+            self.obj = Process.model_construct(**self.values)
+        elif model is not BPMN and issubclass(model, BPMNNamespace):
+            self.obj = model.model_construct(**self.values)
+
+    def accepts(self, tag: str):
+        """Return the child model and field of a tag if it is used by this model."""
+        child = _children.get(self.model, {}).get(tag)
+        if child is None:
+            return None
+        # Only the first element is used for single valued fields
+        if child[1] not in _collection_fields and child[1] in self.seen:
+            return None
+        return child
+
+    def add(self, field: str, value: Any):
+        """Add the value of a closed child element."""
+        self.seen.add(field)
+        if self.obj is None:
+            if field in _collection_fields:
+                self.values.setdefault(field, []).append(value)
+            else:
+                self.values[field] = value
+        elif field in _collection_fields:
+            getattr(self.obj, field).add(value)
+        else:
+            setattr(self.obj, field, value)
+
+    def close(self, text: str | None):
+        """Return the finished value of this element."""
+        if self.model is str:
+            if text is None:
+                raise ValueError("Missing text.")
+            return text
+        if self.obj is None:
+            if self.model is BPMNPlane and "eles" in self.values:
+                self.values["eles"] = _plane_elements_order(
+                    self.tags, self.values["eles"]
+                )
+            return self.model(**self.values)
+        self.obj.__pydantic_fields_set__.update(self.seen)
+        if self.model is Process:
+            # The flows may precede their nodes in the document
+            self.obj._init_reference_structures()
+        return self.obj
+
+
+_shape_tag = _qualified("bpmndi", "BPMNShape")
+_edge_tag = _qualified("bpmndi", "BPMNEdge")
+_label_tag = _qualified("bpmndi", "BPMNLabel")
+
+
+def _plane_elements_order(tags: list[str], eles: list[BPMNShape | BPMNEdge]):
+    """Return the plane elements in the order of the pydantic_xml deserializer.
+
+    The label is searched first, afterwards shapes are preferred over edges for
+    each element of the list.
+    """
+    values = iter(eles)
+    by_index = {
+        i: next(values) for i, tag in enumerate(tags) if tag in (_shape_tag, _edge_tag)
+    }
+    order = unordered_search_order(
+        tags, [(_label_tag, False), (_shape_tag, True), (_edge_tag, True)]
+    )
+    return [by_index[i] for i in order if i in by_index]
+
+
+def parse_bpmn(xml_content: str):
+    """Return a BPMN from a XML string in a single streaming pass.
+
+    Raises:
+        NotSupportedBPMNElement: If the document contains not supported tags.
+        InvalidInputXML: If the document is malformed or not a valid BPMN.
+    """
+    unhandled_tags: set[str] = set()
+    # None marks ignored elements
+    stack: list[_Frame | None] = []
+    bpmn: BPMN | None = None
+    is_building = True
+    try:
+        for event, elem in xml_backend.iterparse(xml_content):
+            if event == "start":
+                local_name = elem.tag.rpartition("}")[2].lower()
+                if local_name not in supported_tags:
+                    unhandled_tags.add(local_name)
+                    is_building = False
+                # After an issue was found, only the tags are checked
+                if not is_building:
+                    stack.append(None)
+                    continue
+                try:
+                    stack.append(_open(elem, stack))
+                except Exception:
+                    is_building = False
+                    stack.append(None)
+                continue
+
+            frame = stack.pop()
+            if frame is not None and is_building:
+                try:
+                    value = frame.close(elem.text)
+                    if stack:
+                        stack[-1].add(frame.field, value)  # type: ignore
+                    else:
+                        bpmn = value
+                except Exception:
+                    is_building = False
+            # Finished elements are not needed anymore
+            elem.clear()
+    except Exception:
+        raise InvalidInputXML()
+
+    if len(unhandled_tags) > 0:
+        raise NotSupportedBPMNElement(str(unhandled_tags))
+    if not is_building or bpmn is None:
+        raise InvalidInputXML()
+    bpmn._index_geometry()
+    return bpmn
+
+
+def _open(elem: Any, stack: list[_Frame | None]):
+    """Return the frame of an opened element or None if it is ignored."""
+    if not stack:
+        if elem.tag != _qualified("bpmn", "definitions"):
+            raise ValueError(f"Unexpected root element {elem.tag}.")
+        return _Frame(BPMN, None, elem.attrib)
+    parent = stack[-1]
+    if parent is None:
+        return None
+    parent.tags.append(elem.tag)
+    child = parent.accepts(elem.tag)
+    if child is None:
+        return None
+    model, field = child
+    if field not in _collection_fields:
+        # Following elements of single valued fields are ignored
+        parent.seen.add(field)
+    return _Frame(model, field, elem.attrib)
@@ -0,0 +1,335 @@
+"""Fast reader for trusted PNML documents (e.g. exported by WoPeD).
+
+The document is walked once with expat and the models are created
+`model_construct`-style, which skips the pydantic validation. Only non string
+values (coordinates, enums, flags) are converted. The graph of each `Net` is
+filled during the same walk, the bounds of the nodes are indexed once
+at the end (see `Pnml._index_geometry`).
+
+Cheap structural checks replace the validation: required attributes must exist,
+node ids and arcs (id, source and target) must be unique within a net and every
+arc must connect existing nodes of its net. Like `defusedxml`, entity
+declarations and external references are rejected.
+
+The reader is only about 1.2-2.5 times faster than the validated reader (depending
+on the net and the machine), most of the time is spent creating the models. It is
+only used if the deployment trusts its callers (see `trusted_pnml`).
+"""
+
+import copy
+import types
+import typing
+from collections.abc import Callable
+from enum import Enum
+from typing import Any
+from xml.parsers import expat
+
+from pydantic import BaseModel as PydanticBaseModel
+from pydantic import TypeAdapter
+from pydantic_xml.model import XmlEntityInfo
+
+from exceptions import InvalidInputXML
+from transformer.models.pnml.base import NetElement
+from transformer.models.pnml.pnml import Arc, Net, Pnml
+from transformer.utility.utility import BaseModel, unordered_search_order
+
+
+def _unwrap(annotation: Any) -> tuple[Any, type | None]:
+    """Return the inner type and collection type of an annotation."""
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        annotation = next(a for a in typing.get_args(annotation) if a is not type(None))
+        origin = typing.get_origin(annotation)
+    if origin in (set, list):
+        return typing.get_args(annotation)[0], origin
+    return annotation, None
+
+
+def _converter(annotation: Any) -> Callable[[str], Any] | None:
+    """Return the conversion of a XML string to a type (None for strings)."""
+    if annotation is str:
+        return None
+    if annotation in (float, int):
+        return annotation
+    return TypeAdapter(annotation).validate_python
+
+
+def _is_immutable(value: Any):
+    """Return whether a default value can be shared by all instances."""
+    return value is None or isinstance(value, str | int | float | bool | Enum)
+
+
+def _default_factory(default: Any) -> Callable[[], Any]:
+    """Return a function creating a copy of a mutable default value."""
+    if isinstance(default, BaseModel) and not default.model_fields_set:
+        # A default model only contains default values
+        return lambda: _spec(type(default)).construct({})
+    return lambda: copy.deepcopy(default)
+
+
+class _ModelSpec:
+    """XML mapping and construction of a model derived from its fields."""
+
+    __slots__ = (
+        "model",
+        "attributes",
+        "elements",
+        "searches",
+        "defaults",
+        "factories",
+        "required",
+        "generic",
+    )
+
+    def __init__(self, model: type[BaseModel]):
+        """Collect the attributes, sub elements and defaults of a model."""
+        self.model = model
+        # xml name -> (field, converter)
+        self.attributes: dict[str, tuple[str, Callable | None]] = {}
+        # tag -> (field, child model or converter, collection type)
+        self.elements: dict[str, tuple[str, Any, type | None]] = {}
+        for field, info in model.model_fields.items():
+            annotation, collection = _unwrap(info.annotation)
+            path = info.path if isinstance(info, XmlEntityInfo) else None
+            location = getattr(info, "location", None)
+            if location is not None and location.name == "ATTRIBUTE":
+                name = path or info.alias or field
+                self.attributes[name] = (field, _converter(annotation))
+            elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+                tag = path or annotation.__xml_tag__ or info.alias or field
+                self.elements[tag] = (field, annotation, collection)
+            else:
+                tag = path or info.alias or field
+                self.elements[tag] = (field, _converter(annotation), collection)
+        # searched tags in field order (see unordered_search_order)
+        self.searches = [
+            (tag, collection is not None)
+            for tag, (_, _, collection) in self.elements.items()
+        ]
+        # shared defaults in field order and factories of mutable defaults
+        self.defaults: dict[str, Any] = {}
+        self.factories: list[tuple[str, Callable[[], Any]]] = []
+        self.required: set[str] = set()
+        for field, info in model.model_fields.items():
+            self.defaults[field] = None
+            if info.default_factory is not None:
+                self.factories.append((field, info.default_factory))  # type: ignore
+            elif info.is_required():
+                self.required.add(field)
+            elif _is_immutable(info.default):
+                self.defaults[field] = info.default
+            else:
+                self.factories.append((field, _default_factory(info.default)))
+        # Models with private attributes are created by pydantic
+        self.generic = model.__pydantic_post_init__ is not None
+
+    def construct(self, values: dict[str, Any]):
+        """Return a model from the values without validation."""
+        if self.generic:
+            return self.model.model_construct(**values)
+        if not self.required.issubset(values):
+            raise ValueError(f"{self.model.__name__} requires {self.required}.")
+        fields = self.defaults.copy()
+        fields.update(values)
+        for field, factory in self.factories:
+            if field not in values:
+                fields[field] = factory()
+        obj = object.__new__(self.model)
+        object.__setattr__(obj, "__dict__", fields)
+        _set_fields_set(obj, set(values))
+        _set_extra(obj, None)
+        _set_private(obj, None)
+        return obj
+
+
+# Setters of the pydantic slots (see BaseModel.model_construct)
+_set_fields_set = PydanticBaseModel.__dict__["__pydantic_fields_set__"].__set__
+_set_extra = PydanticBaseModel.__dict__["__pydantic_extra__"].__set__
+_set_private = PydanticBaseModel.__dict__["__pydantic_private__"].__set__
+
+_specs: dict[type, _ModelSpec] = {}
+
+
+def _spec(model: type[BaseModel]):
+    """Return the (cached) spec of a model."""
+    if model not in _specs:
+        _specs[model] = _ModelSpec(model)
+    return _specs[model]
+
+
+class _Frame:
+    """State of an opened model element."""
+
+    __slots__ = ("spec", "field", "collection", "values", "seen", "tags", "children")
+
+    def __init__(
+        self,
+        spec: _ModelSpec,
+        field: str | None,
+        collection: type | None,
+        attrib: dict[str, str],
+    ):
+        """Create the frame of an element assigned to a field of the parent."""
+        self.spec = spec
+        self.field = field
+        self.collection = collection
+        self.values: dict[str, Any] = {}
+        for name, value in attrib.items():
+            attribute = spec.attributes.get(name)
+            if attribute is not None:
+                field_name, convert = attribute
+                self.values[field_name] = value if convert is None else convert(value)
+        # single valued fields which are already assigned to a child
+        self.seen: set[str] = set()
+        # tags of all children and the values (field, value) of a net by position
+        self.tags: list[str] = []
+        self.children: dict[int, tuple[str, Any]] = {}
+
+    def add(self, field: str, collection: type | None, value: Any):
+        """Add the value of the last opened child."""
+        if self.spec.model is Net:
+            self.children[len(self.tags) - 1] = (field, value)
+        elif collection is not None:
+            self.values.setdefault(field, []).append(value)
+        else:
+            self.values[field] = value
+
+    def close(self):
+        """Return the model of this element."""
+        if self.spec.model is Net:
+            return _build_net(self)
+        for _, (field, _, collection) in self.spec.elements.items():
+            if collection is set and field in self.values:
+                self.values[field] = set(self.values[field])
+        return self.spec.construct(self.values)
+
+
+def _build_net(frame: _Frame):
+    """Return a net with the children in the order of the pydantic_xml reader.
+
+    The elements are collected in sets like the validated reader, their
+    iteration order is the order of the graph and the serialized elements.
+    """
+    values = dict(frame.values)
+    node_ids: set[str] = set()
+    arc_keys: set[tuple[str, str, str]] = set()
+    for index in unordered_search_order(frame.tags, frame.spec.searches):
+        if index not in frame.children:
+            continue
+        field, value = frame.children[index]
+        if isinstance(value, NetElement):
+            if value.id in node_ids:
+                raise ValueError(f"Duplicate node id {value.id}.")
+            node_ids.add(value.id)
+            values.setdefault(field, set()).add(value)
+        elif isinstance(value, Arc):
+            arc_key = (value.id, value.source, value.target)
+            if arc_key in arc_keys:
+                raise ValueError(f"Duplicate arc {value.id}.")
+            arc_keys.add(arc_key)
+            values.setdefault(field, set()).add(value)
+        elif field == "pages":
+            values.setdefault(field, set()).add(value)
+        else:
+            values[field] = value
+
+    # The arcs may precede their nodes in the document
+    for arc in values.get("arcs", ()):
+        if arc.source not in node_ids or arc.target not in node_ids:
+            raise ValueError(f"Arc {arc.id} has a missing source or target.")
+    net = Net.model_construct(**values)
+    net._init_reference_structures()
+    return net
+
+
+class _Reader:
+    """Expat handlers building the models of a PNML document."""
+
+    def __init__(self):
+        """Create a reader without elements."""
+        # Frames of models, (field, converter) of primitive elements and
+        # None for ignored elements
+        self.stack: list[Any] = []
+        # text chunks since the last opened element
+        self.text: list[str] = []
+        self.pnml: Pnml | None = None
+
+    def start(self, tag: str, attrib: dict[str, str]):
+        """Open an element."""
+        self.text.clear()
+        stack = self.stack
+        if not stack:
+            if tag != Pnml.__xml_tag__:
+                raise ValueError(f"Unexpected root element {tag}.")
+            stack.append(_Frame(_spec(Pnml), None, None, attrib))
+            return
+        parent = stack[-1]
+        if parent.__class__ is not _Frame:
+            stack.append(None)
+            return
+        parent.tags.append(tag)
+        child = parent.spec.elements.get(tag)
+        if child is None:
+            stack.append(None)
+            return
+        field, model, collection = child
+        if collection is None:
+            # Only the first element is used for single valued fields
+            if field in parent.seen:
+                stack.append(None)
+                return
+            parent.seen.add(field)
+        if isinstance(model, type):
+            stack.append(_Frame(_spec(model), field, collection, attrib))
+        else:
+            stack.append((field, model))
+
+    def end(self, tag: str):
+        """Close an element and add its value to the parent."""
+        frame = self.stack.pop()
+        if frame is None:
+            return
+        if frame.__class__ is _Frame:
+            value = frame.close()
+            if not self.stack:
+                self.pnml = value
+                return
+            self.stack[-1].add(frame.field, frame.collection, value)
+            return
+        field, convert = frame
+        text = "".join(self.text)
+        # Empty elements keep the default value
+        if text:
+            value = text if convert is None else convert(text)
+            self.stack[-1].add(field, None, value)
+
+
+def _forbidden(*args: Any):
+    """Reject entity declarations and external references."""
+    raise ValueError("Entities and external references are forbidden.")
+
+
+def parse_trusted_pnml(xml_content: str):
+    """Return a petri net from a trusted XML string in a single streaming pass.
+
+    Raises:
+        InvalidInputXML: If the document is malformed or structurally invalid.
+    """
+    reader = _Reader()
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = reader.start
+    parser.EndElementHandler = reader.end
+    parser.CharacterDataHandler = reader.text.append
+    parser.EntityDeclHandler = _forbidden
+    parser.UnparsedEntityDeclHandler = _forbidden
+    parser.ExternalEntityRefHandler = _forbidden
+    try:
+        parser.Parse(xml_content, True)
+    except Exception:
+        raise InvalidInputXML()
+
+    if reader.pnml is None:
+        raise InvalidInputXML()
+    reader.pnml._index_geometry()
+    return reader.pnml
@@ -1,10 +1,11 @@
 """PNML models."""
 
+from collections.abc import Iterator, Set
+from operator import attrgetter
 from pathlib import Path
-from typing import cast
+from typing import Any
 
-from defusedxml.ElementTree import fromstring
-from pydantic import PrivateAttr
+from pydantic import PrivateAttr, field_serializer
 from pydantic_xml import attr, element
 
 from exceptions import (
@@ -19,7 +20,7 @@ from transformer.models.pnml.base import (
     Toolspecific,
     ToolspecificGlobal,
 )
-from transformer.models.pnml.graphics import OffsetGraphics
+from transformer.models.pnml.graphics import OffsetGraphics, PositionGraphics
 from transformer.models.pnml.transform_helper import (
     ANDHelperPNML,
     HelperPNMLElement,
@@ -27,11 +28,17 @@ from transformer.models.pnml.transform_helper import (
     TimeHelperPNML,
     XORHelperPNML,
 )
+from transformer.models.pnml.workflow import TransitionResource, Trigger
+from transformer.utility import tracing, xml_backend, xml_writer
+from transformer.utility.graph import GraphView, IndexedGraph
+from transformer.utility.layout import Bounds
+from transformer.utility.profile import Profile
 from transformer.utility.utility import (
     BaseModel,
     create_arc_name,
     create_silent_node_name,
 )
+from transformer.utility.xml_writer import omit_always, omit_default
 
 
 class Transition(NetElement, tag="transition"):
@@ -75,8 +82,10 @@ class Page(BaseModel, tag="page"):
 class Net(BaseModel, tag="net"):
     """Net extension of BaseModel (+ID, type_field, places, transitions, arcs...).
 
-    This class also contains internal helperstructures to improve the performance of
-    operations. It also contains helper methods to modify the Net.
+    The structure of the net is only stored in an integer indexed graph (see
+    `IndexedGraph`) with the nodes and arcs as payload. The places, transitions
+    and arcs of a constructed or parsed net are moved into the graph, afterwards
+    the fields are read-only views of the graph (e.g. for the serialization).
     """
 
     toolspecific_global: ToolspecificGlobal | None = None
@@ -89,90 +98,88 @@ class Net(BaseModel, tag="net"):
 
     pages: set[Page] = element(default_factory=set)
 
-    # internal helper structures
-    _temp_elements: dict[str, NetElement] = PrivateAttr(default_factory=dict)
-    _type_map: dict[type[BaseModel], set[BaseModel]] = PrivateAttr(default_factory=dict)
-    _temp_arcs: dict[int, Arc] = PrivateAttr(default_factory=dict)
-    _temp_node_id_to_incoming: dict[str, set[Arc]] = PrivateAttr(default_factory=dict)
-    _temp_node_id_to_outgoing: dict[str, set[Arc]] = PrivateAttr(default_factory=dict)
+    # internal graph of the nodes (incl. helper elements) and arcs
+    _graph: IndexedGraph[NetElement, Arc] = PrivateAttr(default_factory=IndexedGraph)
+
+    @field_serializer("places", "transitions", "arcs")
+    def _serialize_view(self, elements: Set):
+        """Return the elements of a view in graph order (e.g. for pydantic_xml)."""
+        return list(elements)
 
     def get_incoming(self, id: str):
         """Return the incoming arcs of a node by id."""
-        if id not in self._temp_node_id_to_incoming:
-            return {}
-        return self._temp_node_id_to_incoming[id]
+        return self._graph.incoming(id)
 
     def get_outgoing(self, id: str):
         """Return the outgoing arcs of a node by id."""
-        if id not in self._temp_node_id_to_outgoing:
-            return {}
-        return self._temp_node_id_to_outgoing[id]
+        return self._graph.outgoing(id)
 
     def __init__(self, **data):
         """Net constructor."""
         super().__init__(**data)
         self._init_reference_structures()
 
+    def __deepcopy__(self, memo: dict[int, Any] | None = None):
+        """Return a deep copy whose views show its copied graph.
+
+        The fields and the private attributes are copied with one memo.
+        """
+        return super().__deepcopy__({} if memo is None else memo)
+
     def _init_reference_structures(self):
-        """Populate the helper structures."""
-        self._type_map = cast(
-            dict[type[BaseModel], set[BaseModel]],
-            {
-                Place: self.places,
-                Transition: self.transitions,
-                Page: self.pages,
-                # Temporary helper elements (not actual petri net element)
-                XORHelperPNML: set([]),
-                ANDHelperPNML: set([]),
-                TimeHelperPNML: set([]),
-                MessageHelperPNML: set([]),
-            },
-        )
-        for place in self.places:
-            self._temp_elements[place.id] = place
+        """Move the places, transitions and arcs into the graph.
 
+        The fields are replaced by views of the graph.
+        """
+        graph: IndexedGraph[NetElement, Arc] = IndexedGraph()
+        self._graph = graph
+        for place in self.places:
+            graph.add_node(place.id, place, _NODE_TAGS[Place])
         for transition in self.transitions:
-            self._temp_elements[transition.id] = transition
-
+            graph.add_node(transition.id, transition, _NODE_TAGS[Transition])
         for arc in self.arcs:
-            self._temp_arcs[hash(arc)] = arc
-            self._update_arc_incoming_outgoing(arc)
+            graph.add_edge(None, arc.source, arc.target, arc)
+        # Assigned without validation, the views are no sets
+        self.__dict__.update(
+            places=GraphView(graph, _NODE_TAGS[Place]),
+            transitions=GraphView(graph, _NODE_TAGS[Transition]),
+            arcs=GraphView(graph, endpoints=_arc_endpoints),
+        )
 
     def _flatten_node_typ_map(self):
-        """Return all nodes as a single list."""
-        all_nodes: list[BaseModel] = []
-        for type_sets in self._type_map.values():
-            all_nodes.extend(type_sets)
+        """Return all nodes (incl. helper elements and pages) as a single list."""
+        all_nodes: list[BaseModel] = list(self._graph.nodes())
+        all_nodes.extend(self.pages)
         return all_nodes
 
-    def _update_arc_incoming_outgoing(self, arc: Arc):
-        """Updates helper node to arc mapping with the constructed arc."""
-        if arc.target not in self._temp_node_id_to_incoming:
-            self._temp_node_id_to_incoming[arc.target] = set([arc])
-        else:
-            self._temp_node_id_to_incoming[arc.target].add(arc)
+    def get_elements(self):
+        """Return all nodes (incl. helper elements) in insertion order."""
+        return list(self._graph.nodes())
 
-        if arc.source not in self._temp_node_id_to_outgoing:
-            self._temp_node_id_to_outgoing[arc.source] = set([arc])
-        else:
-            self._temp_node_id_to_outgoing[arc.source].add(arc)
+    def has_element(self, id: str):
+        """Return whether a node with the id exists."""
+        return id in self._graph
+
+    def element_counts(self):
+        """Return the number of nodes and arcs (incl. pages)."""
+        counts = {"nodes": len(self._graph), "arcs": self._graph.edge_count()}
+        for page in self.pages:
+            for kind, count in page.net.element_counts().items():
+                counts[kind] += count
+        return counts
 
     def get_in_degree(self, node: BaseModel):
         """Return degree of incoming arcs."""
-        if node.id not in self._temp_node_id_to_incoming:
-            return 0
-        return len(self._temp_node_id_to_incoming[node.id])
+        return self._graph.in_degree(node.id)
 
     def get_out_degree(self, node: BaseModel):
         """Return degree of outgoing arcs."""
-        if node.id not in self._temp_node_id_to_outgoing:
-            return 0
-        return len(self._temp_node_id_to_outgoing[node.id])
+        return self._graph.out_degree(node.id)
 
     def add_arc_with_handle_same_type_from_id(self, source_id: str, target_id: str):
         """Add arc connecting source and target id."""
-        source = self._temp_elements[source_id]
-        target = self._temp_elements[target_id]
+        source = self.get_element(source_id)
+        target = self.get_element(target_id)
         self.add_arc_with_handle_same_type(source, target)
 
     def add_arc_with_handle_same_type(self, source: NetElement, target: NetElement):
@@ -192,8 +199,8 @@ class Net(BaseModel, tag="net"):
 
     def add_arc_from_id(self, source_id: str, target_id: str, id: str | None = None):
         """Add arc connecting source and target id."""
-        source = self._temp_elements[source_id]
-        target = self._temp_elements[target_id]
+        source = self.get_element(source_id)
+        target = self.get_element(target_id)
         self.add_arc(source, target, id)
 
     def add_arc(self, source: NetElement, target: NetElement, id: str | None = None):
@@ -208,29 +215,36 @@ class Net(BaseModel, tag="net"):
             raise InternalTransformationException(
                 "Cant connect identical petrinet elements"
             )
-        if id in self._temp_arcs:
-            raise InternalTransformationException(
-                f"arc {id} already exists from {source.id} to {target.id}!"
-            )
+        if self._find_arc(id, source.id, target.id) is not None:
+            # an identical arc is only added once
+            return
 
         self.add_element(source)
         self.add_element(target)
 
         a = Arc(id=id, source=source.id, target=target.id)
-        self._temp_arcs[hash(a)] = a
-        self._update_arc_incoming_outgoing(a)
+        self._graph.add_edge(None, source.id, target.id, a)
 
-        self.arcs.add(a)
+    def _find_arc(self, id: str, source: str, target: str):
+        """Return the graph key and arc with the id, source and target or None.
 
-    def remove_arc(self, arc: Arc):
-        """Remove arc based on instance."""
-        self._temp_arcs.pop(hash(arc))
-        if arc.target:
-            self._temp_node_id_to_incoming[arc.target].remove(arc)
-        if arc.source:
-            self._temp_node_id_to_outgoing[arc.source].remove(arc)
+        Arc ids are not unique in all documents, so the arcs are keyed by their
+        index in the graph and identified like their hash.
+        """
+        graph = self._graph
+        items = graph.outgoing_items(source) if source else graph.incoming_items(target)
+        for key, arc in items:
+            if arc.id == id and arc.source == source and arc.target == target:
+                return key, arc
+        return None
 
-        self.arcs.remove(arc)
+    def remove_arc(self, arc: Arc):
+        """Remove arc based on instance or a copy of it."""
+        found = self._find_arc(arc.id, arc.source, arc.target)
+        if found is None:
+            raise KeyError(arc.id)
+        key, existing = found
+        self._graph.remove_edge(key)
 
     def add_page(self, new_page: Page):
         """Add a new page or add if not existing (check by id)."""
@@ -244,25 +258,24 @@ class Net(BaseModel, tag="net"):
 
     def add_element(self, new_node: NetElement):
         """Add a node to net or return if already exising (check by id)."""
-        storage_set = self._type_map[type(new_node)]
-        if storage_set is None:
+        tag = _NODE_TAGS.get(type(new_node))
+        if tag is None:
             raise InternalTransformationException("No Petrinet node")
 
-        if new_node.id in self._temp_elements:
+        if new_node.id in self._graph:
             return new_node
 
-        storage_set.add(new_node)
-
-        self._temp_elements[new_node.id] = new_node
+        self._graph.add_node(new_node.id, new_node, tag)
         return new_node
 
     def get_element(self, id: str):
         """Return element by id."""
-        if id not in self._temp_elements:
+        node = self._graph.node(id)
+        if node is None:
             raise InternalTransformationException(
                 f"Cant get nonexisting Node with id {id}"
             )
-        return self._temp_elements[id]
+        return node
 
     def get_page(self, id: str):
         """Return page by id."""
@@ -273,21 +286,20 @@ class Net(BaseModel, tag="net"):
 
     def get_node_or_none(self, id: str):
         """Return node by id or None as default."""
-        if id not in self._temp_elements:
-            return None
-        return self._temp_elements[id]
+        return self._graph.node(id)
 
     def remove_element(self, to_remove_node: BaseModel):
-        """Remove element by instance."""
-        storage_set = self._type_map[type(to_remove_node)]
-        if storage_set is None:
+        """Remove element by instance.
+
+        The remaining connecting arcs lose their source or target.
+        """
+        if isinstance(to_remove_node, Page):
+            self.pages.remove(to_remove_node)
+            return
+        if type(to_remove_node) not in _NODE_TAGS:
             raise InternalTransformationException("No Petrinet node")
 
-        storage_set.remove(to_remove_node)
-
-        self._temp_elements.pop(to_remove_node.id)
-        incoming = self._temp_node_id_to_incoming.pop(to_remove_node.id, set())
-        outgoing = self._temp_node_id_to_outgoing.pop(to_remove_node.id, set())
+        _, incoming, outgoing = self._graph.remove_node(to_remove_node.id)
         for arc in incoming:
             arc.target = ""
         for arc in outgoing:
@@ -295,11 +307,11 @@ class Net(BaseModel, tag="net"):
 
     def change_id(self, old_id: str, new_id: str):
         """Change the ID of a existing node and the connecting arcs."""
-        if old_id not in self._temp_elements:
+        current_node = self._graph.node(old_id)
+        if current_node is None:
             raise InternalTransformationException("old element not exisiting")
-        if new_id in self._temp_elements:
+        if new_id in self._graph:
             raise InternalTransformationException("new id already exists")
-        current_node = self._temp_elements[old_id]
         incoming, outgoing = self.get_incoming_outgoing_and_remove_arcs(current_node)
         self.remove_element(current_node)
         current_node.id = new_id
@@ -351,30 +363,150 @@ class Net(BaseModel, tag="net"):
 # Page is using Net reference before Net is initalized
 Page.model_rebuild()
 
+# Source and target id of an arc (for the arc view)
+_arc_endpoints = attrgetter("source", "target")
+
+# Node types of a net and their tags in the graph
+_NODE_TAGS: dict[type, int] = {
+    Place: 0,
+    Transition: 1,
+    # Temporary helper elements (not actual petri net element)
+    XORHelperPNML: 2,
+    ANDHelperPNML: 3,
+    TimeHelperPNML: 4,
+    MessageHelperPNML: 5,
+}
+
+
+# Placeholders and defaults which WoPeD assumes when they are missing
+_WOPED_OMISSIONS: xml_writer.Omissions = {
+    Name: {"graphics": omit_default(OffsetGraphics())},
+    Toolspecific: {
+        "time": omit_default("0"),
+        "timeUnit": omit_default("1"),
+        "orientation": omit_default("1"),
+    },
+    Trigger: {"graphics": omit_default(PositionGraphics())},
+    TransitionResource: {"graphics": omit_default(PositionGraphics())},
+}
+
+# All graphics and GUI settings, names without text and default toolspecifics
+_COMPACT_OMISSIONS: xml_writer.Omissions = {
+    NetElement: {
+        "name": lambda name: not name.title,
+        "graphics": omit_always,
+        "toolspecific": omit_default(Toolspecific()),
+    },
+    Name: {"graphics": omit_always},
+    Arc: {"graphics": omit_always},
+    Inscription: {"graphics": omit_always},
+    Toolspecific: {
+        **_WOPED_OMISSIONS[Toolspecific],
+        "displayProbabilityPosition": omit_always,
+    },
+    Trigger: {"graphics": omit_always},
+    TransitionResource: {"graphics": omit_always},
+    ToolspecificGlobal: {
+        field: omit_always
+        for field in [
+            "bounds",
+            "scale",
+            "treeWidthRight",
+            "overviewPanelVisible",
+            "treeHeightOverview",
+            "treePanelVisible",
+            "verticalLayout",
+        ]
+    },
+}
+
+_PROFILE_OMISSIONS: dict[Profile, xml_writer.Omissions] = {
+    Profile.full: xml_writer.NO_OMISSIONS,
+    Profile.woped: _WOPED_OMISSIONS,
+    Profile.compact: _COMPACT_OMISSIONS,
+}
+
 
 class Pnml(BaseModel, tag="pnml"):
     """Petri net extension of base model."""
 
     net: Net
 
-    def to_string(self) -> str:
-        """Return string of net instance as serialized XML."""
+    # Bounds of the nodes in the source net by id, used by the layouts
+    _geometry: dict[str, Bounds] = PrivateAttr(default_factory=dict)
+
+    def _index_geometry(self):
+        """Index the bounds of the nodes of the parsed net and its pages by id.
+
+        A workflow operator is also indexed by its id. The start and end places
+        of a page have the ids of places of the parent net, which are preferred.
+        """
+        nets = [self.net]
+        for net in nets:
+            nets.extend(page.net for page in net.pages)
+        geometry: dict[str, Bounds] = {}
+        # The pages before their parent
+        for net in reversed(nets):
+            for node in net.get_elements():
+                graphics = node.graphics
+                if graphics is None:
+                    continue
+                bounds = Bounds(
+                    graphics.position.x,
+                    graphics.position.y,
+                    graphics.dimension.x,
+                    graphics.dimension.y,
+                )
+                geometry[node.id] = bounds
+                toolspecific = node.toolspecific
+                if toolspecific and toolspecific.operator:
+                    geometry[toolspecific.operator.id] = bounds
+        self._geometry = geometry
+
+    def to_string(self, profile: Profile = Profile.full) -> str:
+        """Return string of net instance as serialized XML (see `Profile`)."""
+        try:
+            with tracing.stage("serialize"):
+                return xml_writer.to_xml_string(
+                    self, omissions=_PROFILE_OMISSIONS[profile]
+                )
+        except Exception:
+            raise PrivateInternalException("Can't convert pnml to string.")
+
+    def iter_string(
+        self, header: bool = False, profile: Profile = Profile.full
+    ) -> Iterator[str]:
+        """Yield the serialized XML of net instance in chunks (optional with header)."""
         try:
-            return cast(str, self.to_xml(encoding="unicode"))
+            chunks = xml_writer.iter_xml(self, header, _PROFILE_OMISSIONS[profile])
+            yield from tracing.iter_stage("serialize", chunks)
         except Exception:
             raise PrivateInternalException("Can't convert pnml to string.")
 
     def write_to_file(self, path: str):
         """Save net to file."""
-        Path(path).write_text(self.to_string())
+        with Path(path).open("w") as file:
+            file.writelines(self.iter_string())
 
     @staticmethod
-    def from_xml_str(xml_content: str):
-        """Return a petri net from a XML string."""
+    def from_xml_str(xml_content: str, trusted: bool = False):
+        """Return a petri net from a XML string.
+
+        Args:
+            xml_content: The PNML document.
+            trusted: Skip the validation for trusted documents (e.g. WoPeD exports)
+                and only check the net structure.
+        """
+        if trusted:
+            # The parser builds the models of this module
+            from transformer.models.pnml.parser import parse_trusted_pnml
+
+            return parse_trusted_pnml(xml_content)
         try:
-            tree = fromstring(xml_content)
-            net = Pnml.from_xml_tree(tree)
-            return net
+            tree = xml_backend.fromstring(xml_content)
+            pnml = Pnml.from_xml_tree(tree)
+            pnml._index_geometry()
+            return pnml
         except Exception:
             raise InvalidInputXML()
 
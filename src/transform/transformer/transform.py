@@ -0,0 +1,115 @@
+"""Transformation of a XML model in a direction, shared by all endpoints.
+
+The models and transformations are imported on first use. Importing them builds
+the schemas of all pydantic-xml models, which would dominate the cold start of
+every entry point, even of requests which do not transform (e.g. cached results
+or CORS preflight requests).
+
+The environment variable `TRUSTED_PNML=true` reads all PNML inputs without
+validation (see `parse_trusted_pnml`). It is a setting of the deployment and can
+not be selected by a request, only services whose callers are trusted (e.g. an
+internal WoPeD export) may enable it.
+"""
+
+import importlib
+import os
+from collections.abc import Iterator
+
+from exceptions import UnexpectedQueryParameter
+from transformer.utility import tracing
+from transformer.utility.profile import Profile
+
+# direction -> (key of the input model, key of the transformed model)
+DIRECTIONS = {
+    "bpmntopnml": ("bpmn", "pnml"),
+    "pnmltobpmn": ("pnml", "bpmn"),
+}
+
+
+def trusted_pnml():
+    """Return whether the PNML inputs are read without validation."""
+    return os.getenv("TRUSTED_PNML", "false") == "true"
+
+
+def cache_direction(direction: str, is_trusted: bool, profile: Profile = Profile.full):
+    """Return the direction with the options which change the result."""
+    if is_trusted and direction == "pnmltobpmn":
+        direction = f"{direction}:trusted"
+    if profile != Profile.full:
+        direction = f"{direction}:{profile.value}"
+    return direction
+
+
+def parse_profile(value: str | None) -> Profile:
+    """Return the output profile of a query parameter (full if missing).
+
+    Raises:
+        UnexpectedQueryParameter: If the profile is unknown.
+    """
+    if value is None:
+        return Profile.full
+    try:
+        return Profile(value)
+    except ValueError:
+        raise UnexpectedQueryParameter("profile")
+
+
+# Modules of the models and transformations imported by `warm_up`.
+TRANSFORMER_MODULES = [
+    "transformer.models.bpmn.bpmn",
+    "transformer.models.pnml.pnml",
+    "transformer.transform_bpmn_to_petrinet.transform",
+    "transformer.transform_petrinet_to_bpmn.transform",
+]
+
+
+def warm_up():
+    """Import the models and transformations, e.g. in a background thread."""
+    for module in TRANSFORMER_MODULES:
+        importlib.import_module(module)
+
+
+def transform_xml(
+    direction: str,
+    xml_content: str,
+    is_trusted: bool = False,
+    profile: Profile = Profile.full,
+) -> Iterator[str]:
+    """Return the chunks of the transformed XML model (with XML header).
+
+    Args:
+        direction: The direction "bpmntopnml" or "pnmltobpmn".
+        xml_content: The XML model to transform.
+        is_trusted: Whether a PNML is read without validation.
+        profile: The output profile, the compact profile skips the layouts.
+    """
+    if direction == "bpmntopnml":
+        from transformer.models.bpmn.bpmn import BPMN
+        from transformer.transform_bpmn_to_petrinet.transform import (
+            bpmn_to_workflow_net,
+        )
+
+        with tracing.stage("parse") as stage:
+            bpmn = BPMN.from_xml(xml_content)
+            stage.counted(bpmn.process)
+        pnml = bpmn_to_workflow_net(bpmn, layout=profile != Profile.compact)
+        return pnml.iter_string(header=True, profile=profile)
+    if direction == "pnmltobpmn":
+        from transformer.models.pnml.pnml import Pnml
+        from transformer.transform_petrinet_to_bpmn.transform import pnml_to_bpmn
+
+        with tracing.stage("parse") as stage:
+            pnml = Pnml.from_xml_str(xml_content, trusted=is_trusted)
+            stage.counted(pnml.net)
+        return pnml_to_bpmn(pnml).iter_string(header=True, profile=profile)
+    raise UnexpectedQueryParameter("direction")
+
+
+def transform_xml_string(
+    direction: str,
+    xml_content: str,
+    is_trusted: bool = False,
+    profile: Profile = Profile.full,
+):
+    """Return the transformed XML model, e.g. in a worker process."""
+    return "".join(transform_xml(direction, xml_content, is_trusted, profile))
@@ -0,0 +1,136 @@
+"""Positions of the elements of the workflow nets transformed from a BPMN.
+
+WoPeD draws the helper transitions (`*_op_i`) and the center place (`P_CENTER_*`)
+of a workflow operator as one node, so they are laid out as one node with the
+same position. The nodes which exist in the source BPMN (same id) are placed at
+the center of their BPMN shape, a workflow operator at the shape of its gateway.
+The other (silent) nodes are placed between their neighbors (see
+`anchored_layout`). Without source shapes (or with shapes on top of each other)
+the layered layout is used (see `layered_layout`).
+
+The nets of the pages are laid out independently, in parallel if enabled (see
+`map_subprocesses`).
+"""
+
+from typing import NamedTuple
+
+from transformer.models.pnml.graphics import (
+    Coordinates,
+    OffsetGraphics,
+    PositionGraphics,
+)
+from transformer.models.pnml.pnml import Net
+from transformer.utility.layout import (
+    Bounds,
+    Point,
+    anchored_layout,
+    layered_layout,
+    source_anchors,
+)
+from transformer.utility.parallel import map_subprocesses
+
+# Dimension of the places and transitions in WoPeD
+NODE_SIZE = 40.0
+# Space of the nodes to the top left corner of the net and between moved nodes
+MARGIN = 30.0
+GAP = 10.0
+
+
+class _NetGraph(NamedTuple):
+    """Graph of the layout nodes (element or workflow operator) of a net.
+
+    Attributes:
+        ids: Id of each element.
+        nodes: Layout node of each element.
+        count: Number of layout nodes.
+        edges: Source and target node of the arcs between different nodes.
+        anchors: Center of the source shape by layout node.
+    """
+
+    ids: list[str]
+    nodes: list[int]
+    count: int
+    edges: list[tuple[int, int]]
+    anchors: dict[int, Point]
+
+
+def _net_graph(net: Net, geometry: dict[str, Bounds], excluded: set[str]):
+    """Return the layout graph of a net (ordered by id).
+
+    Args:
+        net: The net.
+        geometry: Bounds of the source shapes by id.
+        excluded: Ids which are not placed at their source shape.
+    """
+    ids: list[str] = []
+    nodes: list[int] = []
+    index: dict[str, int] = {}
+    for element in sorted(net.get_elements(), key=lambda e: e.id):
+        toolspecific = element.toolspecific
+        key = element.id
+        if toolspecific and toolspecific.operator:
+            key = toolspecific.operator.id
+        ids.append(element.id)
+        nodes.append(index.setdefault(key, len(index)))
+    anchors = source_anchors(
+        [key if key not in excluded else None for key in index], geometry
+    )
+    node_of = dict(zip(ids, nodes))
+    edges = sorted(
+        {
+            (node_of[arc.source], node_of[arc.target])
+            for arc in net._graph.edges()
+            if node_of[arc.source] != node_of[arc.target]
+        }
+    )
+    return _NetGraph(ids, nodes, len(index), edges, anchors)
+
+
+def _positions(graph: _NetGraph):
+    """Return the top left position of each layout node."""
+    sizes = [(NODE_SIZE, NODE_SIZE)] * graph.count
+    if graph.anchors:
+        layout = anchored_layout(
+            sizes, graph.edges, graph.anchors, gap=GAP, routes=False
+        )
+    else:
+        layout = layered_layout(sizes, graph.edges, routes=False)
+    min_x, min_y = min(layout.x, default=0.0), min(layout.y, default=0.0)
+    return [(x - min_x + MARGIN, y - min_y + MARGIN) for x, y in zip(layout.x, layout.y)]
+
+
+def _set_positions(net: Net, graph: _NetGraph, positions: list[Point]):
+    """Set the graphics of the elements (and their names) of a net."""
+    dimension = Coordinates(x=NODE_SIZE, y=NODE_SIZE)
+    for id, node in zip(graph.ids, graph.nodes):
+        element = net.get_element(id)
+        x, y = positions[node]
+        element.graphics = PositionGraphics(
+            position=Coordinates(x=x, y=y), dimension=dimension
+        )
+        if element.name:
+            element.name.graphics = OffsetGraphics(
+                offset=Coordinates(x=x, y=y + NODE_SIZE)
+            )
+
+
+def layout_net(net: Net, geometry: dict[str, Bounds]):
+    """Set the positions of the elements of a net and its pages.
+
+    Args:
+        net: The net.
+        geometry: Bounds of the source shapes by id (see `BPMN._geometry`).
+    """
+    nets: list[Net] = []
+    graphs: list[_NetGraph] = []
+    # The start and end places of a page have the ids of the places of its parent
+    stack: list[tuple[Net, set[str]]] = [(net, set())]
+    while stack:
+        current, excluded = stack.pop()
+        nets.append(current)
+        graphs.append(_net_graph(current, geometry, excluded))
+        ids = set(current._graph.node_ids())
+        stack.extend((page.net, ids) for page in current.pages)
+    results = map_subprocesses(_positions, [(graph,) for graph in graphs])
+    for current, graph, positions in zip(nets, graphs, results):
+        _set_positions(current, graph, positions)
@@ -33,7 +33,7 @@ def insert_temp_between_adjacent_mapped_transition(bpmn: Process):
         if not is_target_wf_transition(node):
             continue
 
-        for incoming_flow in bpmn.get_incoming(node.id).copy():
+        for incoming_flow in bpmn.get_incoming(node.id):
             incoming_node = bpmn.get_node(incoming_flow.sourceRef)
             # Connected node is already place like
             if is_place_like(incoming_node):
@@ -49,7 +49,7 @@ def insert_temp_between_adjacent_mapped_transition(bpmn: Process):
             bpmn.add_flow(incoming_node, linking_node)
             bpmn.add_flow(linking_node, node)
 
-        for outgoing_flow in bpmn.get_outgoing(node.id).copy():
+        for outgoing_flow in bpmn.get_outgoing(node.id):
             outgoing_node = bpmn.get_node(outgoing_flow.targetRef)
             # Connected node is already place like
             if is_place_like(outgoing_node):
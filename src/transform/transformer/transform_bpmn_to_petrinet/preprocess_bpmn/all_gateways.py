@@ -13,12 +13,12 @@ def remove_unnecessary_gateways(bpmn: Process, gateways: set[Gateway]):
     """
     to_remove_gws = []
     for gw in gateways:
-        if gw.get_in_degree() > 1 or gw.get_out_degree() > 1:
+        if bpmn.get_in_degree(gw) > 1 or bpmn.get_out_degree(gw) > 1:
             continue
         to_remove_gws.append(gw)
 
-        in_arc: Flow = list(bpmn.get_incoming(gw.id))[0]
-        out_arc: Flow = list(bpmn.get_outgoing(gw.id))[0]
+        in_arc: Flow = bpmn.get_incoming(gw.id)[0]
+        out_arc: Flow = bpmn.get_outgoing(gw.id)[0]
         source_node = bpmn.get_node(in_arc.sourceRef)
         target_node = bpmn.get_node(out_arc.targetRef)
 
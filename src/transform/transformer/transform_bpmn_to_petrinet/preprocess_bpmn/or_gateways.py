@@ -1,5 +1,6 @@
 """Transform OR-Gates into a combination of AND- and XOR-Gates."""
 
+from collections.abc import Iterator
 from typing import cast
 
 from exceptions import ORGatewayDetectionIssue
@@ -23,34 +24,84 @@ def traverse_matching_gw(
     visited_arcs: set[str],
     flow_id: str,
 ):
-    """Find the OR-Join of a OR-Split."""
-    if flow_id in visited_arcs:
-        # already visited arc -> circle detected
-        return None
-    visited_arcs.add(flow_id)
+    """Find the OR-Join of a OR-Split by a depth first search from a flow.
 
-    target_node: GenericBPMNNode = bpmn_helper.get_flow_target_by_id(flow_id)
-    if target_node.id in join_ids:
-        if len(stack) == 1:
-            # matching join found
-            return flow_id, cast(OrGateway, target_node)
-        else:
-            # join for inner split found
-            stack.pop()
+    The search counts the nested splits and joins on the stack, it is only used
+    for splits which are not matched by the post-dominators.
+    """
+    pending: list[Iterator[str]] = [iter([flow_id])]
+    while pending:
+        flow_id = next(pending[-1], "")
+        if not flow_id:
+            pending.pop()
+            continue
+        if flow_id in visited_arcs:
+            # already visited arc -> circle detected
+            continue
+        visited_arcs.add(flow_id)
 
-    if target_node.id in split_ids:
-        stack.append(cast(OrGateway, target_node))
+        target_node: GenericBPMNNode = bpmn_helper.get_flow_target_by_id(flow_id)
+        if target_node.id in join_ids:
+            if len(stack) == 1:
+                # matching join found
+                return flow_id, cast(OrGateway, target_node)
+            else:
+                # join for inner split found
+                stack.pop()
 
-    outgoing_arcs: list[str] = [x for x in target_node.outgoing]
-    for flow_id in outgoing_arcs:
-        r = traverse_matching_gw(
-            bpmn_helper, stack, split_ids, join_ids, visited_arcs, flow_id
-        )
-        if r is not None:
-            return r
+        if target_node.id in split_ids:
+            stack.append(cast(OrGateway, target_node))
+
+        pending.append(iter([x.id for x in bpmn_helper.get_outgoing(target_node.id)]))
     return None
 
 
+def match_by_dominators(
+    bpmn_helper: Process,
+    split: OrGateway,
+    join_ids: set[str],
+    idom: dict[str, str | None],
+    ipdom: dict[str, str | None],
+):
+    """Return the join and the incoming join flow of each branch of a split.
+
+    The join is the nearest OR-Join post-dominating the split. A branch starts
+    with a node immediately dominated by the split, its flow into the join comes
+    from a node dominated by the branch start.
+
+    Returns:
+        The join and the join flows by outgoing split flow id or None if the split
+        is not the entry of a single entry single exit block.
+    """
+    join_id = ipdom.get(split.id)
+    while join_id is not None and join_id not in join_ids:
+        join_id = ipdom.get(join_id)
+    if join_id is None:
+        return None
+
+    join_flow_by_branch: dict[str, Flow] = {}
+    for join_flow in bpmn_helper.get_incoming(join_id):
+        if join_flow.sourceRef == split.id:
+            # direct branch from the split to the join
+            continue
+        branch = join_flow.sourceRef
+        while branch is not None and idom.get(branch) != split.id:
+            branch = idom.get(branch)
+        if branch is None or branch in join_flow_by_branch:
+            return None
+        join_flow_by_branch[branch] = join_flow
+
+    join_flows: dict[str, Flow] = {}
+    for out_flow in bpmn_helper.get_outgoing(split.id):
+        if out_flow.targetRef == join_id:
+            join_flows[out_flow.id] = out_flow
+        elif out_flow.targetRef in join_flow_by_branch:
+            join_flows[out_flow.id] = join_flow_by_branch.pop(out_flow.targetRef)
+        else:
+            return None
+    return cast(OrGateway, bpmn_helper.get_node(join_id)), join_flows
+
+
 class InclusiveGatewayBridge:
     """Class for inclusive gateways."""
 
@@ -86,31 +137,44 @@ class ParallelGatewayBridge:
 
 
 def find_matching_gateways(bpmn_helper: Process, inclusive_gateways: list[OrGateway]):
-    """Match splits and joins of a set of gateways and process."""
+    """Match splits and joins of a set of gateways and process.
+
+    The dominators of the process are computed once, splits which are not the entry
+    of a single entry single exit block are matched by a search.
+    """
     matches: list[InclusiveGatewayBridge] = []
     splits: list[OrGateway] = []
     joins: list[OrGateway] = []
     for gateway in inclusive_gateways:
-        if gateway.get_in_degree() > 1:
+        if bpmn_helper.get_in_degree(gateway) > 1:
             joins.append(gateway)
-        if gateway.get_out_degree() > 1:
+        if bpmn_helper.get_out_degree(gateway) > 1:
             splits.append(gateway)
     split_ids = {node.id for node in splits}
     join_ids = {node.id for node in joins}
+    if not splits:
+        return matches
+    idom = bpmn_helper._graph.immediate_dominators()
+    ipdom = bpmn_helper._graph.immediate_dominators(post=True)
     for split in splits:
-        outgoing_flows: list[str] = [x for x in split.outgoing]
+        outgoing_flows: list[str] = [x.id for x in bpmn_helper.get_outgoing(split.id)]
+        matched = match_by_dominators(bpmn_helper, split, join_ids, idom, ipdom)
         for out_flow_id in outgoing_flows:
-            r = traverse_matching_gw(
-                bpmn_helper, [split], split_ids, join_ids, set(), out_flow_id
-            )
-            if r is None:
-                raise ORGatewayDetectionIssue()
+            if matched is not None:
+                join, join_flow = matched[0], matched[1][out_flow_id]
+            else:
+                r = traverse_matching_gw(
+                    bpmn_helper, [split], split_ids, join_ids, set(), out_flow_id
+                )
+                if r is None:
+                    raise ORGatewayDetectionIssue()
+                join, join_flow = r[1], bpmn_helper.get_flow(r[0])
             matches.append(
                 InclusiveGatewayBridge(
                     split,
-                    r[1],
+                    join,
                     bpmn_helper.get_flow(out_flow_id),
-                    bpmn_helper.get_flow(r[0]),
+                    join_flow,
                 )
             )
     return matches
@@ -186,8 +250,8 @@ def replace_inclusive_to_parallel(bpmn: Process, gw: OrGateway):
     flow_map: dict[str, Flow] = {}
     pw_gw = AndGateway(id="OR" + gw.id)
     bpmn.add_node(pw_gw)
-    in_arcs: set[Flow] = bpmn.get_incoming(gw.id).copy()
-    out_arcs: set[Flow] = bpmn.get_outgoing(gw.id).copy()
+    in_arcs = bpmn.get_incoming(gw.id)
+    out_arcs = bpmn.get_outgoing(gw.id)
     for arc in in_arcs:
         bpmn.remove_flow(arc)
         new_arc = bpmn.add_flow(
@@ -18,6 +18,7 @@ from transformer.models.bpmn.bpmn import (
 )
 from transformer.models.pnml.pnml import Net, Place, Pnml, Transition
 from transformer.models.pnml.workflow import WorkflowBranchingType
+from transformer.transform_bpmn_to_petrinet.layout import layout_net
 from transformer.transform_bpmn_to_petrinet.participants import (
     create_participant_mapping,
     set_global_toolspecifi,
@@ -33,6 +34,7 @@ from transformer.transform_bpmn_to_petrinet.transform_workflow_helper import (
     handle_subprocesses,
     handle_triggers,
 )
+from transformer.utility import tracing
 from transformer.utility.pnml import find_triggers
 from transformer.utility.utility import create_silent_node_name
 
@@ -54,7 +56,7 @@ def merge_single_triggers(net: Net):
         if net.get_out_degree(trigger) == 0:
             continue
 
-        connecting_place = net.get_element(list(net.get_outgoing(trigger.id))[0].target)
+        connecting_place = net.get_element(net.get_outgoing(trigger.id)[0].target)
 
         # no following element to merge with
         if net.get_out_degree(connecting_place) == 0:
@@ -153,8 +155,8 @@ def transform_bpmn_to_petrinet(
                     name=(
                         node.name
                         if node.name != ""
-                        or node.get_in_degree() > 1
-                        or node.get_out_degree() > 1
+                        or bpmn.get_in_degree(node) > 1
+                        or bpmn.get_out_degree(node) > 1
                         else None
                     ),
                 )
@@ -196,7 +198,8 @@ def transform_bpmn_to_petrinet(
             net.add_arc(source, target)
 
     # Post processing
-    merge_single_triggers(net)
+    with tracing.stage("merge_single_triggers", net):
+        merge_single_triggers(net)
 
     return pnml
 
@@ -207,34 +210,46 @@ def apply_preprocessing(bpmn: Process, funcs: list[Callable[[Process], None]]):
         apply_preprocessing(p, funcs)
 
     for f in funcs:
-        f(bpmn)
+        with tracing.stage(f.__name__, bpmn):
+            f(bpmn)
 
 
-def bpmn_to_workflow_net(bpmn: BPMN):
-    """Return a processed and transformed workflow net of process."""
+def bpmn_to_workflow_net(bpmn: BPMN, layout: bool = True):
+    """Return a processed and transformed workflow net of process.
+
+    Args:
+        bpmn: The BPMN, its process is changed.
+        layout: Whether the elements of the net are positioned (see `layout_net`).
+    """
     create_participant_mapping(bpmn.process)
 
-    apply_preprocessing(
-        bpmn.process,
-        [
-            or_gateways.replace_inclusive_gateways,
-            all_gateways.preprocess_gateways,
-            adjacent_inserter.insert_temp_between_adjacent_mapped_transition,
-        ],
-    )
+    with tracing.stage("preprocess", bpmn.process):
+        apply_preprocessing(
+            bpmn.process,
+            [
+                or_gateways.replace_inclusive_gateways,
+                all_gateways.preprocess_gateways,
+                adjacent_inserter.insert_temp_between_adjacent_mapped_transition,
+            ],
+        )
     organization_name = (
         bpmn.collaboration.participant.name or "Default"
         if bpmn.collaboration and bpmn.collaboration.participant
         else "Default"
     )
-    pnml = transform_bpmn_to_petrinet(bpmn.process, organization_name)
+    with tracing.stage("transform") as stage:
+        pnml = transform_bpmn_to_petrinet(bpmn.process, organization_name)
+        stage.counted(pnml.net)
     set_global_toolspecifi(
         pnml.net, bpmn.process._participant_mapping, organization_name
     )
+    if layout:
+        with tracing.stage("layout", pnml.net):
+            layout_net(pnml.net, bpmn._geometry)
     return pnml
 
 
-def bpmn_to_wf_net_from_xml(bpmn_xml: str):
+def bpmn_to_wf_net_from_xml(bpmn_xml: str, layout: bool = True):
     """Return a processed and transformed workflow net of process from xml str."""
     bpmn = BPMN.from_xml(bpmn_xml)
-    return bpmn_to_workflow_net(bpmn)
+    return bpmn_to_workflow_net(bpmn, layout)
@@ -26,10 +26,8 @@ from transformer.models.pnml.pnml import (
 )
 from transformer.models.pnml.workflow import WorkflowBranchingType
 from transformer.utility.bpmn import find_end_events, find_start_events
-from transformer.utility.utility import (
-    create_arc_name, 
-    create_silent_node_name 
-)
+from transformer.utility.parallel import map_subprocesses
+from transformer.utility.utility import create_arc_name, create_silent_node_name
 
 
 def create_workflow_operator_helper_transition(
@@ -183,7 +181,7 @@ def handle_gateway(net: Net, bpmn: Process, node: GenericBPMNNode):
     """Transform a gateway to workflow operator."""
     node_type = type(node)
     f_split, f_join, f_split_join = type_map[node_type]  # type: ignore
-    in_degree, out_degree = node.get_in_degree(), node.get_out_degree()
+    in_degree, out_degree = bpmn.get_in_degree(node), bpmn.get_out_degree(node)
     in_flows, out_flows = bpmn.get_incoming(node.id), bpmn.get_outgoing(node.id)
     source_ids, target_ids = (
         [f.sourceRef for f in in_flows],
@@ -245,9 +243,14 @@ def handle_subprocesses(
     organization: str,
     caller_func: Callable[[Process, str], Pnml],
 ):
-    """Transform a BPMN subprocess to workflow subprocess."""
+    """Transform a BPMN subprocess to workflow subprocess.
+
+    The subprocesses are prepared in the order of their ids and transformed
+    afterwards, in parallel if enabled (see `map_subprocesses`).
+    """
+    subprocesses = sorted(subprocesses, key=lambda x: x.id)
     for subprocess in subprocesses:
-        if subprocess.get_in_degree() != 1 or subprocess.get_out_degree() != 1:
+        if bpmn.get_in_degree(subprocess) != 1 or bpmn.get_out_degree(subprocess) != 1:
             raise WrongSubprocessDegree()
 
         subprocess_transition = net.add_element(
@@ -260,8 +263,8 @@ def handle_subprocesses(
         # outgoing node of the subprocess
 
         outer_in_flows, outer_out_flows = (
-            list(bpmn.get_incoming(subprocess.id)),
-            list(bpmn.get_outgoing(subprocess.id)),
+            bpmn.get_incoming(subprocess.id),
+            bpmn.get_outgoing(subprocess.id),
         )
 
         outer_in_id, outer_out_id = (
@@ -287,8 +290,12 @@ def handle_subprocesses(
         subprocess.change_node_id(sub_se, outer_in_id)
         subprocess.change_node_id(sub_ee, outer_out_id)
 
-        # transform inner subprocess
-        inner_net = caller_func(subprocess, organization).net
+    # transform inner subprocesses
+    inner_pnmls = map_subprocesses(
+        caller_func, [(subprocess, organization) for subprocess in subprocesses]
+    )
+    for subprocess, inner_pnml in zip(subprocesses, inner_pnmls):
+        inner_net = inner_pnml.net
         inner_net.id = None
 
         net.add_page(Page(id=subprocess.id, net=inner_net))
@@ -1,12 +1,14 @@
 """Initiate the preprocessing and transformation of pnml to bpmn."""
 
+from collections import deque
 from collections.abc import Callable
 
-from transformer.models.bpmn.base import Gateway
+from transformer.models.bpmn.base import Gateway, GenericBPMNNode
 from transformer.models.bpmn.bpmn import (
     BPMN,
     AndGateway,
     EndEvent,
+    OrGateway,
     Process,
     StartEvent,
     Task,
@@ -31,45 +33,74 @@ from transformer.transform_petrinet_to_bpmn.workflow_helper import (
     handle_workflow_operators,
     handle_workflow_subprocesses,
 )
+from transformer.utility import tracing
 from transformer.utility.utility import create_arc_name
 
 
 def remove_silent_tasks(bpmn: Process):
     """Remove silent tasks (Without name)."""
-    for task in bpmn.tasks.copy():
+    for task in set(bpmn.tasks):
         if task.name is not None:
             continue
         source_id, target_id = bpmn.remove_node_with_connecting_flows(task)
         bpmn.add_flow(bpmn.get_node(source_id), bpmn.get_node(target_id))
 
 
+def _connect(bpmn: Process, source: GenericBPMNNode, target: GenericBPMNNode):
+    """Connect two nodes unless they are already connected by a generated flow.
+
+    If the generated flow id is used by a flow between other nodes, the first free
+    id with a numeric suffix is used.
+    """
+    flow_id = create_arc_name(source.id, target.id)
+    candidate, suffix = flow_id, 0
+    while bpmn.is_flow_existing(candidate):
+        existing = bpmn.get_flow(candidate)
+        if existing.sourceRef == source.id and existing.targetRef == target.id:
+            return None
+        suffix += 1
+        candidate = f"{flow_id}_{suffix}"
+    return bpmn.add_flow(source, target, id=candidate)
+
+
 def remove_unnecessary_gateways(bpmn: Process):
-    """Remove unnecessary gateways (In and out degree == 1)."""
-    is_rerun_reduce = True
-    while is_rerun_reduce:
-        is_rerun_reduce = False
-
-        gw_nodes = [
-            node
-            for node in bpmn._flatten_node_typ_map()
-            if issubclass(type(node), Gateway)
-        ]
-        for gw_node in gw_nodes:
-            if gw_node.get_in_degree() > 1 or gw_node.get_out_degree() > 1:
-                continue
-            if gw_node.get_in_degree() == 0 or gw_node.get_out_degree() == 0:
-                continue
-
-            source_id, target_id = bpmn.remove_node_with_connecting_flows(gw_node)
-            new_flow_id = create_arc_name(source_id, target_id)
-            if new_flow_id in bpmn._temp_flows:
-                continue
-
-            bpmn.add_flow(
-                bpmn.get_node(source_id), bpmn.get_node(target_id), id=new_flow_id
-            )
-
-            is_rerun_reduce = True
+    """Remove unnecessary gateways (In and out degree == 1).
+
+    The gateways are examined with a worklist. After a removal only the adjacent
+    gateways are examined again, their degrees decrease if they were already
+    connected.
+
+    Returns:
+        The number of removed gateways.
+    """
+    worklist = deque(bpmn.get_nodes(XorGateway, OrGateway, AndGateway))
+    queued = {gw_node.id for gw_node in worklist}
+    reductions = 0
+    while worklist:
+        gw_node = worklist.popleft()
+        queued.remove(gw_node.id)
+        if not bpmn.is_node_existing(gw_node.id):
+            continue
+        if bpmn.get_in_degree(gw_node) != 1 or bpmn.get_out_degree(gw_node) != 1:
+            continue
+        (in_flow,) = bpmn.get_incoming(gw_node.id)
+        (out_flow,) = bpmn.get_outgoing(gw_node.id)
+        # Self loops and detached flows are kept
+        if in_flow is out_flow or not (
+            bpmn.is_node_existing(in_flow.sourceRef)
+            and bpmn.is_node_existing(out_flow.targetRef)
+        ):
+            continue
+
+        source_id, target_id = bpmn.remove_node_with_connecting_flows(gw_node)
+        reductions += 1
+        source, target = bpmn.get_node(source_id), bpmn.get_node(target_id)
+        _connect(bpmn, source, target)
+        for node in (source, target):
+            if isinstance(node, Gateway) and node.id not in queued:
+                worklist.append(node)
+                queued.add(node.id)
+    return reductions
 
 
 def transform_petrinet_to_bpmn(net: Net):
@@ -77,8 +108,8 @@ def transform_petrinet_to_bpmn(net: Net):
     bpmn_general = BPMN.generate_empty_bpmn(net.id or "new_net")
     bpmn = bpmn_general.process
 
-    transitions = net.transitions.copy()
-    places = net.places.copy()
+    transitions = set(net.transitions)
+    places = set(net.places)
 
     # find workflow specific elements
     to_handle_subprocesses = find_workflow_subprocesses(net)
@@ -141,8 +172,8 @@ def transform_petrinet_to_bpmn(net: Net):
 
     # handle remaining arcs
     for arc in net.arcs:
-        source_in_nodes = arc.source in net._temp_elements
-        target_in_nodes = arc.target in net._temp_elements
+        source_in_nodes = net.has_element(arc.source)
+        target_in_nodes = net.has_element(arc.target)
         if not source_in_nodes or not target_in_nodes:
             continue
         source = bpmn.get_node(arc.source)
@@ -151,7 +182,8 @@ def transform_petrinet_to_bpmn(net: Net):
 
     # Postprocessing
     remove_silent_tasks(bpmn)
-    remove_unnecessary_gateways(bpmn)
+    with tracing.stage("remove_unnecessary_gateways", bpmn):
+        remove_unnecessary_gateways(bpmn)
 
     return bpmn_general
 
@@ -162,22 +194,29 @@ def apply_preprocessing(net: Net, funcs: list[Callable[[Net], None]]):
         apply_preprocessing(p.net, funcs)
 
     for f in funcs:
-        f(net)
+        with tracing.stage(f.__name__, net):
+            f(net)
 
 
 def pnml_to_bpmn(pnml: Pnml):
     """Process and transform a petri net to bpmn."""
     net = pnml.net
 
-    apply_preprocessing(
-        net,
-        [
-            dangling_transition.add_places_at_dangling_transitions,
-            workflow_operators.handle_workflow_operators,
-            vanilla_gateway_transition.split_and_gw_with_name,
-            event_trigger.split_event_triggers,
-        ],
-    )
-    bpmn = transform_petrinet_to_bpmn(net)
-    annotate_resources(net, bpmn)
+    with tracing.stage("preprocess", net):
+        apply_preprocessing(
+            net,
+            [
+                dangling_transition.add_places_at_dangling_transitions,
+                workflow_operators.handle_workflow_operators,
+                vanilla_gateway_transition.split_and_gw_with_name,
+                event_trigger.split_event_triggers,
+            ],
+        )
+    with tracing.stage("transform") as stage:
+        bpmn = transform_petrinet_to_bpmn(net)
+        stage.counted(bpmn.process)
+    with tracing.stage("annotate_resources"):
+        annotate_resources(net, bpmn)
+    # The nodes of the diagram keep the positions of the net (see `set_graphics`)
+    bpmn._geometry = pnml._geometry
     return bpmn
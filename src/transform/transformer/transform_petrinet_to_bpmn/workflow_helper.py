@@ -32,6 +32,7 @@ from transformer.models.pnml.transform_helper import (
     XORHelperPNML,
 )
 from transformer.models.pnml.workflow import WorkflowBranchingType
+from transformer.utility.parallel import map_subprocesses
 from transformer.utility.pnml import (
     generate_subprocess_inner_id,
 )
@@ -96,7 +97,7 @@ def find_workflow_subprocesses(net: Net):
 def find_workflow_operators(net: Net):
     """Return all workflow operators of a net."""
     operator_map: dict[str, list[NetElement]] = {}
-    for node in net._temp_elements.values():
+    for node in net.get_elements():
         if isinstance(node, Page):
             continue
         if not node.is_workflow_operator():
@@ -140,14 +141,20 @@ def handle_workflow_subprocesses(
     to_handle_subprocesses: list[Transition],
     caller_func: Callable[[Net], BPMN],
 ):
-    """Add all found workflow subprocesses of a net as nodes to a bpmn."""
+    """Add all found workflow subprocesses of a net as nodes to a bpmn.
+
+    The pages are prepared in the order of their ids and transformed afterwards,
+    in parallel if enabled (see `map_subprocesses`).
+    """
+    to_handle_subprocesses = sorted(to_handle_subprocesses, key=lambda x: x.id)
+    page_nets: list[Net] = []
     for subprocess_transition in to_handle_subprocesses:
         sb_id = subprocess_transition.id
         page = net.get_page(sb_id)
         page_net = page.net
 
-        outer_source_id = list(net.get_incoming(sb_id))[0].source
-        outer_sink_id = list(net.get_outgoing(sb_id))[0].target
+        outer_source_id = net.get_incoming(sb_id)[0].source
+        outer_sink_id = net.get_outgoing(sb_id)[0].target
 
         inner_source_id, inner_sink_id = (
             page_net.get_element(outer_source_id),
@@ -167,8 +174,12 @@ def handle_workflow_subprocesses(
         page_net.change_id(
             inner_sink_id.id, generate_subprocess_inner_id(inner_sink_id.id)
         )
+        page_nets.append(page_net)
 
-        inner_bpmn = caller_func(page_net).process
+    inner_bpmns = map_subprocesses(caller_func, [(page_net,) for page_net in page_nets])
+    for subprocess_transition, inner in zip(to_handle_subprocesses, inner_bpmns):
+        sb_id = subprocess_transition.id
+        inner_bpmn = inner.process
         inner_bpmn.id = sb_id
         inner_bpmn.name = subprocess_transition.get_name()
         inner_bpmn.isExecutable = None
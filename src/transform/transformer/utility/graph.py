@@ -0,0 +1,541 @@
+"""Compact integer indexed graph, the core of the models with nodes and edges.
+
+Node ids are interned once and mapped to dense integers, so are the (hashable)
+keys of the edges. The nodes and edges are stored in parallel arrays indexed by
+these integers, the adjacency of a node is a list of edge integers. Removed nodes
+and edges leave a hole, so the integers of the remaining elements are stable and
+the iteration keeps the insertion order.
+
+Read heavy analyses can take a CSR snapshot (`csr`) with contiguous successor
+arrays instead of following the adjacency lists.
+"""
+
+import hashlib
+import sys
+from array import array
+from collections import Counter
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence, Set
+from typing import Any, Generic, TypeVar
+
+N = TypeVar("N")
+E = TypeVar("E")
+
+# Endpoint of an edge whose node was removed.
+DETACHED = -1
+
+
+class IndexedGraph(Generic[N, E]):
+    """Directed multigraph with payloads (e.g. models) on nodes and edges."""
+
+    __slots__ = (
+        "_node_index",
+        "_node_ids",
+        "_nodes",
+        "_tags",
+        "_incoming",
+        "_outgoing",
+        "_node_count",
+        "_tag_counts",
+        "_edge_index",
+        "_edge_ids",
+        "_edges",
+        "_sources",
+        "_targets",
+    )
+
+    def __init__(self):
+        """Create an empty graph."""
+        self._node_index: dict[str, int] = {}
+        self._node_ids: list[str | None] = []
+        self._nodes: list[N | None] = []
+        self._tags = array("b")
+        self._incoming: list[list[int]] = []
+        self._outgoing: list[list[int]] = []
+        self._node_count = 0
+        self._tag_counts: Counter[int] = Counter()
+        self._edge_index: dict[Hashable, int] = {}
+        self._edge_ids: list[Hashable | None] = []
+        self._edges: list[E | None] = []
+        self._sources = array("l")
+        self._targets = array("l")
+
+    def __len__(self):
+        """Return the number of nodes."""
+        return self._node_count
+
+    def __contains__(self, id: object):
+        """Return whether a node with the id exists."""
+        return id in self._node_index
+
+    def _structure(self):
+        """Return the nodes by id and the edges independent of the insertion order.
+
+        The edges are compared by payload and endpoints, not by key.
+        """
+        node_ids = self._node_ids
+        nodes = {id: self._nodes[i] for id, i in self._node_index.items()}
+        edges = Counter(
+            (
+                self._edges[i],
+                node_ids[self._sources[i]] if self._sources[i] != DETACHED else None,
+                node_ids[self._targets[i]] if self._targets[i] != DETACHED else None,
+            )
+            for i in self._edge_index.values()
+        )
+        return nodes, edges
+
+    def __eq__(self, other: object):
+        """Return whether the graphs have the same nodes and edges.
+
+        The edge payloads must be hashable.
+        """
+        if not isinstance(other, IndexedGraph):
+            return NotImplemented
+        return self._structure() == other._structure()
+
+    # Nodes
+
+    def add_node(self, id: str, node: N, tag: int = 0):
+        """Add a node and return its index or the index of the existing node."""
+        index = self._node_index.get(id)
+        if index is not None:
+            return index
+        index = len(self._nodes)
+        self._node_index[sys.intern(id)] = index
+        self._node_ids.append(id)
+        self._nodes.append(node)
+        self._tags.append(tag)
+        self._incoming.append([])
+        self._outgoing.append([])
+        self._node_count += 1
+        self._tag_counts[tag] += 1
+        return index
+
+    def index(self, id: str):
+        """Return the index of a node or None."""
+        return self._node_index.get(id)
+
+    def node(self, id: str) -> N | None:
+        """Return the node of an id or None."""
+        index = self._node_index.get(id)
+        return None if index is None else self._nodes[index]
+
+    def tag(self, id: str):
+        """Return the tag of a node."""
+        return self._tags[self._node_index[id]]
+
+    def count(self, *tags: int):
+        """Return the number of nodes (with one of the tags if given)."""
+        if not tags:
+            return self._node_count
+        return sum(self._tag_counts[tag] for tag in set(tags))
+
+    def nodes(self, *tags: int) -> Iterator[N]:
+        """Yield the nodes (with one of the tags if given) in insertion order."""
+        if not tags:
+            yield from (node for node in self._nodes if node is not None)
+            return
+        node_tags = self._tags
+        for index, node in enumerate(self._nodes):
+            if node is not None and node_tags[index] in tags:
+                yield node
+
+    def node_ids(self) -> Iterator[str]:
+        """Yield the ids of the nodes in insertion order."""
+        return (id for id in self._node_ids if id is not None)
+
+    def remove_node(self, id: str):
+        """Remove a node and detach its edges.
+
+        Returns:
+            The node and the detached incoming and outgoing edges.
+        """
+        index = self._node_index.pop(id)
+        node = self._nodes[index]
+        incoming = [self._edges[e] for e in self._incoming[index]]
+        outgoing = [self._edges[e] for e in self._outgoing[index]]
+        for edge in self._incoming[index]:
+            self._targets[edge] = DETACHED
+        for edge in self._outgoing[index]:
+            self._sources[edge] = DETACHED
+        self._node_ids[index] = None
+        self._nodes[index] = None
+        self._incoming[index] = []
+        self._outgoing[index] = []
+        self._node_count -= 1
+        self._tag_counts[self._tags[index]] -= 1
+        return node, incoming, outgoing
+
+    # Edges
+
+    def add_edge(self, key: Hashable | None, source: str, target: str, edge: E):
+        """Add an edge between the nodes of two ids and return its index.
+
+        Edges to ids without node are added detached at this end.
+
+        Args:
+            key: Unique key of the edge, its index if None.
+            source: Id of the source node.
+            target: Id of the target node.
+            edge: Payload of the edge.
+
+        Raises:
+            KeyError: If an edge with the key exists.
+        """
+        index = len(self._edges)
+        if key is None:
+            key = index
+        if key in self._edge_index:
+            raise KeyError(key)
+        source_index = self._node_index.get(source, DETACHED)
+        target_index = self._node_index.get(target, DETACHED)
+        self._edge_index[key] = index
+        self._edge_ids.append(key)
+        self._edges.append(edge)
+        self._sources.append(source_index)
+        self._targets.append(target_index)
+        if source_index != DETACHED:
+            self._outgoing[source_index].append(index)
+        if target_index != DETACHED:
+            self._incoming[target_index].append(index)
+        return index
+
+    def has_edge(self, key: Hashable):
+        """Return whether an edge with the key exists."""
+        return key in self._edge_index
+
+    def edge(self, key: Hashable) -> E | None:
+        """Return the edge of a key or None."""
+        index = self._edge_index.get(key)
+        return None if index is None else self._edges[index]
+
+    def has_edge_between(self, source: str, target: str, edge: E):
+        """Return whether an equal edge connects the nodes of two ids.
+
+        Ids without node (e.g. of removed nodes) stand for a detached end. The
+        edges are looked up in the adjacency of the source (or target) node.
+        """
+        source_index = self._node_index.get(source, DETACHED)
+        target_index = self._node_index.get(target, DETACHED)
+        if source_index != DETACHED:
+            candidates = self._outgoing[source_index]
+        elif target_index != DETACHED:
+            candidates = self._incoming[target_index]
+        else:
+            candidates = list(self._edge_index.values())
+        sources, targets, edges = self._sources, self._targets, self._edges
+        return any(
+            sources[e] == source_index
+            and targets[e] == target_index
+            and edges[e] == edge
+            for e in candidates
+        )
+
+    def edge_count(self):
+        """Return the number of edges."""
+        return len(self._edge_index)
+
+    def edges(self) -> Iterator[E]:
+        """Yield the edges in insertion order."""
+        return (edge for edge in self._edges if edge is not None)
+
+    def remove_edge(self, key: Hashable) -> E:
+        """Remove an edge and return it."""
+        index = self._edge_index.pop(key)
+        edge = self._edges[index]
+        source, target = self._sources[index], self._targets[index]
+        if source != DETACHED:
+            self._outgoing[source].remove(index)
+        if target != DETACHED:
+            self._incoming[target].remove(index)
+        self._edge_ids[index] = None
+        self._edges[index] = None
+        return edge  # type: ignore
+
+    # Adjacency
+
+    def incoming(self, id: str) -> tuple[E, ...]:
+        """Return the incoming edges of a node (empty for unknown ids)."""
+        index = self._node_index.get(id)
+        if index is None:
+            return ()
+        edges = self._edges
+        return tuple([edges[e] for e in self._incoming[index]])  # type: ignore
+
+    def outgoing(self, id: str) -> tuple[E, ...]:
+        """Return the outgoing edges of a node (empty for unknown ids)."""
+        index = self._node_index.get(id)
+        if index is None:
+            return ()
+        edges = self._edges
+        return tuple([edges[e] for e in self._outgoing[index]])  # type: ignore
+
+    def incoming_items(self, id: str) -> list[tuple[Hashable, E]]:
+        """Return the keys and incoming edges of a node (empty for unknown ids)."""
+        index = self._node_index.get(id)
+        if index is None:
+            return []
+        keys, edges = self._edge_ids, self._edges
+        return [(keys[e], edges[e]) for e in self._incoming[index]]  # type: ignore
+
+    def outgoing_items(self, id: str) -> list[tuple[Hashable, E]]:
+        """Return the keys and outgoing edges of a node (empty for unknown ids)."""
+        index = self._node_index.get(id)
+        if index is None:
+            return []
+        keys, edges = self._edge_ids, self._edges
+        return [(keys[e], edges[e]) for e in self._outgoing[index]]  # type: ignore
+
+    def in_degree(self, id: str):
+        """Return the number of incoming edges of a node."""
+        index = self._node_index.get(id)
+        return 0 if index is None else len(self._incoming[index])
+
+    def out_degree(self, id: str):
+        """Return the number of outgoing edges of a node."""
+        index = self._node_index.get(id)
+        return 0 if index is None else len(self._outgoing[index])
+
+    def csr(self, reverse: bool = False):
+        """Return a compressed sparse row snapshot of the live nodes.
+
+        Args:
+            reverse: Whether the rows contain the predecessors instead of the
+                successors.
+
+        Returns:
+            The node ids by row, the row offsets and the row indexes of the
+            adjacent nodes. The adjacent nodes of row i are
+            `adjacent[offsets[i]:offsets[i + 1]]`.
+        """
+        rows = [i for i, id in enumerate(self._node_ids) if id is not None]
+        row_of = {index: row for row, index in enumerate(rows)}
+        edge_lists = self._incoming if reverse else self._outgoing
+        ends = self._sources if reverse else self._targets
+        offsets = array("l", [0])
+        adjacent = array("l")
+        for index in rows:
+            for edge in edge_lists[index]:
+                end = ends[edge]
+                if end != DETACHED:
+                    adjacent.append(row_of[end])
+            offsets.append(len(adjacent))
+        ids: list[str] = [self._node_ids[i] for i in rows]  # type: ignore
+        return ids, offsets, adjacent
+
+    def immediate_dominators(self, post: bool = False) -> dict[str, str | None]:
+        """Return the immediate dominator of each node reachable from the roots.
+
+        The roots are the nodes without incoming (post: outgoing) edges, they are
+        dominated by a virtual root which is returned as None. The dominators are
+        computed iteratively on the CSR snapshot (Cooper, Harvey and Kennedy:
+        "A Simple, Fast Dominance Algorithm").
+
+        Args:
+            post: Whether the post-dominators (on the reversed edges) are returned.
+        """
+        ids, offsets, adjacent = self.csr(reverse=post)
+        _, reverse_offsets, reverse_adjacent = self.csr(reverse=not post)
+        root = len(ids)
+        roots = [v for v in range(root) if reverse_offsets[v] == reverse_offsets[v + 1]]
+
+        # Postorder of an iterative depth first search from the virtual root
+        postorder = [-1] * (root + 1)
+        order: list[int] = []
+        visited = bytearray(root + 1)
+        visited[root] = 1
+        stack: list[tuple[int, Iterator[int]]] = [(root, iter(roots))]
+        while stack:
+            node, successors = stack[-1]
+            for successor in successors:
+                if not visited[successor]:
+                    visited[successor] = 1
+                    stack.append(
+                        (
+                            successor,
+                            iter(adjacent[offsets[successor] : offsets[successor + 1]]),
+                        )
+                    )
+                    break
+            else:
+                stack.pop()
+                postorder[node] = len(order)
+                order.append(node)
+
+        is_root = bytearray(root + 1)
+        for v in roots:
+            is_root[v] = 1
+        idom = [-1] * (root + 1)
+        idom[root] = root
+
+        def intersect(a: int, b: int):
+            while a != b:
+                while postorder[a] < postorder[b]:
+                    a = idom[a]
+                while postorder[b] < postorder[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            # Reverse postorder without the virtual root
+            for node in reversed(order[:-1]):
+                new_idom = root if is_root[node] else -1
+                for p in reverse_adjacent[
+                    reverse_offsets[node] : reverse_offsets[node + 1]
+                ]:
+                    if idom[p] == -1:
+                        continue
+                    new_idom = p if new_idom == -1 else intersect(p, new_idom)
+                if new_idom != idom[node]:
+                    idom[node] = new_idom
+                    changed = True
+
+        return {ids[v]: None if idom[v] == root else ids[idom[v]] for v in order[:-1]}
+
+    def color_digest(
+        self, node_label: Callable[[N], str], edge_label: Callable[[E], str]
+    ):
+        """Return a digest of the labeled graph independent of ids and order.
+
+        The colors of the nodes are refined (Weisfeiler-Lehman) from their labels
+        by the sorted colors and edge labels of their neighbors until the
+        partition is stable. Each round sorts the signatures, i.e. O(E log V). The
+        color tables of all rounds are hashed, so isomorphic graphs have the same
+        digest. If the labels are unique (e.g. contain the id), no refinement is
+        needed and the digest identifies the graph exactly.
+
+        Args:
+            node_label: Label of a node payload.
+            edge_label: Label of an edge payload.
+        """
+        rows = [i for i, id in enumerate(self._node_ids) if id is not None]
+        row_of = {index: row for row, index in enumerate(rows)}
+        edges = list(self._edge_index.values())
+        digest = hashlib.blake2b(digest_size=16)
+
+        colors, table = _rank([node_label(self._nodes[i]) for i in rows])  # type: ignore
+        digest.update(repr(table).encode())
+        classes = len(table)
+        edge_colors, table = _rank([edge_label(self._edges[e]) for e in edges])  # type: ignore
+        digest.update(repr(table).encode())
+
+        # Endpoint rows of the edges (DETACHED for removed nodes)
+        ends = [
+            (
+                row_of.get(self._sources[e], DETACHED),
+                row_of.get(self._targets[e], DETACHED),
+            )
+            for e in edges
+        ]
+        triples = sorted(
+            (c, colors[s] if s >= 0 else -1, colors[t] if t >= 0 else -1)
+            for c, (s, t) in zip(edge_colors, ends)
+        )
+        digest.update(repr(triples).encode())
+        if classes == len(rows):
+            return digest.hexdigest()
+
+        outgoing: list[list[tuple[int, int]]] = [[] for _ in rows]
+        incoming: list[list[tuple[int, int]]] = [[] for _ in rows]
+        for color, (source, target) in zip(edge_colors, ends):
+            if source != DETACHED:
+                outgoing[source].append((color, target))
+            if target != DETACHED:
+                incoming[target].append((color, source))
+        while True:
+            signatures = [
+                (
+                    colors[v],
+                    tuple(sorted((c, colors[u] if u >= 0 else -1) for c, u in out)),
+                    tuple(sorted((c, colors[u] if u >= 0 else -1) for c, u in inc)),
+                )
+                for v, (out, inc) in enumerate(zip(outgoing, incoming))
+            ]
+            colors, table = _rank(signatures)
+            digest.update(repr(table).encode())
+            if len(table) == classes:
+                return digest.hexdigest()
+            classes = len(table)
+
+
+class GraphView(Set):
+    """Read-only live set of the nodes with a tag or of the edges of a graph.
+
+    Models backed by a graph expose their node and edge fields as views, so the
+    graph stays the only storage of the elements.
+    """
+
+    __slots__ = ("_graph", "_tag", "_endpoints")
+
+    def __init__(
+        self,
+        graph: IndexedGraph,
+        tag: int | None = None,
+        endpoints: Callable[[Any], tuple[str, str]] | None = None,
+    ):
+        """Create a view of the nodes with the tag or of the edges if None.
+
+        Args:
+            graph: Viewed graph.
+            tag: Tag of the viewed nodes, the edges are viewed if None.
+            endpoints: Source and target id of an edge payload (picklable, e.g.
+                an `operator.attrgetter`), required for the edges.
+        """
+        self._graph = graph
+        self._tag = tag
+        self._endpoints = endpoints
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable):
+        """Return the results of the set operations as plain sets."""
+        return set(it)
+
+    def __iter__(self):
+        """Yield the elements in insertion order."""
+        if self._tag is None:
+            return self._graph.edges()
+        return self._graph.nodes(self._tag)
+
+    def __len__(self):
+        """Return the number of elements."""
+        if self._tag is None:
+            return self._graph.edge_count()
+        return self._graph.count(self._tag)
+
+    def __contains__(self, value: object):
+        """Return whether an equal element is in the view."""
+        graph = self._graph
+        if self._tag is None:
+            try:
+                source, target = self._endpoints(value)  # type: ignore[misc]
+            except AttributeError:
+                return False
+            return graph.has_edge_between(source, target, value)
+        id = getattr(value, "id", None)
+        return id in graph and graph.tag(id) == self._tag and graph.node(id) == value
+
+    def __eq__(self, other: object):
+        """Return whether the view and a set have equal elements."""
+        if not isinstance(other, Set):
+            return NotImplemented
+        return len(self) == len(other) and set(self) == set(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self):
+        """Return the representation of the elements as set."""
+        return repr(set(self))
+
+
+def _rank(values: Sequence[Hashable]):
+    """Return the rank of each value among the sorted distinct values.
+
+    Returns:
+        The ranks and the sorted distinct values with their number of occurrences.
+    """
+    counts = Counter(values)
+    table = sorted(counts.items())
+    rank = {value: i for i, (value, _) in enumerate(table)}
+    return [rank[value] for value in values], table
@@ -0,0 +1,810 @@
+"""Layouts of directed graphs from left to right.
+
+The layered (Sugiyama) layout runs in phases which are linear or sort once per
+layer:
+
+1. Cycles are broken by reversing the back edges of a depth first search.
+2. The nodes are ranked by the longest path from the sources (columns).
+3. Edges over several columns get dummy nodes, at most `DUMMY_BUDGET` per node
+   and edge of the graph. Longer edges beyond the budget are drawn straight.
+4. The crossings are reduced by a fixed number of barycenter sweeps, each sorts
+   the nodes of every column by the mean position of their neighbors.
+5. The nodes of a column (and lane) are placed in their order as close as
+   possible to the mean center of their predecessors.
+6. The edges are routed orthogonally, the vertical segments are in the gaps
+   between the columns. Back edges are routed below their lanes.
+
+The cost is O((V + E) log V) with the dummy nodes bounded by O(V + E).
+
+The anchored layout keeps the boxes of a source diagram (see `Bounds`): the
+nodes of the source are centered at their source box, the other nodes are placed
+between their neighbors and the overlaps are resolved by moving nodes down.
+
+The shapes and edges of a BPMN diagram are created by `bpmn_diagram_elements`
+from the layouts of its process and the nested layouts of its subprocesses.
+"""
+
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING, NamedTuple
+
+from transformer.models.bpmn.bpmn_graphics import (
+    BPMNEdge,
+    BPMNLabel,
+    BPMNShape,
+    DCBounds,
+    DIWaypoint,
+)
+
+if TYPE_CHECKING:
+    from transformer.models.bpmn.bpmn import Flow, GenericBPMNNode, Lane, Process
+
+# Horizontal space between the columns.
+LAYER_GAP = 50.0
+# Vertical space between the nodes of a column and around the lanes.
+NODE_GAP = 30.0
+# Maximum number of dummy nodes per node and edge of the graph.
+DUMMY_BUDGET = 2
+# Number of barycenter sweeps (alternating down and up).
+SWEEPS = 4
+# Number of sweeps moving the not anchored nodes to the mean of their neighbors.
+RELAXATIONS = 10
+
+# Sizes of the BPMN shapes (width, height)
+EVENT_SIZE = (36.0, 36.0)
+GATEWAY_SIZE = (50.0, 50.0)
+TASK_SIZE = (100.0, 80.0)
+_LABEL_SIZE = (90.0, 20.0)
+# Space around the content of a subprocess or pool and width of the name strips
+_PADDING = 20.0
+_STRIP = 30.0
+
+Point = tuple[float, float]
+
+
+class Bounds(NamedTuple):
+    """Box of an element in a source diagram.
+
+    Attributes:
+        x: Left coordinate.
+        y: Top coordinate.
+        width: Width of the box.
+        height: Height of the box.
+    """
+
+    x: float
+    y: float
+    width: float
+    height: float
+
+    @property
+    def center(self) -> Point:
+        """Return the center of the box."""
+        return self.x + self.width / 2, self.y + self.height / 2
+
+
+class Layout(NamedTuple):
+    """Positions of the nodes and routes of the edges.
+
+    Attributes:
+        x: Left coordinate of each node.
+        y: Top coordinate of each node.
+        width: Width of all columns.
+        height: Height of all lanes.
+        lanes: Top coordinate and height of each lane.
+        waypoints: Orthogonal route of each edge from the right side of its source
+            to the left side of its target.
+    """
+
+    x: list[float]
+    y: list[float]
+    width: float
+    height: float
+    lanes: list[tuple[float, float]]
+    waypoints: list[list[Point]]
+
+
+def _back_edges(n: int, edges: list[tuple[int, int]]):
+    """Return the back edges of a depth first search and the discovery order.
+
+    The search starts at the nodes without incoming edges.
+    """
+    outgoing: list[list[int]] = [[] for _ in range(n)]
+    has_incoming = bytearray(n)
+    for i, (source, target) in enumerate(edges):
+        if source != target:
+            outgoing[source].append(i)
+            has_incoming[target] = 1
+    back = [False] * len(edges)
+    # 0 not visited, 1 on the stack, 2 finished
+    state = bytearray(n)
+    order: list[int] = []
+    roots = [v for v in range(n) if not has_incoming[v]]
+    for root in roots + list(range(n)):
+        if state[root]:
+            continue
+        state[root] = 1
+        order.append(root)
+        stack = [(root, iter(outgoing[root]))]
+        while stack:
+            node, successors = stack[-1]
+            for edge in successors:
+                target = edges[edge][1]
+                if state[target] == 1:
+                    back[edge] = True
+                elif state[target] == 0:
+                    state[target] = 1
+                    order.append(target)
+                    stack.append((target, iter(outgoing[target])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return back, order
+
+
+def _ranks(n: int, edges: list[tuple[int, int]]):
+    """Return the length of the longest path from a source to each node of a DAG."""
+    successors: list[list[int]] = [[] for _ in range(n)]
+    in_degree = [0] * n
+    for source, target in edges:
+        successors[source].append(target)
+        in_degree[target] += 1
+    rank = [0] * n
+    queue = [v for v in range(n) if in_degree[v] == 0]
+    for node in queue:
+        for target in successors[node]:
+            rank[target] = max(rank[target], rank[node] + 1)
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                queue.append(target)
+    return rank
+
+
+def _place(
+    nodes: list[int],
+    predecessors: list[list[int]],
+    lane_of: list[int],
+    height: list[float],
+    local_y: list[float],
+):
+    """Set the top of the nodes of a column in a lane (in this order).
+
+    Each node should be centered at the mean center of its predecessors in the
+    lane (or follow the node above), with `NODE_GAP` between the nodes. The least
+    squares solution is found by pooling adjacent violators.
+    """
+    # The tops minus the offsets of the stacked nodes must not decrease
+    offsets: list[float] = []
+    targets: list[float] = []
+    offset = 0.0
+    for node in nodes:
+        lane = lane_of[node]
+        same_lane = [
+            local_y[u] + height[u] / 2 for u in predecessors[node] if lane_of[u] == lane
+        ]
+        if same_lane:
+            target = sum(same_lane) / len(same_lane) - height[node] / 2 - offset
+        else:
+            target = targets[-1] if targets else 0.0
+        offsets.append(offset)
+        targets.append(target)
+        offset += height[node] + NODE_GAP
+    # Blocks of [sum of targets, count]
+    blocks: list[list[float]] = []
+    for target in targets:
+        blocks.append([target, 1])
+        while len(blocks) > 1 and (
+            blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]
+        ):
+            total, count = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+    i = 0
+    for total, count in blocks:
+        for _ in range(int(count)):
+            local_y[nodes[i]] = total / count + offsets[i]
+            i += 1
+
+
+def _orthogonal(points: list[Point], gaps: list[float]):
+    """Return the orthogonal route through the points without collinear points.
+
+    Args:
+        points: Points of the route from left to right.
+        gaps: x of the vertical segment before each point (except the first).
+    """
+    route = [points[0]]
+    for (x, y), gap in zip(points[1:], gaps):
+        last_y = route[-1][1]
+        if y != last_y:
+            route.append((gap, last_y))
+            route.append((gap, y))
+        route.append((x, y))
+    simplified = [route[0]]
+    for i in range(1, len(route) - 1):
+        (ax, ay), (bx, by), (cx, cy) = simplified[-1], route[i], route[i + 1]
+        if (ax == bx == cx) or (ay == by == cy):
+            continue
+        simplified.append(route[i])
+    simplified.append(route[-1])
+    return simplified
+
+
+def _self_loop(right: float, left: float, center: float, top: float):
+    """Return the route of a self loop above its node."""
+    loop_y = top - NODE_GAP / 2
+    return [
+        (right, center),
+        (right + LAYER_GAP / 4, center),
+        (right + LAYER_GAP / 4, loop_y),
+        (left - LAYER_GAP / 4, loop_y),
+        (left - LAYER_GAP / 4, center),
+        (left, center),
+    ]
+
+
+def _route_below(
+    right: float, source_y: float, left: float, target_y: float, below: float
+):
+    """Return the orthogonal route of an edge which goes back below its nodes."""
+    return _orthogonal(
+        [
+            (right, source_y),
+            (right + LAYER_GAP / 2, below),
+            (left - LAYER_GAP / 2, below),
+            (left, target_y),
+        ],
+        [right + LAYER_GAP / 2, left - LAYER_GAP / 2, left - LAYER_GAP / 2],
+    )
+
+
+def layered_layout(
+    sizes: list[tuple[float, float]],
+    edges: list[tuple[int, int]],
+    lanes: list[int] | None = None,
+    lane_count: int = 1,
+    min_lane_height: float = 0,
+    routes: bool = True,
+):
+    """Return the layered layout of a directed graph.
+
+    Args:
+        sizes: Width and height of each node.
+        edges: Source and target index of each edge.
+        lanes: Lane index of each node (all nodes in one lane if None). The lanes
+            are horizontal bands in the order of their index.
+        lane_count: Number of lanes.
+        min_lane_height: Minimum height of a lane (incl. the gaps).
+        routes: Whether the waypoints of the edges are computed (empty otherwise).
+    """
+    n = len(sizes)
+    lane_of = list(lanes) if lanes is not None else [0] * n
+    lane_count = max(lane_count, max(lane_of, default=0) + 1)
+
+    back, order = _back_edges(n, edges)
+    dag = [
+        (target, source) if is_back else (source, target)
+        for (source, target), is_back in zip(edges, back)
+        if source != target
+    ]
+    rank = _ranks(n, dag)
+
+    # Dummy nodes of the forward edges over several columns
+    width = [w for w, _ in sizes]
+    height = [h for _, h in sizes]
+    predecessors: list[list[int]] = [[] for _ in range(n)]
+    successors: list[list[int]] = [[] for _ in range(n)]
+    chains: list[list[int]] = [[] for _ in edges]
+    budget = DUMMY_BUDGET * (n + len(edges))
+    for i, (source, target) in enumerate(edges):
+        if source == target or back[i]:
+            continue
+        path = [source]
+        span = rank[target] - rank[source]
+        if 1 < span <= budget + 1:
+            budget -= span - 1
+            for r in range(rank[source] + 1, rank[target]):
+                dummy = len(rank)
+                rank.append(r)
+                lane_of.append(lane_of[source])
+                width.append(0.0)
+                height.append(0.0)
+                predecessors.append([])
+                successors.append([])
+                chains[i].append(dummy)
+                path.append(dummy)
+        path.append(target)
+        for a, b in zip(path, path[1:]):
+            successors[a].append(b)
+            predecessors[b].append(a)
+    for (source, target), is_back in zip(edges, back):
+        if is_back and source != target:
+            successors[target].append(source)
+            predecessors[source].append(target)
+
+    # Columns in discovery order, dummies in the order of their edges
+    layers: list[list[int]] = [[] for _ in range(max(rank, default=-1) + 1)]
+    for node in order + list(range(n, len(rank))):
+        layers[rank[node]].append(node)
+    position = [0.0] * len(rank)
+    for layer in layers:
+        layer.sort(key=lane_of.__getitem__)
+        for i, node in enumerate(layer):
+            position[node] = i
+
+    for sweep in range(SWEEPS):
+        down = sweep % 2 == 0
+        neighbors = predecessors if down else successors
+        indexes = range(1, len(layers)) if down else range(len(layers) - 2, -1, -1)
+        for r in indexes:
+            layer = layers[r]
+            keys = {}
+            for node in layer:
+                adjacent = neighbors[node]
+                barycenter = (
+                    sum(position[u] for u in adjacent) / len(adjacent)
+                    if adjacent
+                    else position[node]
+                )
+                keys[node] = (lane_of[node], barycenter, position[node])
+            layer.sort(key=keys.__getitem__)
+            for i, node in enumerate(layer):
+                position[node] = i
+
+    # Vertical placement relative to the lane, then offset by the lanes above
+    center = [0.0] * len(rank)
+    local_y = [0.0] * len(rank)
+    lane_top = [float("inf")] * lane_count
+    lane_bottom = [float("-inf")] * lane_count
+    for layer in layers:
+        start = 0
+        while start < len(layer):
+            lane = lane_of[layer[start]]
+            end = start
+            while end < len(layer) and lane_of[layer[end]] == lane:
+                end += 1
+            _place(layer[start:end], predecessors, lane_of, height, local_y)
+            for node in layer[start:end]:
+                center[node] = local_y[node] + height[node] / 2
+            first, last = layer[start], layer[end - 1]
+            lane_top[lane] = min(lane_top[lane], local_y[first])
+            lane_bottom[lane] = max(lane_bottom[lane], local_y[last] + height[last])
+            start = end
+    lane_bands: list[tuple[float, float]] = []
+    top = 0.0
+    for lane in range(lane_count):
+        if lane_top[lane] > lane_bottom[lane]:
+            # Without nodes
+            lane_top[lane] = lane_bottom[lane] = 0.0
+        band = max(lane_bottom[lane] - lane_top[lane] + 2 * NODE_GAP, min_lane_height)
+        lane_bands.append((top, band))
+        top += band
+    total_height = top
+
+    layer_x: list[float] = []
+    x = 0.0
+    for layer in layers:
+        layer_x.append(x)
+        x += max((width[node] for node in layer), default=0.0) + LAYER_GAP
+    total_width = max(x - LAYER_GAP, 0.0)
+    layer_width = [max((width[node] for node in layer), default=0.0) for layer in layers]
+
+    xs = [0.0] * len(rank)
+    ys = [0.0] * len(rank)
+    for node in range(len(rank)):
+        r = rank[node]
+        xs[node] = layer_x[r] + (layer_width[r] - width[node]) / 2
+        lane = lane_of[node]
+        ys[node] = lane_bands[lane][0] + NODE_GAP + local_y[node] - lane_top[lane]
+        center[node] = ys[node] + height[node] / 2
+
+    waypoints: list[list[Point]] = []
+    for i, (source, target) in enumerate(edges if routes else ()):
+        right, left = xs[source] + width[source], xs[target]
+        if source == target:
+            waypoints.append(_self_loop(right, left, center[source], ys[source]))
+        elif back[i]:
+            below = max(
+                sum(lane_bands[lane_of[source]]), sum(lane_bands[lane_of[target]])
+            )
+            below -= NODE_GAP / 2
+            waypoints.append(
+                _route_below(right, center[source], left, center[target], below)
+            )
+        else:
+            path = [*chains[i], target]
+            points = [(right, center[source])]
+            points.extend(
+                (layer_x[rank[d]] + layer_width[rank[d]] / 2, center[d])
+                for d in chains[i]
+            )
+            points.append((left, center[target]))
+            gaps = [layer_x[rank[node]] - LAYER_GAP / 2 for node in path]
+            waypoints.append(_orthogonal(points, gaps))
+
+    return Layout(xs[:n], ys[:n], total_width, total_height, lane_bands, waypoints)
+
+
+def source_anchors(ids: Sequence[str | None], geometry: dict[str, Bounds]):
+    """Return the center of the source box of each node with a box by index.
+
+    Boxes with the same center are placeholders (e.g. of editors without a
+    layout), the nodes of these boxes are not anchored.
+
+    Args:
+        ids: Id of the source element of each node (None for new nodes).
+        geometry: Boxes of the source diagram by element id.
+    """
+    anchors = {
+        node: geometry[id].center
+        for node, id in enumerate(ids)
+        if id is not None and id in geometry
+    }
+    counts = Counter(anchors.values())
+    return {node: center for node, center in anchors.items() if counts[center] == 1}
+
+
+def _relax(
+    sizes: list[tuple[float, float]],
+    edges: list[tuple[int, int]],
+    anchors: dict[int, Point],
+):
+    """Return the center of each node, the anchored nodes keep their anchor.
+
+    The other nodes are placed at the mean center of their placed neighbors in
+    breadth first order from the anchors and afterwards moved `RELAXATIONS` times
+    to the mean center of all their neighbors, which spreads them evenly between
+    the anchors. Nodes without a path to an anchor get the layered layout of
+    their components below all placed nodes.
+    """
+    n = len(sizes)
+    neighbors: list[list[int]] = [[] for _ in range(n)]
+    for source, target in edges:
+        if source != target:
+            neighbors[source].append(target)
+            neighbors[target].append(source)
+    centers: list[Point | None] = [None] * n
+    for node, anchor in anchors.items():
+        centers[node] = anchor
+    reached = bytearray(n)
+    queue = sorted(anchors)
+    for node in queue:
+        reached[node] = 1
+    free: list[int] = []
+    for node in queue:
+        for u in neighbors[node]:
+            if not reached[u]:
+                reached[u] = 1
+                queue.append(u)
+                free.append(u)
+
+    for node in free:
+        # The node which reached this node is already placed
+        placed = [c for u in neighbors[node] if (c := centers[u]) is not None]
+        centers[node] = (
+            sum(x for x, _ in placed) / len(placed),
+            sum(y for _, y in placed) / len(placed),
+        )
+    for _ in range(RELAXATIONS):
+        for node in free:
+            adjacent = neighbors[node]
+            x = y = 0.0
+            for u in adjacent:
+                ux, uy = centers[u]  # type: ignore[misc]
+                x += ux
+                y += uy
+            centers[node] = (x / len(adjacent), y / len(adjacent))
+
+    unreached = [v for v in range(n) if centers[v] is None]
+    if unreached:
+        # The neighbors of an unreached node are unreached
+        row = {v: i for i, v in enumerate(unreached)}
+        layout = layered_layout(
+            [sizes[v] for v in unreached],
+            [(row[s], row[t]) for s, t in edges if s in row],
+            routes=False,
+        )
+        boxes = [(c, size) for c, size in zip(centers, sizes) if c is not None]
+        left = min((cx - w / 2 for (cx, _), (w, _) in boxes), default=0.0)
+        top = max((cy + h / 2 + LAYER_GAP for (_, cy), (_, h) in boxes), default=0.0)
+        for v, i in row.items():
+            w, h = sizes[v]
+            centers[v] = (left + layout.x[i] + w / 2, top + layout.y[i] + h / 2)
+    return centers  # type: ignore[return-value]
+
+
+def _separate(
+    nodes: list[int],
+    x: list[float],
+    y: list[float],
+    width: list[float],
+    height: list[float],
+    gap: float,
+):
+    """Move the nodes down until they keep a gap to all nodes before them.
+
+    The boxes are stored in a grid of cells, each box in all cells it covers.
+    """
+    if not nodes:
+        return
+    cell = sum(max(width[v], height[v]) for v in nodes) / len(nodes) + gap
+    grid: dict[tuple[int, int], list[int]] = {}
+    for node in nodes:
+        w, h = width[node], height[node]
+        moved = True
+        while moved:
+            moved = False
+            top = y[node]
+            columns = range(
+                int((x[node] - gap) // cell), int((x[node] + w + gap) // cell) + 1
+            )
+            rows = range(int((top - gap) // cell), int((top + h + gap) // cell) + 1)
+            for i in columns:
+                for j in rows:
+                    for other in grid.get((i, j), ()):
+                        # With tolerance for the rounding of the moved tops
+                        if (
+                            x[node] < x[other] + width[other] + gap - 1e-6
+                            and x[other] < x[node] + w + gap - 1e-6
+                            and top < y[other] + height[other] + gap - 1e-6
+                            and y[other] < top + h + gap - 1e-6
+                        ):
+                            y[node] = y[other] + height[other] + gap
+                            moved = True
+                            break
+                    if moved:
+                        break
+                if moved:
+                    break
+        for i in range(int(x[node] // cell), int((x[node] + w) // cell) + 1):
+            for j in range(int(y[node] // cell), int((y[node] + h) // cell) + 1):
+                grid.setdefault((i, j), []).append(node)
+
+
+def anchored_layout(
+    sizes: list[tuple[float, float]],
+    edges: list[tuple[int, int]],
+    anchors: dict[int, Point],
+    lanes: list[int] | None = None,
+    lane_count: int = 1,
+    min_lane_height: float = 0,
+    gap: float = NODE_GAP,
+    routes: bool = True,
+):
+    """Return the layout of a directed graph with nodes at given centers.
+
+    The anchored nodes are centered at their anchor, the other nodes between
+    their neighbors (see `_relax`). Overlapping nodes of a lane are moved down,
+    the anchored nodes are placed first. The lanes are stacked in the order of
+    their index and keep the positions of their nodes relative to each other.
+    The layout is moved to the origin like the layered layout. The edges go
+    right or back below their nodes.
+
+    Args:
+        sizes: Width and height of each node.
+        edges: Source and target index of each edge.
+        anchors: Center of the anchored nodes by index.
+        lanes: Lane index of each node (all nodes in one lane if None).
+        lane_count: Number of lanes.
+        min_lane_height: Minimum height of a lane (incl. the gaps).
+        gap: Minimum space between the nodes of a lane.
+        routes: Whether the waypoints of the edges are computed (empty otherwise).
+    """
+    n = len(sizes)
+    lane_of = list(lanes) if lanes is not None else [0] * n
+    lane_count = max(lane_count, max(lane_of, default=0) + 1)
+    width = [w for w, _ in sizes]
+    height = [h for _, h in sizes]
+    centers = _relax(sizes, edges, anchors)
+    xs = [cx - w / 2 for (cx, _), w in zip(centers, width)]
+    ys = [cy - h / 2 for (_, cy), h in zip(centers, height)]
+
+    by_lane: list[list[int]] = [[] for _ in range(lane_count)]
+    for node in sorted(range(n), key=lambda v: v not in anchors):
+        by_lane[lane_of[node]].append(node)
+    lane_bands: list[tuple[float, float]] = []
+    top = 0.0
+    for nodes in by_lane:
+        _separate(nodes, xs, ys, width, height, gap)
+        lane_top = min((ys[v] for v in nodes), default=0.0)
+        lane_bottom = max((ys[v] + height[v] for v in nodes), default=0.0)
+        band = max(lane_bottom - lane_top + 2 * NODE_GAP, min_lane_height)
+        for node in nodes:
+            ys[node] += top + NODE_GAP - lane_top
+        lane_bands.append((top, band))
+        top += band
+    left = min(xs, default=0.0)
+    xs = [x - left for x in xs]
+    total_width = max((x + w for x, w in zip(xs, width)), default=0.0)
+
+    waypoints: list[list[Point]] = []
+    for source, target in edges if routes else ():
+        right, target_left = xs[source] + width[source], xs[target]
+        source_y = ys[source] + height[source] / 2
+        target_y = ys[target] + height[target] / 2
+        if source == target:
+            waypoints.append(_self_loop(right, target_left, source_y, ys[source]))
+        elif target_left >= right:
+            middle = (right + target_left) / 2
+            waypoints.append(
+                _orthogonal([(right, source_y), (target_left, target_y)], [middle])
+            )
+        else:
+            below = max(ys[source] + height[source], ys[target] + height[target])
+            waypoints.append(
+                _route_below(
+                    right, source_y, target_left, target_y, below + NODE_GAP / 2
+                )
+            )
+    return Layout(xs, ys, total_width, top, lane_bands, waypoints)
+
+
+class _ProcessLayout(NamedTuple):
+    """Layered layout of the nodes and flows of a process and its subprocesses."""
+
+    nodes: list["GenericBPMNNode"]
+    tags: list[int]
+    sizes: list[tuple[float, float]]
+    flows: list["Flow"]
+    layout: Layout
+    subprocesses: dict[str, "_ProcessLayout"]
+
+
+def _layout_process(
+    process: "Process",
+    small_shapes: Mapping[int, tuple[float, float]],
+    subprocess_tag: int,
+    lanes: list["Lane"] | None = None,
+    geometry: dict[str, Bounds] | None = None,
+):
+    """Return the layout of a process with the subprocesses laid out inside.
+
+    The nodes and flows are sorted by id, so the layout does not depend on the
+    order in which the process was built. If nodes have a source box in the
+    geometry, the nodes keep the position of their boxes (see `anchored_layout`),
+    otherwise the process is laid out in layers.
+    """
+    graph = process._graph
+    nodes = sorted(graph.nodes(), key=lambda node: node.id)
+    tags = [graph.tag(node.id) for node in nodes]
+    index = {node.id: i for i, node in enumerate(nodes)}
+    sizes: list[tuple[float, float]] = []
+    subprocesses: dict[str, _ProcessLayout] = {}
+    for node, tag in zip(nodes, tags):
+        if tag == subprocess_tag:
+            inner = _layout_process(
+                node,  # type: ignore[arg-type]
+                small_shapes,
+                subprocess_tag,
+                geometry=geometry,
+            )
+            subprocesses[node.id] = inner
+            sizes.append(
+                (
+                    max(inner.layout.width + 2 * _PADDING, TASK_SIZE[0]),
+                    max(inner.layout.height + 2 * _PADDING, TASK_SIZE[1]),
+                )
+            )
+        else:
+            sizes.append(small_shapes.get(tag, TASK_SIZE))
+    flows = sorted(
+        (
+            flow
+            for flow in graph.edges()
+            if flow.sourceRef in index and flow.targetRef in index
+        ),
+        key=lambda flow: flow.id,
+    )
+    edges = [(index[flow.sourceRef], index[flow.targetRef]) for flow in flows]
+    lane_of = None
+    if lanes:
+        lane_index = {
+            ref: i for i, lane in enumerate(lanes) for ref in lane.flowNodeRefs
+        }
+        lane_of = [lane_index.get(node.id, 0) for node in nodes]
+    lane_count = len(lanes or ()) or 1
+    min_lane_height = TASK_SIZE[1] + 2 * NODE_GAP
+    anchors = source_anchors([node.id for node in nodes], geometry or {})
+    if anchors:
+        layout = anchored_layout(
+            sizes, edges, anchors, lane_of, lane_count, min_lane_height
+        )
+    else:
+        layout = layered_layout(sizes, edges, lane_of, lane_count, min_lane_height)
+    return _ProcessLayout(nodes, tags, sizes, flows, layout, subprocesses)
+
+
+def _add_diagram_elements(
+    result: _ProcessLayout,
+    small_shapes: Mapping[int, tuple[float, float]],
+    x: float,
+    y: float,
+    elements: list[BPMNShape | BPMNEdge],
+):
+    """Add the shapes and edges of a laid out process with its origin at x, y."""
+    for flow, waypoints in zip(result.flows, result.layout.waypoints):
+        elements.append(
+            BPMNEdge(
+                id=f"{flow.id}_di",
+                bpmnElement=flow.id,
+                waypoints=[DIWaypoint(x=x + wx, y=y + wy) for wx, wy in waypoints],
+            )
+        )
+    for i, node in enumerate(result.nodes):
+        width, height = result.sizes[i]
+        left, top = x + result.layout.x[i], y + result.layout.y[i]
+        shape = BPMNShape(
+            id=f"{node.id}_di",
+            bpmnElement=node.id,
+            bounds=DCBounds(x=left, y=top, width=width, height=height),
+        )
+        if node.id in result.subprocesses:
+            shape.isExpanded = True
+        if node.name and result.tags[i] in small_shapes:
+            # Below events and gateways
+            shape.label = BPMNLabel(
+                bounds=DCBounds(
+                    x=left + (width - _LABEL_SIZE[0]) / 2,
+                    y=top + height + 5,
+                    width=_LABEL_SIZE[0],
+                    height=_LABEL_SIZE[1],
+                )
+            )
+        elements.append(shape)
+        if node.id in result.subprocesses:
+            _add_diagram_elements(
+                result.subprocesses[node.id],
+                small_shapes,
+                left + _PADDING,
+                top + _PADDING,
+                elements,
+            )
+
+
+def bpmn_diagram_elements(
+    process: "Process",
+    lanes: list["Lane"],
+    participant: str | None,
+    geometry: dict[str, Bounds],
+    small_shapes: Mapping[int, tuple[float, float]],
+    subprocess_tag: int,
+):
+    """Return the shapes and edges of the laid out diagram of a BPMN process.
+
+    The pool (if any) contains the lanes stacked in the given order, the expanded
+    subprocesses are laid out recursively and contain the shapes of their nodes.
+
+    Args:
+        process: The process with the nodes by tag in its graph.
+        lanes: Lanes of the process in the order of the pool.
+        participant: Id of the participant of the pool (no pool if None).
+        geometry: Boxes of the source diagram by element id.
+        small_shapes: Size of the shapes with the label below (events and
+            gateways) by tag, the other shapes have the size of a task.
+        subprocess_tag: Tag of the subprocesses which are laid out inside.
+    """
+    result = _layout_process(process, small_shapes, subprocess_tag, lanes, geometry)
+    lane_x = _STRIP if participant else 0.0
+    content_x = lane_x + (_STRIP if lanes else 0.0) + _PADDING
+    width = content_x + result.layout.width + _PADDING
+
+    elements: list[BPMNShape | BPMNEdge] = []
+    if participant:
+        elements.append(
+            BPMNShape(
+                id="Participant_id",
+                bpmnElement=participant,
+                bounds=DCBounds(width=width, height=result.layout.height),
+            )
+        )
+    for lane, (top, height) in zip(lanes, result.layout.lanes):
+        elements.append(
+            BPMNShape(
+                id=f"{lane.id}_di",
+                bpmnElement=lane.id,
+                bounds=DCBounds(x=lane_x, y=top, width=width - lane_x, height=height),
+            )
+        )
+    _add_diagram_elements(result, small_shapes, content_x, 0.0, elements)
+    return elements
@@ -0,0 +1,86 @@
+"""Opt-in parallel transformation of sibling subprocesses.
+
+The subprocesses (BPMN) and pages (PNML) of a model are independent once the ids
+of their start and end elements are fixed. Sibling subprocesses can be transformed
+in a process pool, the results are returned in the order of the arguments, so the
+merged model does not depend on which subprocess finishes first.
+
+The pool is configured with the environment variable
+`TRANSFORM_SUBPROCESS_WORKERS`: Number of processes (default 0 transforms the
+subprocesses one after another). Processes which can not have children (e.g. the
+daemonic workers of the request pool) and the processes of this pool transform
+their subprocesses sequentially.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TypeVar
+
+from transformer.utility import tracing
+
+T = TypeVar("T")
+
+# Modules imported once by the fork server.
+_PRELOAD = [
+    "transformer.transform_bpmn_to_petrinet.transform",
+    "transformer.transform_petrinet_to_bpmn.transform",
+]
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_is_subprocess_worker = False
+
+
+def _mark_worker():
+    """Disable nested pools in the processes of the pool."""
+    global _is_subprocess_worker
+    _is_subprocess_worker = True
+
+
+def get_executor():
+    """Return the pool configured by the environment or None if disabled."""
+    global _executor
+    workers = int(os.getenv("TRANSFORM_SUBPROCESS_WORKERS", "0"))
+    if workers <= 0 or _is_subprocess_worker or multiprocessing.current_process().daemon:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(_PRELOAD)
+            else:
+                context = multiprocessing.get_context("spawn")
+            _executor = ProcessPoolExecutor(
+                workers, mp_context=context, initializer=_mark_worker
+            )
+    return _executor
+
+
+def map_subprocesses(
+    function: Callable[..., T], arguments: Sequence[tuple[Any, ...]]
+) -> list[T]:
+    """Return the results of a function for each argument tuple in their order.
+
+    The function and arguments must be picklable if the pool is enabled. Changes
+    of the arguments by the function are not visible to the caller in this case.
+    """
+    executor = get_executor() if len(arguments) > 1 else None
+    if executor is None:
+        return [function(*args) for args in arguments]
+    trace = tracing.current_trace()
+    if trace is None:
+        futures = [executor.submit(function, *args) for args in arguments]
+        return [future.result() for future in futures]
+    # The stages of the subprocesses are summed up like in the sequential case
+    futures = [
+        executor.submit(tracing.run_traced, function, *args) for args in arguments
+    ]
+    results = []
+    for future in futures:
+        result, stages = future.result()
+        trace.merge(stages)
+        results.append(result)
+    return results
@@ -0,0 +1,25 @@
+"""Output profiles of the serialized models.
+
+A profile selects which generated defaults are written (see `Pnml.to_string` and
+`BPMN.to_string`). The module has no dependencies, so the endpoints can validate
+the parameter without importing the models.
+"""
+
+from enum import Enum
+
+
+class Profile(str, Enum):
+    """Output profile of a serialized model.
+
+    Attributes:
+        full: Every element, as imported by WoPeD and BPMN modelers (default).
+        woped: Without the placeholder graphics of names, triggers and resources
+            and the default transition settings, which WoPeD assumes when they
+            are missing.
+        compact: Without any graphics, layout or GUI settings, for machine
+            consumers. The layouts are not computed.
+    """
+
+    compact = "compact"
+    woped = "woped"
+    full = "full"
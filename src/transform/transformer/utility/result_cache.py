@@ -0,0 +1,311 @@
+"""Content addressed cache of transformation results.
+
+Results are keyed by the transformation direction (and options), the digest of
+the normalized input XML and the transformer version. Known exceptions of the
+input (e.g. not supported elements) are cached as outcome too, so repeated bad
+uploads are cheap. Transient known exceptions (e.g. an overloaded worker pool or a
+timeout) are not cached, the next request transforms the input again.
+
+The cache has an in-process LRU tier bounded in bytes and an optional sqlite tier
+which can be shared by multiple worker processes. It is configured with the
+environment variables:
+
+- `RESULT_CACHE_BYTES`: Size of the in-process tier (default 64 MiB, 0 disables
+  the cache).
+- `RESULT_CACHE_PATH`: File of the shared sqlite tier (disabled if not set).
+- `RESULT_CACHE_DISK_BYTES`: Size of the sqlite tier (default 1 GiB).
+- `TRANSFORMER_VERSION`: Version of the transformer (default digest of the
+  sources), which invalidates all results of other versions.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from exceptions import (
+    KnownException,
+    MissingEnvironmentVariable,
+    NoRequestTokensAvailable,
+    ServiceOverloaded,
+    TokenCheckUnsuccessful,
+    TransformationTimeout,
+    UnexpectedError,
+)
+
+_DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+_DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+# Prefixes of the stored values
+_RESULT = b"R"
+_ERROR = b"E"
+# Ids of the known exceptions which depend on the state of the service and not on
+# the input. Ids are compared, the cached exceptions are restored as
+# `KnownException`.
+_TRANSIENT_ERRORS = frozenset(
+    e.id
+    for e in [
+        UnexpectedError(),
+        MissingEnvironmentVariable(""),
+        TokenCheckUnsuccessful(),
+        NoRequestTokensAvailable(),
+        TransformationTimeout(),
+        ServiceOverloaded(),
+    ]
+)
+
+
+def _source_digest():
+    """Return the digest of the transformer sources and the exception messages."""
+    root = Path(__file__).parents[2]
+    digest = hashlib.sha256()
+    for path in sorted((root / "transformer").rglob("*.py")) + [root / "exceptions.py"]:
+        digest.update(path.relative_to(root).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+_version: str | None = None
+
+
+def transformer_version():
+    """Return the version of the transformer which is part of every key."""
+    global _version
+    if _version is None:
+        _version = os.getenv("TRANSFORMER_VERSION") or _source_digest()
+    return _version
+
+
+def normalize_xml(xml_content: str):
+    """Return the XML without differences which are removed by every XML parser.
+
+    Line endings are normalized and whitespace around the document is removed.
+    """
+    return xml_content.strip().replace("\r\n", "\n").replace("\r", "\n")
+
+
+def cache_key(direction: str, xml_content: str):
+    """Return the key of the result of transforming a XML in a direction."""
+    digest = hashlib.sha256()
+    for part in (transformer_version(), direction, normalize_xml(xml_content)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """Shared sqlite tier, errors (e.g. a locked database) are treated as misses."""
+
+    def __init__(self, path: str, max_bytes: int):
+        """Open or create the database file."""
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path, timeout=1, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.connection.commit()
+
+    def get(self, key: str) -> bytes | None:
+        """Return the value of a key and update its access time."""
+        try:
+            with self.connection:
+                row = self.connection.execute(
+                    "SELECT value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self.connection.execute(
+                        "UPDATE results SET accessed = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+        except sqlite3.Error:
+            return None
+        return None if row is None else row[0]
+
+    def put(self, key: str, value: bytes):
+        """Store a value and evict the least recently used values over the limit."""
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                self._evict()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self):
+        """Delete the least recently used values until the limit is kept."""
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute(
+            "SELECT key, LENGTH(value) FROM results ORDER BY accessed"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def clear(self):
+        """Delete all values."""
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+
+class ResultCache:
+    """Two tier cache of transformation results (XML or known exception)."""
+
+    def __init__(
+        self,
+        max_bytes: int = _DEFAULT_MEMORY_BYTES,
+        path: str | None = None,
+        disk_max_bytes: int = _DEFAULT_DISK_BYTES,
+    ):
+        """Create a cache with an optional sqlite tier.
+
+        Args:
+            max_bytes: Size of the in-process tier.
+            path: File of the shared sqlite tier or None.
+            disk_max_bytes: Size of the sqlite tier.
+        """
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._disk = None if path is None else _DiskTier(path, disk_max_bytes)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return the hit/miss counters and the size of the in-process tier."""
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def _lookup(self, key: str) -> bytes | None:
+        """Return the stored value of a key from the first tier containing it."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+        value = None if self._disk is None else self._disk.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._put_memory(key, value)
+        return value
+
+    def get(self, key: str) -> str | None:
+        """Return the cached XML of a key or None.
+
+        Raises:
+            KnownException: The cached known exception of the key.
+        """
+        value = self._lookup(key)
+        if value is None:
+            return None
+        if value[:1] == _ERROR:
+            error = json.loads(value[1:])
+            raise KnownException(error["id"], error["message"])
+        return value[1:].decode()
+
+    def _put_memory(self, key: str, value: bytes):
+        """Store a value in the in-process tier and evict the least recently used."""
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def put(self, key: str, result: str | KnownException):
+        """Store the XML or known exception of a key in all tiers.
+
+        Transient known exceptions (see `_TRANSIENT_ERRORS`) are not stored.
+        """
+        if isinstance(result, KnownException):
+            if result.id in _TRANSIENT_ERRORS:
+                return
+            error = {"id": result.id, "message": result.message}
+            value = _ERROR + json.dumps(error).encode()
+        else:
+            value = _RESULT + result.encode()
+        self._put_memory(key, value)
+        if self._disk is not None:
+            self._disk.put(key, value)
+
+    def transform(
+        self, direction: str, xml_content: str, transform: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        """Return the chunks of the cached or created result of a transformation.
+
+        Args:
+            direction: The direction and options of the transformation.
+            xml_content: The input XML.
+            transform: Function returning the chunks of the transformed XML.
+
+        Raises:
+            KnownException: The cached or raised known exception of the input.
+        """
+        key = cache_key(direction, xml_content)
+        result = self.get(key)
+        if result is None:
+            try:
+                result = "".join(transform())
+            except KnownException as e:
+                self.put(key, e)
+                raise
+            self.put(key, result)
+        return iter([result])
+
+    def clear(self):
+        """Remove all results of both tiers and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.memory_hits = self.disk_hits = self.misses = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+
+_cache: ResultCache | None = None
+
+
+def get_cache():
+    """Return the cache configured by the environment or None if disabled."""
+    global _cache
+    max_bytes = int(os.getenv("RESULT_CACHE_BYTES", _DEFAULT_MEMORY_BYTES))
+    if max_bytes <= 0:
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            max_bytes,
+            os.getenv("RESULT_CACHE_PATH"),
+            int(os.getenv("RESULT_CACHE_DISK_BYTES", _DEFAULT_DISK_BYTES)),
+        )
+    return _cache
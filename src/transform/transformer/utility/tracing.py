@@ -0,0 +1,235 @@
+"""Lightweight tracing of the stages of a transformation.
+
+A trace is started per request (`start_trace`) and collects the durations and
+element counts of the stages (`stage`, `traced`, `iter_stage`). Stages with the
+same name (e.g. a preprocessing step of every subprocess) are summed up, the
+element counts are the counts of the last call, which is the outermost model.
+
+Without active trace the stages are a shared no-op, the instrumentation costs a
+lookup of a context variable. Traces of worker processes are returned with the
+result (`run_traced`) and merged into the trace of the request.
+
+Tracing is configured with the environment variable `TRANSFORM_TRACING` (default
+true, false disables the traces of the requests).
+"""
+
+import json
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Protocol, TypeVar
+
+T = TypeVar("T")
+
+# name -> [seconds, calls, element counts]
+Stages = dict[str, list[Any]]
+
+
+class Counted(Protocol):
+    """Model which can count its elements (e.g. `Process` or `Net`)."""
+
+    def element_counts(self) -> dict[str, int]:
+        """Return the number of elements by kind."""
+        ...
+
+
+class Trace:
+    """Durations and element counts of the stages of one transformation."""
+
+    def __init__(self):
+        """Start the trace."""
+        self.start = time.perf_counter()
+        self.stages: Stages = {}
+
+    def add(
+        self,
+        name: str,
+        seconds: float,
+        counts: dict[str, int] | None = None,
+        calls: int = 1,
+    ):
+        """Add the duration of a stage and replace its counts if given."""
+        current = self.stages.get(name)
+        if current is None:
+            self.stages[name] = [seconds, calls, counts or {}]
+            return
+        current[0] += seconds
+        current[1] += calls
+        if counts:
+            current[2] = counts
+
+    def merge(self, stages: Stages):
+        """Add the stages of another trace, e.g. of a worker process."""
+        for name, (seconds, calls, counts) in stages.items():
+            self.add(name, seconds, counts, calls)
+
+    def elapsed(self):
+        """Return the seconds since the start of the trace."""
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """Return the value of a `Server-Timing` header with the total duration.
+
+        Only the stages which are complete are included, e.g. without the
+        serialization of a streamed response.
+        """
+        metrics = [
+            f"{name};dur={seconds * 1000:.2f}"
+            for name, (seconds, _, _) in self.stages.items()
+        ]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def log_line(self, **fields: Any):
+        """Return the trace as structured (JSON) log line with additional fields."""
+        stages = {
+            name: {"ms": round(seconds * 1000, 3), "calls": calls, **counts}
+            for name, (seconds, calls, counts) in self.stages.items()
+        }
+        return json.dumps(
+            {
+                "severity": "INFO",
+                "message": "transformation trace",
+                **fields,
+                "total_ms": round(self.elapsed() * 1000, 3),
+                "stages": stages,
+            }
+        )
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+def is_enabled():
+    """Return whether the requests are traced."""
+    return os.getenv("TRANSFORM_TRACING", "true") != "false"
+
+
+def current_trace():
+    """Return the active trace or None."""
+    return _trace.get()
+
+
+class _Stage:
+    """Context manager which adds its duration to a trace."""
+
+    __slots__ = ("trace", "name", "model", "start")
+
+    def __init__(self, trace: Trace, name: str, model: Counted | None):
+        self.trace = trace
+        self.name = name
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        seconds = time.perf_counter() - self.start
+        counts = None if self.model is None else self.model.element_counts()
+        self.trace.add(self.name, seconds, counts)
+
+    def counted(self, model: Counted):
+        """Count the elements of a model at the end of the stage."""
+        self.model = model
+
+
+class _NoStage:
+    """Shared stage without trace."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def counted(self, model: Counted):
+        """Ignore the model."""
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str, model: Counted | None = None) -> _Stage | _NoStage:
+    """Return a context manager which traces a stage.
+
+    Args:
+        name: Name of the stage (a token of the `Server-Timing` header).
+        model: Model whose elements are counted at the end of the stage, can be
+            set later with `counted`.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NO_STAGE
+    return _Stage(trace, name, model)
+
+
+def traced(name: str):
+    """Return a decorator which traces each call of a function as stage."""
+
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return function(*args, **kwargs)
+            with _Stage(trace, name, None):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def iter_stage(name: str, chunks: Iterable[T]) -> Iterator[T]:
+    """Return the chunks and trace the time spent to create them as stage.
+
+    The time of the consumer between the chunks is not included. The stage is
+    added when the chunks are exhausted.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return iter(chunks)
+    return _iter_stage(trace, name, iter(chunks))
+
+
+def _iter_stage(trace: Trace, name: str, chunks: Iterator[T]) -> Iterator[T]:
+    seconds = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            trace.add(name, seconds + time.perf_counter() - start)
+            return
+        seconds += time.perf_counter() - start
+        yield chunk
+
+
+def start_trace():
+    """Start a trace in the current context and return it."""
+    trace = Trace()
+    _trace.set(trace)
+    return trace
+
+
+def stop_trace():
+    """Stop the trace of the current context."""
+    _trace.set(None)
+
+
+def run_traced(function: Callable[..., T], *args) -> tuple[T, Stages]:
+    """Run a function with a new trace and return its result and stages.
+
+    Used to trace the functions run by a worker process.
+    """
+    trace = Trace()
+    token = _trace.set(trace)
+    try:
+        return function(*args), trace.stages
+    finally:
+        _trace.reset(token)
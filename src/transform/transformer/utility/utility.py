@@ -7,6 +7,7 @@ from pydantic_xml import BaseXmlModel, attr
 from exceptions import InternalTransformationException
 
 WOPED = "WoPeD"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
 
 
 def get_tag_name(element: Element):
@@ -29,10 +30,37 @@ def create_arc_name(source: str | None, target: str | None):
 def clean_xml_string(xml_string: str):
     """Add XML header if not already existing."""
     if not xml_string.startswith("<?xml"):
-        xml_string = '<?xml version="1.0" encoding="UTF-8"?>' + xml_string
+        xml_string = XML_HEADER + xml_string
     return xml_string
 
 
+def unordered_search_order(tags: list[str], searches: list[tuple[str, bool]]):
+    """Return the indexes of child elements in the order pydantic_xml finds them.
+
+    The unordered search of pydantic_xml swaps every found element with the next
+    unvisited element, which reorders the remaining elements. The fields of a model
+    are searched one after another.
+
+    Args:
+        tags: The tags of all child elements in document order.
+        searches: The searched tags in field order and whether all elements
+            (collection) or only the first element of the tag are collected.
+    """
+    slots = list(range(len(tags)))
+    next_idx = 0
+    found: list[int] = []
+    for tag, is_collection in searches:
+        # Elements of the searched tag are never displaced during its search
+        positions = [i for i in range(next_idx, len(slots)) if tags[slots[i]] == tag]
+        if not is_collection:
+            positions = positions[:1]
+        for idx in positions:
+            slots[next_idx], slots[idx] = slots[idx], slots[next_idx]
+            found.append(slots[next_idx])
+            next_idx += 1
+    return found
+
+
 class BaseModel(
     BaseXmlModel,
     search_mode="unordered",
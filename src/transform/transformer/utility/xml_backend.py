@@ -0,0 +1,120 @@
+"""Pluggable XML backend to parse and serialize documents.
+
+The lxml backend uses a hardened parser (no network access, no entity expansion,
+no DTD loading, huge trees disabled) and rejects documents which declare
+entities like `defusedxml`. The standard library backend uses `defusedxml`.
+
+The backend is selected by the environment variable `XML_BACKEND` ("lxml" or
+"std") or at runtime with `set_backend`. By default lxml is used if installed.
+Serialization follows the element type created by pydantic_xml, which is only
+lxml if `FORCE_STD_XML` is disabled.
+"""
+
+import io
+import os
+import xml.etree.ElementTree as std_etree
+from collections.abc import Iterator
+from typing import Any
+
+from defusedxml.ElementTree import fromstring as std_fromstring
+from defusedxml.ElementTree import iterparse as std_iterparse
+from pydantic_xml.element.native import ElementT
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # pragma: no cover - lxml is an optional speedup
+    lxml_etree = None
+
+STD = "std"
+LXML = "lxml"
+
+_LXML_PARSER_OPTIONS = {
+    "resolve_entities": False,
+    "no_network": True,
+    "huge_tree": False,
+    "load_dtd": False,
+    "dtd_validation": False,
+    "remove_comments": True,
+    "remove_pis": True,
+}
+# Size of the chunks fed to the incremental lxml parser
+_CHUNK_SIZE = 64 * 1024
+
+
+def available_backends():
+    """Return the names of the installed backends."""
+    return [STD] if lxml_etree is None else [STD, LXML]
+
+
+def _default_backend():
+    """Return the backend selected by the environment or the fastest backend."""
+    name = os.getenv("XML_BACKEND")
+    if name is not None:
+        return name
+    return LXML if lxml_etree is not None else STD
+
+
+def get_backend():
+    """Return the name of the active backend."""
+    return _backend
+
+
+def set_backend(name: str | None = None):
+    """Select the backend by name or the default backend if name is None."""
+    global _backend
+    name = name or _default_backend()
+    if name not in available_backends():
+        raise ValueError(f"XML backend {name} is not available.")
+    if name == STD and ElementT is not std_etree.Element:
+        # pydantic_xml can only read lxml elements if FORCE_STD_XML is disabled
+        raise ValueError("The std XML backend requires FORCE_STD_XML.")
+    _backend = name
+
+
+_backend = STD
+set_backend()
+
+
+def _check_entities(element: Any):
+    """Raise if the document of a lxml element declares entities."""
+    dtd = element.getroottree().docinfo.internalDTD
+    if dtd is not None and any(True for _ in dtd.iterentities()):
+        raise ValueError("Entities are forbidden.")
+
+
+def fromstring(xml_content: str) -> Any:
+    """Return the root element of a XML string."""
+    if _backend == STD:
+        return std_fromstring(xml_content)
+    parser = lxml_etree.XMLParser(**_LXML_PARSER_OPTIONS)
+    parser.feed(xml_content)
+    root = parser.close()
+    _check_entities(root)
+    return root
+
+
+def iterparse(xml_content: str, events=("start", "end")) -> Iterator[tuple[str, Any]]:
+    """Yield the parse events and elements of a XML string."""
+    if _backend == STD:
+        yield from std_iterparse(io.StringIO(xml_content), events)
+        return
+    parser = lxml_etree.XMLPullParser(events, **_LXML_PARSER_OPTIONS)
+    is_checked = False
+    for start in range(0, len(xml_content), _CHUNK_SIZE):
+        parser.feed(xml_content[start : start + _CHUNK_SIZE])
+        for event, element in parser.read_events():
+            if not is_checked:
+                # The DTD is parsed before the first element
+                _check_entities(element)
+                is_checked = True
+            yield event, element
+    parser.close()
+    for event, element in parser.read_events():
+        yield event, element
+
+
+def tostring(element: Any) -> str:
+    """Return the XML string of an element created by pydantic_xml."""
+    if lxml_etree is not None and isinstance(element, lxml_etree._Element):
+        return lxml_etree.tostring(element, encoding="unicode")
+    return std_etree.tostring(element, encoding="unicode")
@@ -0,0 +1,393 @@
+"""Streaming XML writer for the pydantic_xml models.
+
+The writer walks a model and emits the XML in chunks without building an
+intermediate element tree. Tags, attributes, sub elements and namespaces are
+taken from the serializers compiled by pydantic_xml, so the output is identical
+to `ElementTree.tostring(model.to_xml_tree(), encoding="unicode")`: the used
+namespaces are declared on the root element (sorted by prefix), elements without
+content are closed with " />" and empty models are skipped (`skip_empty`).
+
+Sub elements can be omitted by field and value (see `Omissions`), e.g. generated
+defaults which are not needed by a consumer.
+"""
+
+import io
+import typing
+from collections.abc import Callable, Iterator, Mapping
+from enum import Enum
+from typing import IO, Any
+from xml.etree import ElementTree
+
+from pydantic_xml import BaseXmlModel
+from pydantic_xml.serializers.factories import homogeneous, model, primitive, union
+
+from transformer.utility.utility import XML_HEADER
+
+# The escaping of the standard library serializer keeps the output identical
+_escape_attrib = ElementTree._escape_attrib  # type: ignore
+_escape_cdata = ElementTree._escape_cdata  # type: ignore
+
+# Number of written pieces (tags, texts) joined to a chunk
+_CHUNK_PIECES = 4096
+
+# model class -> field of a sub element -> whether a (not None) value of the field
+# is omitted (also applies to the subclasses)
+Omissions = Mapping[type, Mapping[str, Callable[[Any], bool]]]
+NO_OMISSIONS: Omissions = {}
+
+
+def omit_always(value: Any) -> bool:
+    """Omit every value of a field."""
+    return True
+
+
+def omit_default(default: Any) -> Callable[[Any], bool]:
+    """Return the omission of the values of a field which equal a default."""
+    return lambda value: value == default
+
+
+def _encode(value: Any) -> str:
+    """Return the XML string of a primitive value like pydantic_xml."""
+    if value.__class__ is str:
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, Enum):
+        return _encode(value.value)
+    return str(value)
+
+
+def _encode_float(value: Any) -> str:
+    """Return the XML string of a float field value (also if an int is assigned)."""
+    return str(float(value))
+
+
+def _encoder(annotation: Any) -> Callable[[Any], str]:
+    """Return the encoding of the values of a field annotation."""
+    if annotation is float or float in typing.get_args(annotation):
+        return _encode_float
+    return _encode
+
+
+def _namespace(name: str):
+    """Return the namespace of a qualified name ("{uri}tag") or None."""
+    if name[:1] != "{":
+        return None
+    return name[1:].rpartition("}")[0]
+
+
+class _ModelPlan:
+    """Attributes and sub elements of a model derived from its serializer."""
+
+    __slots__ = (
+        "attributes",
+        "children",
+        "skip_empty",
+        "namespaces",
+        "omissions",
+        "omitted",
+    )
+
+    def __init__(self, model_class: type[BaseXmlModel], omissions: Omissions):
+        """Collect the attributes and sub elements in field order."""
+        serializer = model_class.__xml_serializer__
+        if serializer is None:
+            raise TypeError(f"{model_class.__name__} is partially initialized.")
+        # None inherits the setting of the parent
+        self.skip_empty: bool | None = model_class.__xml_skip_empty__
+        # (field, qualified name, encoding)
+        self.attributes: list[tuple[str, str, Callable[[Any], str]]] = []
+        # (field, is collection, tag of a primitive or models, encoding)
+        self.children: list[tuple[str, bool, Any, Callable[[Any], str]]] = []
+        for field, field_serializer in serializer.fields_serializers.items():
+            if field not in model_class.model_fields:
+                raise TypeError(f"Computed field {field} is not supported.")
+            encode = _encoder(model_class.model_fields[field].annotation)
+            if isinstance(field_serializer, primitive.AttributeSerializer):
+                self.attributes.append((field, field_serializer.attr_name, encode))
+            elif isinstance(field_serializer, homogeneous.ElementSerializer):
+                inner = field_serializer._inner_serializer
+                self.children.append((field, True, _target(inner), encode))
+            else:
+                self.children.append((field, False, _target(field_serializer), encode))
+        if len({name for _, name, _ in self.attributes}) < len(self.attributes):
+            raise TypeError(f"{model_class.__name__} has duplicate attributes.")
+        # namespaces of the own attributes and sub elements
+        self.namespaces = {_namespace(name) for _, name, _ in self.attributes}
+        for _, _, target, _ in self.children:
+            tags = [target] if isinstance(target, str) else target[0].values()
+            self.namespaces.update(_namespace(tag) for tag in tags)
+        self.namespaces.discard(None)
+        # The omissions are kept for the plans of the sub elements
+        self.omissions = omissions
+        self.omitted: dict[str, Callable[[Any], bool]] = {}
+        for base in reversed(model_class.__mro__):
+            self.omitted.update(omissions.get(base, {}))
+
+
+def _target(serializer: Any) -> str | tuple[dict[type, str], type | None]:
+    """Return the tag of a primitive element or the models of a model element.
+
+    Models are returned as the tag of every model class and the class used for
+    other values (the declared model, None for unions).
+    """
+    if isinstance(serializer, primitive.ElementSerializer):
+        return serializer._element_name
+    if isinstance(serializer, model.ModelProxySerializer):
+        return {serializer.model: serializer.element_name}, serializer.model
+    if isinstance(serializer, union.ModelSerializer):
+        return {s.model: s.element_name for s in serializer._inner_serializers}, None
+    raise TypeError(f"Serializer {type(serializer).__name__} is not supported.")
+
+
+# (model class, id of the omissions) -> plan, the plan keeps the omissions alive
+_plans: dict[tuple[type, int], _ModelPlan] = {}
+_reachable_namespaces: dict[_ModelPlan, frozenset[str]] = {}
+
+
+def _plan(model_class: type[BaseXmlModel], omissions: Omissions = NO_OMISSIONS):
+    """Return the (cached) plan of a model."""
+    key = (model_class, id(omissions))
+    if key not in _plans:
+        _plans[key] = _ModelPlan(model_class, omissions)
+    return _plans[key]
+
+
+def _reachable(plan: _ModelPlan):
+    """Return all namespaces which can be used below a model (cached)."""
+    if plan not in _reachable_namespaces:
+        namespaces: set[str] = set()
+        visited: set[type] = set()
+        pending = [plan]
+        while pending:
+            current = pending.pop()
+            namespaces.update(current.namespaces)
+            for _, _, target, _ in current.children:
+                if not isinstance(target, str):
+                    models = [m for m in target[0] if m not in visited]
+                    visited.update(models)
+                    pending.extend(_plan(m, current.omissions) for m in models)
+        _reachable_namespaces[plan] = frozenset(namespaces)
+    return _reachable_namespaces[plan]
+
+
+def _children(obj: BaseXmlModel, plan: _ModelPlan, skip_empty: bool):
+    """Yield the written sub elements of a model in field order.
+
+    Primitive elements are yielded as (tag, text, None, None) and models as
+    (tag, model, plan, skip_empty).
+    """
+    values = obj.__dict__
+    omitted = plan.omitted
+    for field, is_collection, target, encode in plan.children:
+        value = values[field]
+        if is_collection and value is None:
+            continue
+        if field in omitted and value is not None and omitted[field](value):
+            continue
+        for item in value if is_collection else (value,):
+            if item is None and (skip_empty or not isinstance(target, str)):
+                continue
+            if isinstance(target, str):
+                text = "" if item is None else encode(item)
+                if text or not skip_empty:
+                    yield target, text, None, None
+                continue
+            tags, default = target
+            item_class = item.__class__
+            if item_class not in tags:
+                if default is None:
+                    continue
+                item_class = default
+            item_plan = _plan(item_class, plan.omissions)
+            item_skip = (
+                skip_empty if item_plan.skip_empty is None else item_plan.skip_empty
+            )
+            yield tags[item_class], item, item_plan, item_skip
+
+
+def _has_attributes(obj: BaseXmlModel, plan: _ModelPlan, skip_empty: bool):
+    """Return whether a model writes any attribute."""
+    values = obj.__dict__
+    return any(
+        values[field] is not None or not skip_empty for field, _, _ in plan.attributes
+    )
+
+
+def _collect_namespaces(
+    obj: BaseXmlModel,
+    plan: _ModelPlan,
+    skip_empty: bool,
+    found: dict[str, None],
+):
+    """Add the namespaces used below a model in document order to found.
+
+    Sub trees which can not add new namespaces are skipped once the model is known
+    to be written. Returns whether the model has any content.
+    """
+    values = obj.__dict__
+    written = False
+    for field, name, _ in plan.attributes:
+        if values[field] is not None or not skip_empty:
+            written = True
+            namespace = _namespace(name)
+            if namespace is not None:
+                found.setdefault(namespace)
+    for tag, value, child_plan, child_skip in _children(obj, plan, skip_empty):
+        namespace = _namespace(tag)
+        if child_plan is None:
+            written = True
+            if namespace is not None:
+                found.setdefault(namespace)
+            continue
+        if (
+            written
+            and (namespace is None or namespace in found)
+            and _reachable(child_plan).issubset(found)
+        ):
+            continue
+        marker = len(found)
+        if namespace is not None:
+            found.setdefault(namespace)
+        # Empty models are only skipped by the setting of the parent
+        if _collect_namespaces(value, child_plan, child_skip, found) or not skip_empty:
+            written = True
+        else:
+            # An empty model is skipped with all of its namespaces
+            for added in list(found)[marker:]:
+                del found[added]
+    return written
+
+
+def _prefixes(namespaces: dict[str, None]):
+    """Return the prefix of every namespace like the standard library serializer."""
+    prefixes: dict[str, str] = {}
+    declared = 0
+    for namespace in namespaces:
+        prefix = ElementTree._namespace_map.get(namespace)  # type: ignore
+        if prefix is None:
+            prefix = f"ns{declared}"
+        # The xml namespace is never declared
+        declared += prefix != "xml"
+        prefixes[namespace] = prefix
+    return prefixes
+
+
+def iter_xml(
+    obj: BaseXmlModel, header: bool = False, omissions: Omissions = NO_OMISSIONS
+) -> Iterator[str]:
+    """Yield the serialized XML of a model in chunks.
+
+    Args:
+        obj: The root model.
+        header: Whether the XML header is written first.
+        omissions: The omitted sub elements.
+    """
+    root_class = obj.__class__
+    root_plan = _plan(root_class, omissions)
+    root_skip = bool(root_plan.skip_empty)
+    root_tag = root_class.__xml_serializer__.element_name  # type: ignore
+    found: dict[str, None] = {}
+    root_namespace = _namespace(root_tag)
+    if root_namespace is not None:
+        found[root_namespace] = None
+    _collect_namespaces(obj, root_plan, root_skip, found)
+    prefixes = _prefixes(found)
+    declarations = "".join(
+        f' xmlns{":" + prefix if prefix else ""}="{_escape_attrib(namespace)}"'
+        for namespace, prefix in sorted(prefixes.items(), key=lambda x: x[1])
+        if prefix != "xml"
+    )
+    qnames: dict[str, str] = {}
+
+    def qualify(name: str):
+        """Return the prefixed name of a qualified name."""
+        if name not in qnames:
+            namespace = _namespace(name)
+            if namespace is None:
+                qnames[name] = name
+            else:
+                prefix = prefixes[namespace]
+                tag = name.rpartition("}")[2]
+                qnames[name] = f"{prefix}:{tag}" if prefix else tag
+        return qnames[name]
+
+    def start(frame: list):
+        """Return the start tag of a frame without the closing bracket."""
+        name, value, plan, skip = frame[:4]
+        values = value.__dict__
+        parts = ["<", qualify(name), declarations if frame is root else ""]
+        for field, attribute, encode in plan.attributes:
+            value = values[field]
+            if value is None:
+                if skip:
+                    continue
+                text = ""
+            else:
+                text = _escape_attrib(encode(value))
+            parts.append(f' {qualify(attribute)}="{text}"')
+        return "".join(parts)
+
+    pieces: list[str] = [XML_HEADER] if header else []
+    root = [
+        root_tag,
+        obj,
+        root_plan,
+        root_skip,
+        _children(obj, root_plan, root_skip),
+        True,
+    ]
+    # frames of the models (name, model, plan, skip empty, children, is kept if empty)
+    stack = [root]
+    # number of frames whose start tags are written
+    opened = 0
+    while stack:
+        child = next(stack[-1][4], None)
+        if child is None:
+            frame = stack.pop()
+            if opened > len(stack):
+                opened -= 1
+                pieces.append(f"</{qualify(frame[0])}>")
+            elif frame[5] or _has_attributes(*frame[1:4]):
+                while opened < len(stack):
+                    pieces.append(start(stack[opened]) + ">")
+                    opened += 1
+                pieces.append(start(frame) + " />")
+        elif child[2] is None:
+            while opened < len(stack):
+                pieces.append(start(stack[opened]) + ">")
+                opened += 1
+            tag = qualify(child[0])
+            if child[1]:
+                pieces.append(f"<{tag}>{_escape_cdata(child[1])}</{tag}>")
+            else:
+                pieces.append(f"<{tag} />")
+        else:
+            name, value, child_plan, child_skip = child
+            children = _children(value, child_plan, child_skip)
+            is_kept = not stack[-1][3]
+            stack.append([name, value, child_plan, child_skip, children, is_kept])
+        if len(pieces) >= _CHUNK_PIECES:
+            yield "".join(pieces)
+            pieces.clear()
+    if pieces:
+        yield "".join(pieces)
+
+
+def write_xml(
+    obj: BaseXmlModel,
+    stream: IO,
+    header: bool = False,
+    omissions: Omissions = NO_OMISSIONS,
+):
+    """Write the serialized XML of a model to a text or (UTF-8) binary stream."""
+    is_text = isinstance(stream, io.TextIOBase)
+    for chunk in iter_xml(obj, header, omissions):
+        stream.write(chunk if is_text else chunk.encode())
+
+
+def to_xml_string(
+    obj: BaseXmlModel, header: bool = False, omissions: Omissions = NO_OMISSIONS
+) -> str:
+    """Return the serialized XML of a model."""
+    return "".join(iter_xml(obj, header, omissions))
@@ -0,0 +1,245 @@
+"""Pre-forked process pool for the CPU bound transformations.
+
+Every transformation runs in a worker process with a deadline. A worker which
+misses the deadline is killed and replaced, so a pathological diagram can not
+block the instance until the gateway timeout. Requests which would wait behind
+too many others are rejected immediately instead of piling up.
+
+The workers are forked from a server process which has already imported the
+transformer. The pool is configured with the environment variables:
+
+- `TRANSFORM_WORKERS`: Number of worker processes (default 0, which transforms
+  in the request thread without deadline). Deployments enable the pool
+  explicitly, e.g. the gunicorn configuration with one process per worker.
+- `TRANSFORM_DEADLINE`: Seconds a transformation may take including the wait for
+  a worker (default 55, below the 60s timeout of the gateway).
+- `TRANSFORM_MAX_QUEUE`: Number of requests which may wait for a worker
+  (default 4 per worker).
+"""
+
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any
+
+from exceptions import (
+    InternalTransformationException,
+    ServiceOverloaded,
+    TransformationTimeout,
+)
+from transformer.transform import TRANSFORMER_MODULES
+
+_DEFAULT_DEADLINE = 55.0
+# Modules imported once by the fork server and inherited by every worker.
+_PRELOAD = ["exceptions", *TRANSFORMER_MODULES]
+
+
+def _context():
+    """Return the fork server context which preloads the transformer.
+
+    Falls back to spawn on platforms without fork server.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PRELOAD)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _serve(connection: Connection):
+    """Run the functions received by a worker until the pipe is closed."""
+    for module in _PRELOAD:
+        importlib.import_module(module)
+    while True:
+        try:
+            function, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            outcome = (True, function(*args))
+        except Exception as e:
+            outcome = (False, e)
+        try:
+            connection.send(outcome)
+        except Exception:
+            # The result or exception can not be pickled.
+            connection.send((False, InternalTransformationException()))
+
+
+class _Worker:
+    """A worker process with the pipe to send functions and receive results."""
+
+    def __init__(self, context: Any):
+        """Start the worker process."""
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        """Kill the process, e.g. because it missed the deadline."""
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class WorkerPool:
+    """Pool of worker processes with deadlines and a bounded queue."""
+
+    def __init__(
+        self,
+        workers: int,
+        deadline: float = _DEFAULT_DEADLINE,
+        max_queue: int | None = None,
+    ):
+        """Start the worker processes.
+
+        Args:
+            workers: Number of worker processes.
+            deadline: Default seconds a function may take including the queue.
+            max_queue: Number of calls which may wait for a worker.
+        """
+        self.workers = workers
+        self.deadline = deadline
+        self.max_queue = 4 * workers if max_queue is None else max_queue
+        self._context = _context()
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(_Worker(self._context))
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._threads = ThreadPoolExecutor(workers, thread_name_prefix="worker-pool")
+        self.timeouts = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    @property
+    def queue_depth(self):
+        """Return the number of calls waiting for a worker."""
+        return self._waiting
+
+    def stats(self):
+        """Return the load and the counters of the pool."""
+        return {
+            "workers": self.workers,
+            "busy": self.workers - self._idle.qsize(),
+            "queue_depth": self._waiting,
+            "max_queue": self.max_queue,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+    def _acquire(self, end: float) -> _Worker:
+        """Return an idle worker or wait for one until the end of the deadline."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise ServiceOverloaded()
+            self._waiting += 1
+        try:
+            return self._idle.get(timeout=max(0, end - time.monotonic()))
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise TransformationTimeout() from None
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _replace(self, worker: _Worker):
+        """Kill a worker and return a new one."""
+        worker.kill()
+        with self._lock:
+            self.restarts += 1
+        return _Worker(self._context)
+
+    def run(self, function: Callable, *args, deadline: float | None = None):
+        """Run a function in a worker process and return its result.
+
+        The function and its arguments and result must be picklable.
+
+        Raises:
+            ServiceOverloaded: If `max_queue` calls are already waiting.
+            TransformationTimeout: If the result is not available before the
+                deadline. The worker is replaced.
+            InternalTransformationException: If the worker died.
+            Exception: The exception raised by the function.
+        """
+        end = time.monotonic() + (self.deadline if deadline is None else deadline)
+        worker = self._acquire(end)
+        try:
+            worker.connection.send((function, args))
+            if not worker.connection.poll(max(0, end - time.monotonic())):
+                with self._lock:
+                    self.timeouts += 1
+                worker = self._replace(worker)
+                raise TransformationTimeout()
+            is_ok, result = worker.connection.recv()
+        except (EOFError, OSError):
+            # The worker was killed, e.g. by the out of memory killer.
+            worker = self._replace(worker)
+            raise InternalTransformationException() from None
+        finally:
+            self._idle.put(worker)
+        if not is_ok:
+            raise result
+        return result
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Run a function in a worker process in the background (see `run`)."""
+        return self._threads.submit(self.run, function, *args)
+
+    def close(self):
+        """Wait for the running calls and stop the workers."""
+        self._threads.shutdown()
+        for _ in range(self.workers):
+            self._idle.get().kill()
+
+
+_pool: WorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    """Forget the pool of the parent in a forked process (e.g. gunicorn worker).
+
+    The threads of the pool do not exist in the child and its workers are shared
+    with the parent, the child creates its own pool on first use.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool():
+    """Return the pool configured by the environment or None if disabled.
+
+    Worker processes have no pool, they import the main module (e.g. `app.py`)
+    which creates the pool before they know their parent process.
+    """
+    global _pool
+    workers = int(os.getenv("TRANSFORM_WORKERS", "0"))
+    if workers <= 0 or multiprocessing.current_process().name != "MainProcess":
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                workers,
+                float(os.getenv("TRANSFORM_DEADLINE", _DEFAULT_DEADLINE)),
+                int(os.getenv("TRANSFORM_MAX_QUEUE", 4 * workers)),
+            )
+    return _pool